@@ -2,6 +2,7 @@
 ChatPDF backend - main app entry mounting all routers.
 """
 
+import asyncio
 import os
 import time
 from pathlib import Path
@@ -11,6 +12,7 @@ from fastapi.staticfiles import StaticFiles
 
 from runtime_mode import runtime
 from middleware.desktop_auth import DesktopAuthMiddleware
+from middleware.compression import CompressionMiddleware
 from models.model_registry import EMBEDDING_MODELS
 from models.dynamic_store import load_dynamic_models
 from routes.model_provider_routes import router as model_provider_router
@@ -28,10 +30,14 @@ from routes import memory_routes
 from routes.feedback_routes import router as feedback_router
 from routes import feedback_routes
 from services.memory_service import MemoryService
+from services import bm25_service
+from services.chat_service import close_stream_client, prewarm_stream_connections
 from config import settings
 
 # 应用启动时间戳
 _startup_time = time.time()
+# 启动预热任务（保留引用防止被垃圾回收）
+_prewarm_task = None
 
 # Directories
 # 桌面模式使用 runtime.data_dir（AppData），服务器模式使用项目根目录
@@ -76,6 +82,7 @@ _memory_service.keyword_threshold = settings.memory_keyword_threshold
 memory_routes.memory_service = _memory_service
 chat_routes.memory_service = _memory_service
 feedback_routes.init_feedback_dir(DATA_DIR)
+bm25_service.init_bm25_cache_dir(DATA_DIR / "bm25_cache")
 
 # 初始化文件监听器（如果启用 Markdown 源文件）
 _memory_watcher = None
@@ -108,6 +115,9 @@ app.add_middleware(
 # 桌面模式安全中间件（仅桌面模式生效）
 app.add_middleware(DesktopAuthMiddleware, runtime_config=runtime)
 
+# 响应压缩：检索结果/摘要等 JSON 体积大且高度可压缩；SSE/NDJSON 流式响应不压缩
+app.add_middleware(CompressionMiddleware, minimum_size=1024, compresslevel=5)
+
 # Static for PDFs
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
@@ -124,6 +134,12 @@ async def startup_event():
             import logging
             logging.getLogger(__name__).error(f"启动记忆文件监听器失败: {e}")
 
+    # 按配置在后台预热常用 provider 的流式连接，不阻塞启动
+    prewarm = [p for p in settings.stream_prewarm_providers.split(",") if p.strip()]
+    if prewarm:
+        global _prewarm_task
+        _prewarm_task = asyncio.create_task(prewarm_stream_connections(prewarm))
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -146,6 +162,9 @@ async def shutdown_event():
             import logging
             logging.getLogger(__name__).error(f"关闭 SQLite 连接失败: {e}")
 
+    # 释放流式对话共享的 HTTP 连接池
+    await close_stream_client()
+
 
 @app.get("/embedding_models")
 async def get_embedding_models(as_list: bool = False):
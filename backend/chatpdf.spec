@@ -44,6 +44,7 @@ a = Analysis(
         'pydantic',
         'pydantic_settings',
         'pydantic.deprecated.decorator',
+        'orjson',
 
         # FAISS
         'faiss',
@@ -17,6 +17,9 @@ class AppSettings(BaseSettings):
     enable_chat_logging: bool = Field(default=True, env="CHATPDF_CHAT_LOGGING")
     chat_retry_retries: int = Field(default=1, env="CHATPDF_CHAT_RETRY_RETRIES")
     chat_retry_delay: float = Field(default=0.5, env="CHATPDF_CHAT_RETRY_DELAY")
+    # 重试退避上限（秒）：设置后按 delay * 2^n 指数退避并全抖动，429 时优先遵循 Retry-After；
+    # 不设置则保持固定 delay 间隔
+    chat_retry_backoff_cap: float | None = Field(default=None, env="CHATPDF_CHAT_RETRY_BACKOFF_CAP")
 
     # 检索链路
     enable_search_logging: bool = Field(default=True, env="CHATPDF_SEARCH_LOGGING")
@@ -34,12 +37,24 @@ class AppSettings(BaseSettings):
     # 超时/断路器
     chat_timeout: float = Field(default=120.0, env="CHATPDF_CHAT_TIMEOUT")
     search_timeout: float = Field(default=30.0, env="CHATPDF_SEARCH_TIMEOUT")
+    # 大文档正则/布尔搜索的进程池：worker 数（0 表示按 CPU 核数），以及启用进程池的全文字符数阈值
+    search_process_workers: int = Field(default=0, env="CHATPDF_SEARCH_PROCESS_WORKERS")
+    search_process_min_chars: int = Field(default=200_000, env="CHATPDF_SEARCH_PROCESS_MIN_CHARS")
+    # 大文档（IVF 索引）向量按维 int8 标量量化，ANN 扫描内存带宽降为 FP32 的 1/4；
+    # 粗排候选再按 FP32 原始向量精排（IndexRefineFlat），返回的排序与分数不受量化影响
+    vector_index_int8: bool = Field(default=True, env="CHATPDF_VECTOR_INDEX_INT8")
 
     # 备用模型/提供商（用于失败兜底）
     chat_fallback_provider: str | None = Field(default=None, env="CHATPDF_CHAT_FALLBACK_PROVIDER")
     chat_fallback_model: str | None = Field(default=None, env="CHATPDF_CHAT_FALLBACK_MODEL")
     search_fallback_provider: str | None = Field(default=None, env="CHATPDF_SEARCH_FALLBACK_PROVIDER")
     search_fallback_model: str | None = Field(default=None, env="CHATPDF_SEARCH_FALLBACK_MODEL")
+    # 对冲延迟（秒）：配置了备用提供商时，主请求超过该时长未成功即并发请求备用，取先成功者；
+    # 未设置时保持“主请求重试耗尽后再切换”的串行行为
+    chat_hedge_delay: float | None = Field(default=None, env="CHATPDF_CHAT_HEDGE_DELAY")
+    # 非流式 LLM 调用的精确匹配响应缓存有效期（秒），0 表示禁用；
+    # 开启后相同 provider/模型/消息/采样参数的重复请求直接返回上次成功的响应
+    chat_response_cache_ttl: float = Field(default=0.0, env="CHATPDF_CHAT_RESPONSE_CACHE_TTL")
 
     # ==================== Agent 检索配置 ====================
     # Agent 检索最大轮数
@@ -166,6 +181,31 @@ class AppSettings(BaseSettings):
         validation_alias=AliasChoices("stream_buffer_size", "CHATPDF_STREAM_BUFFER_SIZE"),
         description="流式输出缓冲字符数阈值，累积超过此值后发送，0 表示禁用缓冲"
     )
+    # 流式输出时间窗口（毫秒）：距上次发送超过此值时即使未达字符数阈值也发送，0 表示只按字符数；
+    # 与较大的 stream_buffer_size（如 256）配合，可把快速模型的逐 token 事件按时间窗口合并
+    stream_flush_interval_ms: int = Field(
+        default=0,
+        validation_alias=AliasChoices("stream_flush_interval_ms", "CHATPDF_STREAM_FLUSH_INTERVAL_MS"),
+        description="流式输出时间窗口（毫秒），0 表示只按字符数阈值发送"
+    )
+    # 共享流式客户端连接池：高并发部署可调大，避免会话在连接池上排队
+    stream_max_connections: int = Field(
+        default=128,
+        validation_alias=AliasChoices("stream_max_connections", "CHATPDF_HTTPX_MAX_CONNECTIONS"),
+        description="流式请求共享客户端的最大连接数"
+    )
+    stream_max_keepalive_connections: int = Field(
+        default=64,
+        validation_alias=AliasChoices("stream_max_keepalive_connections", "CHATPDF_HTTPX_MAX_KEEPALIVE_CONNECTIONS"),
+        description="流式请求共享客户端保留的空闲长连接数"
+    )
+    # 启动时预热连接的 provider（逗号分隔，如 "openai,deepseek"），留空不预热；
+    # 预热会向对应服务商发起一次 HEAD 请求，提前完成 TLS 握手以缩短首个 token 延迟
+    stream_prewarm_providers: str = Field(
+        default="",
+        validation_alias=AliasChoices("stream_prewarm_providers", "CHATPDF_STREAM_PREWARM_PROVIDERS"),
+        description="启动时预热流式连接的 provider 列表，留空不预热"
+    )
 
     # ==================== 记忆系统配置 ====================
     # 记忆功能启用开关
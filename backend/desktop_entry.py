@@ -15,6 +15,7 @@
 """
 
 import logging
+import multiprocessing
 import os
 import signal
 import sys
@@ -129,4 +130,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # PyInstaller 打包后，搜索进程池的子进程需要经由此处识别并接管
+    multiprocessing.freeze_support()
     main()
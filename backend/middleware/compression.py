@@ -0,0 +1,66 @@
+"""
+响应压缩中间件
+
+在 Starlette GZipMiddleware 基础上只压缩文本类响应（JSON、HTML/CSS/JS 等）：
+- SSE / NDJSON 流式响应：GZipResponder 对流式分片只 write 不 flush，压缩器内部缓冲会把
+  逐 token 推送的 SSE 事件攒在一起，破坏首字延迟；
+- PDF、图片等二进制文件：本身已压缩，重新 gzip 几乎不减小体积，却要在事件循环上压缩整个文件；
+  且带 Content-Encoding 的响应会让 pdf.js 放弃 Range 分段加载，改为整份下载。
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# 不压缩的流式响应类型（text/event-stream 虽属 text/*，也需排除）
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+# 允许压缩的响应类型（前缀匹配）
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def should_compress(content_type: str) -> bool:
+    """按 Content-Type 判断响应是否值得 gzip"""
+    content_type = content_type.lower()
+    if content_type.startswith(STREAMING_MEDIA_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    """只压缩文本类响应，其余原样透传"""
+
+    passthrough = False
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                not should_compress(headers.get("content-type", ""))
+                or "content-encoding" in headers
+            )
+        if self.passthrough:
+            await self.send(message)
+            return
+        await super().send_with_gzip(message)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """gzip 压缩中间件，只压缩 JSON / 文本响应"""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if "gzip" in headers.get("Accept-Encoding", ""):
+                responder = _SelectiveGZipResponder(
+                    self.app, self.minimum_size, compresslevel=self.compresslevel
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -2,8 +2,9 @@
 
 支持逗号分隔的多 Key 字符串，随机选择一个有效 Key。
 """
+import functools
 import random
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 
 def parse_api_key_pool(api_key_string: str) -> List[str]:
@@ -18,9 +19,13 @@ def parse_api_key_pool(api_key_string: str) -> List[str]:
     Returns:
         去除首尾空白、过滤空字符串后的有效 Key 列表
     """
-    if not api_key_string:
-        return []
-    return [k.strip() for k in api_key_string.split(",") if k.strip()]
+    return list(_parse_api_key_pool_cached(api_key_string)) if api_key_string else []
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_api_key_pool_cached(api_key_string: str) -> Tuple[str, ...]:
+    """按原始字符串缓存解析结果；每个元素只 strip 一次"""
+    return tuple(k for k in (part.strip() for part in api_key_string.split(",")) if k)
 
 
 def select_api_key(api_key_string: str) -> Optional[str]:
@@ -35,7 +40,10 @@ def select_api_key(api_key_string: str) -> Optional[str]:
     Returns:
         随机选择的 Key，池为空时返回 None
     """
-    keys = parse_api_key_pool(api_key_string)
+    if not api_key_string:
+        return None
+    # 只缓存解析结果，随机选择仍逐次进行，保证多 Key 轮换不被固定
+    keys = _parse_api_key_pool_cached(api_key_string)
     if not keys:
         return None
     if len(keys) == 1:
@@ -2,30 +2,84 @@ import json
 import os
 from typing import Dict, Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 BASE_DIR = os.path.join("data", "config")
 PROVIDER_FILE = os.path.join(BASE_DIR, "providers.json")
 MODEL_FILE = os.path.join(BASE_DIR, "models.json")
 
+# 内存快照：path -> (st_mtime_ns, data)，文件 mtime 未变化时直接复用，避免每次请求读盘解析
+_SNAPSHOTS: Dict[str, tuple] = {}
+# 已暂存、尚未落盘的写入：path -> data，读取时优先返回，保证异步落盘前也能读己之写
+_PENDING: Dict[str, Dict[str, Any]] = {}
+# 进程内版本号，每次写入或检测到外部修改时递增
+_VERSION = 0
+
 
 def _ensure_dir():
     os.makedirs(BASE_DIR, exist_ok=True)
 
 
+def _bump_version():
+    global _VERSION
+    _VERSION += 1
+
+
+def get_store_version() -> int:
+    """返回动态配置的进程内版本号，可用于上层缓存失效判断"""
+    return _VERSION
+
+
 def _load_json(path: str) -> Dict[str, Any]:
-    if not os.path.exists(path):
+    pending = _PENDING.get(path)
+    if pending is not None:
+        return dict(pending)
+
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        if _SNAPSHOTS.pop(path, None) is not None:
+            _bump_version()
         return {}
+
+    cached = _SNAPSHOTS.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        # 返回浅拷贝，调用方增删顶层 key 不会污染快照
+        return dict(cached[1])
+
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     except Exception:
         return {}
+    if not isinstance(data, dict):
+        return {}
+
+    _SNAPSHOTS[path] = (mtime_ns, data)
+    _bump_version()
+    return dict(data)
 
 
 def _save_json(path: str, data: Dict[str, Any]):
     _ensure_dir()
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    # 写入后立即刷新快照，保证同进程内读己之写
+    _SNAPSHOTS[path] = (os.stat(path).st_mtime_ns, dict(data))
+    # 只清除与本次写入相同的暂存数据，写盘期间又有新暂存时保留新的
+    if _PENDING.get(path) is data:
+        _PENDING.pop(path, None)
+    _bump_version()
+
+
+def _stage_json(path: str, data: Dict[str, Any]):
+    _PENDING[path] = data
+    _bump_version()
 
 
 def load_dynamic_providers() -> Dict[str, Any]:
@@ -36,9 +90,19 @@ def save_dynamic_providers(data: Dict[str, Any]):
     _save_json(PROVIDER_FILE, data)
 
 
+def stage_dynamic_providers(data: Dict[str, Any]):
+    """仅更新内存中的 provider 配置，稍后由 save_dynamic_providers 落盘"""
+    _stage_json(PROVIDER_FILE, data)
+
+
 def load_dynamic_models() -> Dict[str, Any]:
     return _load_json(MODEL_FILE)
 
 
 def save_dynamic_models(data: Dict[str, Any]):
     _save_json(MODEL_FILE, data)
+
+
+def stage_dynamic_models(data: Dict[str, Any]):
+    """仅更新内存中的模型配置，稍后由 save_dynamic_models 落盘"""
+    _stage_json(MODEL_FILE, data)
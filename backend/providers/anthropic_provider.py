@@ -2,7 +2,7 @@ import httpx
 from fastapi import HTTPException
 from typing import Dict, List, Optional
 
-from .base import BaseProvider
+from .base import BaseProvider, retry_after_headers
 
 
 class AnthropicProvider(BaseProvider):
@@ -63,7 +63,8 @@ class AnthropicProvider(BaseProvider):
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
-                    detail=f"Anthropic API错误: {response.text}"
+                    detail=f"Anthropic API错误: {response.text}",
+                    headers=retry_after_headers(response),
                 )
 
             result = response.json()
@@ -2,6 +2,13 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Optional
 
 
+def retry_after_headers(response) -> Optional[Dict[str, str]]:
+    """上游 429 时提取 Retry-After，附在 HTTPException 上供重试逻辑读取"""
+    if response.status_code == 429 and "retry-after" in response.headers:
+        return {"Retry-After": response.headers["retry-after"]}
+    return None
+
+
 class BaseProvider(ABC):
     """统一的Provider接口"""
 
@@ -2,7 +2,7 @@ import httpx
 from fastapi import HTTPException
 from typing import Dict, List, Optional
 
-from .base import BaseProvider
+from .base import BaseProvider, retry_after_headers
 
 
 class GeminiProvider(BaseProvider):
@@ -80,7 +80,8 @@ class GeminiProvider(BaseProvider):
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
-                    detail=f"Gemini API错误: {response.text}"
+                    detail=f"Gemini API错误: {response.text}",
+                    headers=retry_after_headers(response),
                 )
 
             result = response.json()
@@ -2,7 +2,7 @@ import httpx
 from fastapi import HTTPException
 from typing import Dict, List, Optional
 
-from .base import BaseProvider
+from .base import BaseProvider, retry_after_headers
 
 
 class GrokProvider(BaseProvider):
@@ -55,7 +55,8 @@ class GrokProvider(BaseProvider):
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
-                    detail=f"Grok API错误: {response.text}"
+                    detail=f"Grok API错误: {response.text}",
+                    headers=retry_after_headers(response),
                 )
 
             return response.json()
@@ -2,7 +2,7 @@ import httpx
 from fastapi import HTTPException
 from typing import Dict, List, Optional
 
-from .base import BaseProvider
+from .base import BaseProvider, retry_after_headers
 
 
 class OpenAICompatibleProvider(BaseProvider):
@@ -58,7 +58,8 @@ class OpenAICompatibleProvider(BaseProvider):
             if response.status_code != 200:
                 raise HTTPException(
                     status_code=response.status_code,
-                    detail=f"OpenAI兼容API错误: {response.text}"
+                    detail=f"OpenAI兼容API错误: {response.text}",
+                    headers=retry_after_headers(response),
                 )
 
             return response.json()
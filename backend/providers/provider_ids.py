@@ -1,14 +1,15 @@
-OPENAI_LIKE = {"openai", "aliyun", "silicon", "moonshot", "deepseek", "zhipu", "minimax", "grok", "qwen", "doubao"}
-ANTHROPIC = {"anthropic"}
-GEMINI = {"gemini"}
-OLLAMA = {"ollama"}
+# provider id 一律为小写；用 frozenset 保证导入后不可变，成员判断为 O(1)
+OPENAI_LIKE = frozenset({"openai", "aliyun", "silicon", "moonshot", "deepseek", "zhipu", "minimax", "grok", "qwen", "doubao"})
+ANTHROPIC = frozenset({"anthropic"})
+GEMINI = frozenset({"gemini"})
+OLLAMA = frozenset({"ollama"})
 
 # 需要特殊思考参数的 provider 子集
 # OpenAI 原生 API 使用 reasoning_effort 参数控制思考深度
-OPENAI_NATIVE = {"openai"}
+OPENAI_NATIVE = frozenset({"openai"})
 # MiniMax 使用 reasoning_split 参数开启思考分离
-MINIMAX = {"minimax"}
+MINIMAX = frozenset({"minimax"})
 # Moonshot/Kimi 的思考模型自动输出 reasoning_content，无需额外参数
-MOONSHOT = {"moonshot"}
+MOONSHOT = frozenset({"moonshot"})
 # 豆包 Seed 系列自动思考，无需额外参数（同 Moonshot）
-DOUBAO = {"doubao"}
+DOUBAO = frozenset({"doubao"})
@@ -1,10 +1,13 @@
 from datetime import datetime
 from typing import Optional, List
+import asyncio
 import json
 import logging
 import re
 import threading
+import time
 
+import orjson
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -103,7 +106,20 @@ def _detect_image_mime(image_base64: str) -> str:
         return 'image/webp'
     return 'image/jpeg'
 
-async def _buffered_stream(raw_stream):
+def _sse_event(data: dict) -> bytes:
+    """把事件编码为一条 SSE 消息
+
+    流式回答逐 token 产出事件，用 orjson 直接编码为 UTF-8 字节；
+    遇到 orjson 不支持的类型时回退到标准库，保持与原先一致的行为。
+    """
+    try:
+        body = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    except TypeError:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return b"data: " + body + b"\n\n"
+
+
+async def _buffered_stream(raw_stream, flush_interval: Optional[float] = None):
     """对原始 SSE 流进行字符数缓冲，合并高频小 chunk 减少 SSE 事件频率
 
     根据 settings.stream_buffer_size 配置的字符数阈值，
@@ -113,6 +129,8 @@ async def _buffered_stream(raw_stream):
 
     Args:
         raw_stream: 原始异步生成器（call_ai_api_stream 的输出）
+        flush_interval: 时间窗口（秒）。设置后距上次发送超过该时长也会发送（上游暂无新 chunk 时按计时器发送），
+            此时可把 stream_buffer_size 调大，按时间窗口批量合并 token；None 表示只按字符数
     """
     buffer_size = settings.stream_buffer_size
 
@@ -129,50 +147,80 @@ async def _buffered_stream(raw_stream):
     reasoning_parts: list[str] = []
     content_len = 0
     reasoning_len = 0
+    last_flush = time.monotonic()
 
-    async for chunk in raw_stream:
-        # 错误或终止信号：立即刷新缓冲区并转发
-        if chunk.get("error") or chunk.get("done"):
-            if content_parts or reasoning_parts:
-                yield {
-                    "content": "".join(content_parts),
-                    "reasoning_content": "".join(reasoning_parts),
-                    "done": False,
-                }
-                content_parts.clear()
-                reasoning_parts.clear()
-                content_len = reasoning_len = 0
-            yield chunk
-            break
-
-        # 累积到缓冲区
-        c = chunk.get("content", "")
-        r = chunk.get("reasoning_content", "")
-        if c:
-            content_parts.append(c)
-            content_len += len(c)
-        if r:
-            reasoning_parts.append(r)
-            reasoning_len += len(r)
-
-        # 缓冲区达到阈值，立即发送
-        if content_len >= buffer_size or reasoning_len >= buffer_size:
-            yield {
-                "content": "".join(content_parts),
-                "reasoning_content": "".join(reasoning_parts),
-                "done": False,
-            }
-            content_parts.clear()
-            reasoning_parts.clear()
-            content_len = reasoning_len = 0
-
-    # 流正常结束但未收到 done/error 信号时，刷新剩余缓冲
-    if content_parts or reasoning_parts:
-        yield {
+    def _drain() -> dict:
+        nonlocal content_len, reasoning_len, last_flush
+        merged = {
             "content": "".join(content_parts),
             "reasoning_content": "".join(reasoning_parts),
             "done": False,
         }
+        content_parts.clear()
+        reasoning_parts.clear()
+        content_len = reasoning_len = 0
+        last_flush = time.monotonic()
+        return merged
+
+    stream_iter = raw_stream.__aiter__()
+    # 设置 flush_interval 时，下一个 chunk 放在独立 task 中等待：时间窗口到期但上游尚无新 chunk 时
+    # 先发送已缓冲内容，再继续等待同一个 task（不取消 __anext__，避免打断上游生成器）
+    next_chunk: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if flush_interval:
+                if next_chunk is None:
+                    next_chunk = asyncio.ensure_future(anext(stream_iter))
+                if content_parts or reasoning_parts:
+                    remaining = flush_interval - (time.monotonic() - last_flush)
+                    done, _ = await asyncio.wait({next_chunk}, timeout=max(remaining, 0))
+                    if not done:
+                        yield _drain()
+                        continue
+                pending, next_chunk = next_chunk, None
+                try:
+                    chunk = await pending
+                except StopAsyncIteration:
+                    break
+            else:
+                try:
+                    chunk = await anext(stream_iter)
+                except StopAsyncIteration:
+                    break
+
+            # 错误或终止信号：立即刷新缓冲区并转发
+            if chunk.get("error") or chunk.get("done"):
+                if content_parts or reasoning_parts:
+                    yield _drain()
+                yield chunk
+                break
+
+            # 累积到缓冲区
+            c = chunk.get("content", "")
+            r = chunk.get("reasoning_content", "")
+            if c:
+                content_parts.append(c)
+                content_len += len(c)
+            if r:
+                reasoning_parts.append(r)
+                reasoning_len += len(r)
+
+            # 缓冲区达到阈值或时间窗口已满，立即发送
+            if (
+                content_len >= buffer_size
+                or reasoning_len >= buffer_size
+                or (flush_interval and (content_parts or reasoning_parts)
+                    and time.monotonic() - last_flush >= flush_interval)
+            ):
+                yield _drain()
+    finally:
+        # 下游提前关闭（如客户端断开）时，取消仍在等待的上游读取
+        if next_chunk is not None and not next_chunk.done():
+            next_chunk.cancel()
+
+    # 流正常结束但未收到 done/error 信号时，刷新剩余缓冲
+    if content_parts or reasoning_parts:
+        yield _drain()
 
 
 # 上下文构建器实例，用于生成引文指示提示词
@@ -232,7 +280,12 @@ def build_chat_middlewares():
     middlewares = []
     if settings.enable_chat_logging:
         middlewares.append(LoggingMiddleware())
-    middlewares.append(RetryMiddleware(retries=settings.chat_retry_retries, delay=settings.chat_retry_delay))
+    middlewares.append(RetryMiddleware(
+        retries=settings.chat_retry_retries,
+        delay=settings.chat_retry_delay,
+        hedge_delay=settings.chat_hedge_delay,
+        backoff_cap=settings.chat_retry_backoff_cap,
+    ))
     middlewares.append(ErrorCaptureMiddleware(log_path=settings.error_log_path))
     middlewares.append(TimeoutMiddleware(timeout=settings.chat_timeout))
     if settings.chat_fallback_provider or settings.chat_fallback_model:
@@ -243,6 +296,19 @@ def build_chat_middlewares():
     return middlewares
 
 
+# 检索阶段（vector_context）的中间件链与请求无关，导入时构建一次供各请求共用，
+# 不再逐请求实例化
+_CHAT_RETRIEVAL_MIDDLEWARES = [
+    *([LoggingMiddleware()] if settings.enable_chat_logging else []),
+    RetryMiddleware(retries=settings.chat_retry_retries, delay=settings.chat_retry_delay),
+    ErrorCaptureMiddleware(),
+]
+_STREAM_RETRIEVAL_MIDDLEWARES = [
+    *([LoggingMiddleware()] if settings.enable_search_logging else []),
+    RetryMiddleware(retries=settings.search_retry_retries, delay=settings.search_retry_delay),
+]
+
+
 class ChatRequest(BaseModel):
     doc_id: str
     question: str
@@ -902,11 +968,7 @@ async def chat_with_pdf(request: ChatRequest):
                     use_rerank=request.use_rerank, reranker_model=request.reranker_model,
                     rerank_provider=request.rerank_provider, rerank_api_key=request.rerank_api_key,
                     rerank_endpoint=request.rerank_endpoint,
-                    middlewares=[
-                        *( [LoggingMiddleware()] if settings.enable_chat_logging else [] ),
-                        RetryMiddleware(retries=settings.chat_retry_retries, delay=settings.chat_retry_delay),
-                        ErrorCaptureMiddleware()
-                    ],
+                    middlewares=_CHAT_RETRIEVAL_MIDDLEWARES,
                     selected_text=request.selected_text,
                     answer_max_tokens=_prelim_answer_tokens,
                 )
@@ -954,11 +1016,7 @@ async def chat_with_pdf(request: ChatRequest):
                 use_rerank=request.use_rerank, reranker_model=request.reranker_model,
                 rerank_provider=request.rerank_provider, rerank_api_key=request.rerank_api_key,
                 rerank_endpoint=request.rerank_endpoint,
-                middlewares=[
-                    *( [LoggingMiddleware()] if settings.enable_chat_logging else [] ),
-                    RetryMiddleware(retries=settings.chat_retry_retries, delay=settings.chat_retry_delay),
-                    ErrorCaptureMiddleware()
-                ],
+                middlewares=_CHAT_RETRIEVAL_MIDDLEWARES,
                 answer_max_tokens=_prelim_answer_tokens,
             )
             relevant_text = context_result.get("context", "")
@@ -1145,10 +1203,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     use_rerank=request.use_rerank, reranker_model=request.reranker_model,
                     rerank_provider=request.rerank_provider, rerank_api_key=request.rerank_api_key,
                     rerank_endpoint=request.rerank_endpoint,
-                    middlewares=[
-                        *( [LoggingMiddleware()] if settings.enable_search_logging else [] ),
-                        RetryMiddleware(retries=settings.search_retry_retries, delay=settings.search_retry_delay)
-                    ],
+                    middlewares=_STREAM_RETRIEVAL_MIDDLEWARES,
                     selected_text=request.selected_text,
                     answer_max_tokens=_prelim_answer_tokens_stream,
                 )
@@ -1212,10 +1267,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     use_rerank=request.use_rerank, reranker_model=request.reranker_model,
                     rerank_provider=request.rerank_provider, rerank_api_key=request.rerank_api_key,
                     rerank_endpoint=request.rerank_endpoint,
-                    middlewares=[
-                        *( [LoggingMiddleware()] if settings.enable_search_logging else [] ),
-                        RetryMiddleware(retries=settings.search_retry_retries, delay=settings.search_retry_delay)
-                    ],
+                    middlewares=_STREAM_RETRIEVAL_MIDDLEWARES,
                     answer_max_tokens=_prelim_answer_tokens_stream,
                 )
                 rt = cr.get("context", "")
@@ -1295,7 +1347,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     endpoint=_get_provider_endpoint(request.api_provider, request.api_host or ""),
                 )
                 if _do_web_search:
-                    yield f"data: {json.dumps({'type': 'web_search_status', 'phase': 'searching'}, ensure_ascii=False)}\n\n"
+                    yield _sse_event({'type': 'web_search_status', 'phase': 'searching'})
                     try:
                         web_search_sources, web_search_context = await _maybe_perform_web_search(
                             request,
@@ -1309,7 +1361,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                         logger.warning(f"联网搜索（generator 内）失败: {_ws_err}")
                         web_search_sources, web_search_context = [], ""
 
-                    yield f"data: {json.dumps({'type': 'web_search_status', 'phase': 'fetch_complete', 'count': len(web_search_sources)}, ensure_ascii=False)}\n\n"
+                    yield _sse_event({'type': 'web_search_status', 'phase': 'fetch_complete', 'count': len(web_search_sources)})
 
                 if web_search_context:
                     system_prompt += (
@@ -1321,9 +1373,9 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     messages[0]["content"] = system_prompt
 
             if web_search_sources:
-                yield f"data: {json.dumps({'type': 'web_search', 'sources': web_search_sources}, ensure_ascii=False)}\n\n"
+                yield _sse_event({'type': 'web_search', 'sources': web_search_sources})
             if not use_agent and not image_list:
-                yield f"data: {json.dumps({'type': 'retrieval_progress', 'phase': 'complete', 'message': '检索完成'}, ensure_ascii=False)}\n\n"
+                yield _sse_event({'type': 'retrieval_progress', 'phase': 'complete', 'message': '检索完成'})
             # 使用 _buffered_stream 包装流式输出，合并高频小 chunk 减少 SSE 事件频率
             adjusted_stream_max_tokens = _adjust_max_tokens(
                 request.max_tokens, request.answer_detail, has_structured_citations,
@@ -1355,9 +1407,10 @@ async def chat_with_pdf_stream(request: ChatRequest):
                 except Exception as exc:
                     logger.warning(f"并行引文匹配失败: {exc}")
 
-            async for chunk in _buffered_stream(raw_stream):
+            flush_interval = settings.stream_flush_interval_ms / 1000 if settings.stream_flush_interval_ms > 0 else None
+            async for chunk in _buffered_stream(raw_stream, flush_interval):
                 if chunk.get("error"):
-                    yield f"data: {json.dumps({'error': chunk['error']})}\n\n"
+                    yield _sse_event({'error': chunk['error']})
                     break
 
                 content = chunk.get('content', '')
@@ -1407,7 +1460,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     }
                     if qa_score_val is not None:
                         chunk_data['qa_score'] = qa_score_val
-                    yield f"data: {json.dumps(chunk_data)}\n\n"
+                    yield _sse_event(chunk_data)
 
                     if use_memory: threading.Thread(target=_async_memory_write, args=(memory_service, request), daemon=True).start()
                     # 异步生成追问建议
@@ -1422,7 +1475,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                             endpoint=_get_provider_endpoint(request.api_provider, request.api_host or ""),
                         )
                         if followups:
-                            yield f"data: {json.dumps({'type': 'followup_questions', 'questions': followups}, ensure_ascii=False)}\n\n"
+                            yield _sse_event({'type': 'followup_questions', 'questions': followups})
                     except Exception as e:
                         logger.debug(f"追问建议生成失败（不影响主流程）: {e}")
                     # 首轮对话自动命名
@@ -1439,7 +1492,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                                 endpoint=_get_provider_endpoint(request.api_provider, request.api_host or ""),
                             )
                             if conv_name:
-                                yield f"data: {json.dumps({'type': 'conv_name', 'name': conv_name}, ensure_ascii=False)}\n\n"
+                                yield _sse_event({'type': 'conv_name', 'name': conv_name})
                         except Exception as e:
                             logger.debug(f"会话命名失败（不影响主流程）: {e}")
                     # 思维导图生成（仅有检索上下文时）
@@ -1454,7 +1507,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                                 endpoint=_get_provider_endpoint(request.api_provider, request.api_host or ""),
                             )
                             if mindmap_md:
-                                yield f"data: {json.dumps({'type': 'mindmap', 'markdown': mindmap_md}, ensure_ascii=False)}\n\n"
+                                yield _sse_event({'type': 'mindmap', 'markdown': mindmap_md})
                         except Exception as e:
                             logger.debug(f"思维导图生成失败（不影响主流程）: {e}")
                     yield "data: [DONE]\n\n"
@@ -1485,7 +1538,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                             # 提取 FINAL ANSWER 之后的内容并发送
                             after_marker = full_output.split(START_ANSWER, 1)[1].lstrip()
                             if after_marker:
-                                yield f"data: {json.dumps({'content': after_marker, 'reasoning_content': reasoning, 'done': False, 'used_provider': chunk.get('used_provider'), 'used_model': chunk.get('used_model'), 'fallback_used': chunk.get('fallback_used')})}\n\n"
+                                yield _sse_event({'content': after_marker, 'reasoning_content': reasoning, 'done': False, 'used_provider': chunk.get('used_provider'), 'used_model': chunk.get('used_model'), 'fallback_used': chunk.get('fallback_used')})
                         # 不展示 CITATION LIST 部分
                         continue
                     else:
@@ -1495,7 +1548,7 @@ async def chat_with_pdf_stream(request: ChatRequest):
                             # 仅保留 CITATION LIST 之前的内容（如有），其余丢弃
                             clean_part = content.split(START_CITATION, 1)[0]
                             if clean_part:
-                                yield f"data: {json.dumps({'content': clean_part, 'reasoning_content': reasoning, 'done': False, 'used_provider': chunk.get('used_provider'), 'used_model': chunk.get('used_model'), 'fallback_used': chunk.get('fallback_used')})}\n\n"
+                                yield _sse_event({'content': clean_part, 'reasoning_content': reasoning, 'done': False, 'used_provider': chunk.get('used_provider'), 'used_model': chunk.get('used_model'), 'fallback_used': chunk.get('fallback_used')})
                             continue
 
                 chunk_data = {
@@ -1503,9 +1556,9 @@ async def chat_with_pdf_stream(request: ChatRequest):
                     'done': False, 'used_provider': chunk.get('used_provider'),
                     'used_model': chunk.get('used_model'), 'fallback_used': chunk.get('fallback_used'),
                 }
-                yield f"data: {json.dumps(chunk_data)}\n\n"
+                yield _sse_event(chunk_data)
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse_event({'error': str(e)})
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
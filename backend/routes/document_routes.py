@@ -33,6 +33,7 @@ from services.ocr_service import (
 )
 from models.model_detector import normalize_embedding_model_id
 from config import settings
+from utils.query_cache import search_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -1465,6 +1466,7 @@ async def upload_pdf(
                     "pdf_url": None,
                 }
                 save_document(doc_id, documents_store[doc_id])
+                search_result_cache.invalidate(doc_id)
                 create_index(
                     doc_id, extracted_data["full_text"], str(VECTOR_STORE_DIR),
                     embedding_model, embedding_api_key, embedding_api_host,
@@ -1525,6 +1527,7 @@ async def upload_pdf(
         }
 
         save_document(doc_id, documents_store[doc_id])
+        search_result_cache.invalidate(doc_id)
 
         create_index(doc_id, extracted_data["full_text"], str(VECTOR_STORE_DIR), embedding_model, embedding_api_key, embedding_api_host, pages=extracted_data.get("pages"))
 
@@ -1609,6 +1612,7 @@ async def import_url(
         }
 
         save_document(doc_id, documents_store[doc_id])
+        search_result_cache.invalidate(doc_id)
 
         create_index(
             doc_id, content, str(VECTOR_STORE_DIR),
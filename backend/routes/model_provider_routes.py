@@ -1,8 +1,17 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import re
+from collections import defaultdict
 from datetime import datetime
 from typing import List, Optional
+from urllib.parse import urlsplit
 
 import httpx
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from models.provider_registry import PROVIDER_CONFIG
@@ -10,14 +19,128 @@ from models.rerank_registry import RERANK_PROVIDERS
 from models.dynamic_store import (
     load_dynamic_providers,
     save_dynamic_providers,
+    stage_dynamic_providers,
     load_dynamic_models,
     save_dynamic_models,
+    stage_dynamic_models,
+    get_store_version,
+)
+from models.model_detector import (
+    infer_model_tags,
+    EMBEDDING_REGEX,
+    NOT_SUPPORTED_REGEX,
+    RERANKING_REGEX,
 )
-from models.model_detector import infer_model_tags, is_embedding_model, is_rerank_model, NOT_SUPPORTED_REGEX
 from models.api_key_selector import select_api_key
 
+try:
+    from sentence_transformers import SentenceTransformer
+    _HAS_SENTENCE_TRANSFORMERS = True
+except (ImportError, OSError):
+    _HAS_SENTENCE_TRANSFORMERS = False
+
+
+logger = logging.getLogger(__name__)
+
+# 响应体统一走 orjson 序列化，/models 等大 dict 的编码开销显著下降
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 模块级共享 HTTP 客户端：Provider 探测/模型测试复用连接池，避免每次请求重新握手 TCP+TLS
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """获取共享的 httpx.AsyncClient（惰性创建，关闭后自动重建）。
+
+    超时按请求单独传入，客户端本身只承载连接池配置。
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=1000,
+                max_keepalive_connections=100,
+                keepalive_expiry=30,
+            ),
+        )
+    return _HTTP_CLIENT
+
+
+@router.on_event("startup")
+async def _open_http_client():
+    """应用启动时预先创建共享 HTTP 客户端"""
+    _get_http_client()
+
+
+@router.on_event("shutdown")
+async def _close_http_client():
+    """应用关闭时释放共享 HTTP 客户端的连接池"""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None and not _HTTP_CLIENT.is_closed:
+        await _HTTP_CLIENT.aclose()
+    _HTTP_CLIENT = None
+
+
+# 动态 provider/模型的延迟落盘：防抖窗口内的连续修改合并为一次写入，写盘在线程中执行
+_SAVE_DEBOUNCE_SECONDS = 0.1
+_PENDING_SAVES: dict = {}  # "providers" | "models" -> 待落盘的最新快照
+_SAVE_TASKS: dict = {}
+
+
+def _schedule_save(kind: str, data: dict):
+    """立即更新内存快照（读己之写），并安排防抖后的异步落盘"""
+    if kind == "providers":
+        stage_dynamic_providers(data)
+    else:
+        stage_dynamic_models(data)
+    _invalidate_models_cache()
+    _PENDING_SAVES[kind] = data
+    task = _SAVE_TASKS.get(kind)
+    if task is None or task.done():
+        _SAVE_TASKS[kind] = asyncio.create_task(_debounced_save(kind))
+
+
+async def _debounced_save(kind: str):
+    # 落盘期间若又有新修改，继续下一轮，保证最终写入的是最新快照
+    while kind in _PENDING_SAVES:
+        await asyncio.sleep(_SAVE_DEBOUNCE_SECONDS)
+        if not await _flush_pending_save(kind):
+            # 写盘失败：快照保留在 _PENDING_SAVES 中，下次修改或应用关闭时重试，避免失败时空转
+            break
+
 
-router = APIRouter()
+async def _flush_pending_save(kind: str) -> bool:
+    """落盘指定类型的待写快照，返回是否成功；失败时把快照放回待写队列"""
+    data = _PENDING_SAVES.pop(kind, None)
+    if data is None:
+        return True
+    save = save_dynamic_providers if kind == "providers" else save_dynamic_models
+    try:
+        await asyncio.to_thread(save, data)
+    except Exception as e:
+        logger.error(f"保存动态{kind}配置失败: {e}")
+        # 写盘期间若已有更新的快照，保留更新的那份
+        _PENDING_SAVES.setdefault(kind, data)
+        return False
+    return True
+
+
+async def _flush_pending_saves():
+    """立即落盘所有待写入的修改，并等待进行中的写盘完成
+
+    各类型独立落盘，一类失败不影响其他类型写入；失败的快照仍留在 _PENDING_SAVES 中。
+    """
+    await asyncio.gather(*_SAVE_TASKS.values(), return_exceptions=True)
+    _SAVE_TASKS.clear()
+    for kind in list(_PENDING_SAVES):
+        await _flush_pending_save(kind)
+
+
+@router.on_event("shutdown")
+async def _flush_dynamic_store():
+    """应用关闭前确保动态配置已写盘"""
+    await _flush_pending_saves()
 
 
 def _pick_first(*values):
@@ -62,8 +185,96 @@ def _get_provider_type(provider_id: str) -> str:
     return merged_providers.get(provider_id, {}).get("type", provider_id)
 
 
-@router.get("/models")
-async def get_models():
+# 从前端 systemModels.ts 同步的 chat 模型列表
+# 这些模型不在 EMBEDDING_MODELS 中，但前端需要通过 /models API 获取
+CHAT_MODELS = {
+    "openai": {
+        "gpt-4.1": "GPT-4.1",
+        "gpt-4.1-mini": "GPT-4.1 mini",
+        "o3": "OpenAI o3",
+        "o4-mini": "OpenAI o4-mini",
+        "gpt-4o": "GPT-4o",
+        "gpt-4o-mini": "GPT-4o mini",
+    },
+    "aliyun": {
+        "qwen3-max": "Qwen3-Max",
+        "qwen3.5-plus": "Qwen3.5-Plus",
+        "qwen-plus": "Qwen-Plus",
+        "qwen-turbo": "Qwen-Turbo",
+    },
+    "deepseek": {
+        "deepseek-chat": "DeepSeek V3",
+        "deepseek-reasoner": "DeepSeek R1",
+    },
+    "moonshot": {
+        "kimi-k2.5": "Kimi K2.5",
+        "kimi-k2": "Kimi K2",
+        "moonshot-v1-128k": "Moonshot v1 128K",
+        "moonshot-v1-32k": "Moonshot v1 32K",
+        "moonshot-v1-8k": "Moonshot v1 8K",
+    },
+    "zhipu": {
+        "glm-5": "GLM-5",
+        "glm-4.7": "GLM-4.7",
+        "glm-4.5": "GLM-4.5",
+        "glm-4.5-air": "GLM-4.5-Air",
+        "glm-4-air": "GLM-4-Air",
+    },
+    "minimax": {
+        "MiniMax-Text-01": "MiniMax Text-01",
+        "abab6.5s-chat": "abab6.5s-chat",
+    },
+    "silicon": {
+        "deepseek-ai/DeepSeek-R1": "DeepSeek R1 (SiliconFlow)",
+        "deepseek-ai/DeepSeek-V3": "DeepSeek V3 (SiliconFlow)",
+        "Qwen/Qwen3-235B-A22B": "Qwen3-235B (SiliconFlow)",
+        "Qwen/Qwen2.5-7B-Instruct": "Qwen2.5 7B (SiliconFlow)",
+    },
+    "anthropic": {
+        "claude-opus-4-6": "Claude Opus 4.6",
+        "claude-sonnet-4-6": "Claude Sonnet 4.6",
+        "claude-opus-4-5": "Claude Opus 4.5",
+        "claude-sonnet-4-5": "Claude Sonnet 4.5",
+        "claude-haiku-3-5": "Claude Haiku 3.5",
+    },
+    "gemini": {
+        "gemini-3-pro": "Gemini 3 Pro",
+        "gemini-3-flash": "Gemini 3 Flash",
+        "gemini-2.5-pro": "Gemini 2.5 Pro",
+        "gemini-2.5-flash": "Gemini 2.5 Flash",
+        "gemini-2.5-flash-lite": "Gemini 2.5 Flash-Lite",
+    },
+    "grok": {
+        "grok-4": "Grok 4",
+        "grok-4-1-fast": "Grok 4.1 Fast",
+        "grok-3": "Grok 3",
+        "grok-3-mini": "Grok 3 Mini",
+    },
+}
+
+# /models 响应缓存：version 在动态 provider/模型增删时递增，body/etag 置空后按需重建
+# soa/groups 为按同一 version 惰性重建的模型展平数组及其分组
+# store_version 记录构建缓存时 dynamic_store 的版本，配置文件被外部修改或其他路径写入时据此失效
+_MODELS_CACHE = {
+    "etag": None,
+    "body": None,
+    "version": 0,
+    "store_version": -1,
+    "soa": None,
+    "groups": None,
+    "groups_version": -1,
+}
+
+
+def _invalidate_models_cache():
+    """动态 provider/模型变更后使 /models 缓存失效"""
+    _MODELS_CACHE["version"] += 1
+    _MODELS_CACHE["body"] = None
+    _MODELS_CACHE["etag"] = None
+
+
+@router.get("/models", response_model=None)
+async def get_models(request: Request):
     """获取可用模型/Provider列表（含静态+动态），按 provider 分组
 
     返回结构：
@@ -81,133 +292,122 @@ async def get_models():
     }
 
     前端通过 availableModels[apiProvider]?.models 访问。
+    序列化后的响应体在动态配置（含外部直接修改的配置文件）变更前一直缓存，并通过 ETag 支持 If-None-Match 协商。
     """
-    from models.model_registry import EMBEDDING_MODELS
-    from urllib.parse import urlparse
+    # 加载时只 stat 比较 mtime，文件被外部修改会使 store 版本递增
+    load_dynamic_providers()
+    load_dynamic_models()
+    store_version = get_store_version()
+    if _MODELS_CACHE["store_version"] != store_version:
+        _invalidate_models_cache()
+        _MODELS_CACHE["store_version"] = store_version
+
+    if _MODELS_CACHE["body"] is None:
+        body = orjson.dumps(_build_models_payload())
+        _MODELS_CACHE["body"] = body
+        _MODELS_CACHE["etag"] = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    etag = _MODELS_CACHE["etag"]
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=_MODELS_CACHE["body"], media_type="application/json", headers={"ETag": etag})
+
+
+@functools.lru_cache(maxsize=512)
+def _extract_domain(url: str) -> str:
+    """从 URL 中提取域名，用于匹配 provider
+
+    使用比 urlparse 更轻量的 urlsplit（不解析 ;params），结果按 URL 缓存。
+    """
+    if not url:
+        return ""
+    return urlsplit(url).netloc or ""
 
-    merged_providers = {**PROVIDER_CONFIG, **load_dynamic_providers()}
-    merged_models = {**EMBEDDING_MODELS, **load_dynamic_models()}
-
-    # 从前端 systemModels.ts 同步的 chat 模型列表
-    # 这些模型不在 EMBEDDING_MODELS 中，但前端需要通过 /models API 获取
-    CHAT_MODELS = {
-        "openai": {
-            "gpt-4.1": "GPT-4.1",
-            "gpt-4.1-mini": "GPT-4.1 mini",
-            "o3": "OpenAI o3",
-            "o4-mini": "OpenAI o4-mini",
-            "gpt-4o": "GPT-4o",
-            "gpt-4o-mini": "GPT-4o mini",
-        },
-        "aliyun": {
-            "qwen3-max": "Qwen3-Max",
-            "qwen3.5-plus": "Qwen3.5-Plus",
-            "qwen-plus": "Qwen-Plus",
-            "qwen-turbo": "Qwen-Turbo",
-        },
-        "deepseek": {
-            "deepseek-chat": "DeepSeek V3",
-            "deepseek-reasoner": "DeepSeek R1",
-        },
-        "moonshot": {
-            "kimi-k2.5": "Kimi K2.5",
-            "kimi-k2": "Kimi K2",
-            "moonshot-v1-128k": "Moonshot v1 128K",
-            "moonshot-v1-32k": "Moonshot v1 32K",
-            "moonshot-v1-8k": "Moonshot v1 8K",
-        },
-        "zhipu": {
-            "glm-5": "GLM-5",
-            "glm-4.7": "GLM-4.7",
-            "glm-4.5": "GLM-4.5",
-            "glm-4.5-air": "GLM-4.5-Air",
-            "glm-4-air": "GLM-4-Air",
-        },
-        "minimax": {
-            "MiniMax-Text-01": "MiniMax Text-01",
-            "abab6.5s-chat": "abab6.5s-chat",
-        },
-        "silicon": {
-            "deepseek-ai/DeepSeek-R1": "DeepSeek R1 (SiliconFlow)",
-            "deepseek-ai/DeepSeek-V3": "DeepSeek V3 (SiliconFlow)",
-            "Qwen/Qwen3-235B-A22B": "Qwen3-235B (SiliconFlow)",
-            "Qwen/Qwen2.5-7B-Instruct": "Qwen2.5 7B (SiliconFlow)",
-        },
-        "anthropic": {
-            "claude-opus-4-6": "Claude Opus 4.6",
-            "claude-sonnet-4-6": "Claude Sonnet 4.6",
-            "claude-opus-4-5": "Claude Opus 4.5",
-            "claude-sonnet-4-5": "Claude Sonnet 4.5",
-            "claude-haiku-3-5": "Claude Haiku 3.5",
-        },
-        "gemini": {
-            "gemini-3-pro": "Gemini 3 Pro",
-            "gemini-3-flash": "Gemini 3 Flash",
-            "gemini-2.5-pro": "Gemini 2.5 Pro",
-            "gemini-2.5-flash": "Gemini 2.5 Flash",
-            "gemini-2.5-flash-lite": "Gemini 2.5 Flash-Lite",
-        },
-        "grok": {
-            "grok-4": "Grok 4",
-            "grok-4-1-fast": "Grok 4.1 Fast",
-            "grok-3": "Grok 3",
-            "grok-3-mini": "Grok 3 Mini",
-        },
-    }
 
-    def _extract_domain(url: str) -> str:
-        """从 URL 中提取域名，用于匹配 provider"""
-        if not url:
-            return ""
-        parsed = urlparse(url)
-        return parsed.netloc or ""
+def _flatten_models(merged_models: dict) -> dict:
+    """将 merged_models 一次性展平为并行数组（Structure of Arrays）
 
-    # 预计算每个 provider 的域名，用于通过 base_url 区分同 type 的不同服务商
-    provider_domains = {}
-    for pid, pconfig in merged_providers.items():
-        endpoint = pconfig.get("endpoint", "")
-        provider_domains[pid] = _extract_domain(endpoint)
+    后续分组只需顺序遍历各数组，避免在循环里反复做 dict 查找和 URL 解析。
+    """
+    soa = {"ids": [], "names": [], "providers": [], "provider_ids": [], "domains": []}
+    for model_id, model_config in merged_models.items():
+        soa["ids"].append(model_id)
+        soa["names"].append(model_config.get("name", model_id))
+        soa["providers"].append(model_config.get("provider", ""))
+        soa["provider_ids"].append(model_config.get("provider_id") or model_config.get("providerId"))
+        soa["domains"].append(_extract_domain(model_config.get("base_url", "")))
+    soa["positions"] = {model_id: i for i, model_id in enumerate(soa["ids"])}
+    return soa
+
+
+def _group_models(soa: dict) -> dict:
+    """按 provider 归属规则把模型分到互不相交的桶中，桶内为 {model_id: 显示名}
+
+    - ("local",): 本地模型，只归属于 local provider
+    - ("provider_id", pid): 显式保存 provider_id 的新格式动态模型
+    - ("type_domain", provider_type, domain): 按 provider type + base_url 域名匹配
+    - ("type", provider_type): 未配置 base_url 的旧动态数据，按 providerId 直接归属
+    """
+    groups = defaultdict(dict)
+    for model_id, name, provider_type, provider_id, domain in zip(
+        soa["ids"], soa["names"], soa["providers"], soa["provider_ids"], soa["domains"]
+    ):
+        if provider_type == "local":
+            key = ("local",)
+        elif provider_id:
+            key = ("provider_id", provider_id)
+        elif domain:
+            key = ("type_domain", provider_type, domain)
+        else:
+            key = ("type", provider_type)
+        groups[key][model_id] = name
+    return dict(groups)
 
-    result = {}
-    for provider_id, provider_config in merged_providers.items():
-        # 收集该 provider 下的 embedding/rerank 模型
-        provider_models = {}
-        provider_domain = provider_domains.get(provider_id, "")
-        provider_type = provider_config.get("type", provider_id)
 
-        for model_id, model_config in merged_models.items():
-            model_provider_type = model_config.get("provider", "")
-            model_provider_id = model_config.get("provider_id") or model_config.get("providerId")
+def _get_model_groups() -> tuple:
+    """返回 (soa, groups)，仅在 /models 缓存 version 变化时重建"""
+    from models.model_registry import EMBEDDING_MODELS
 
-            # 本地模型只归属于 local provider
-            if model_provider_type == "local":
-                if provider_id == "local":
-                    provider_models[model_id] = model_config.get("name", model_id)
-                continue
+    if _MODELS_CACHE["groups"] is None or _MODELS_CACHE["groups_version"] != _MODELS_CACHE["version"]:
+        soa = _flatten_models({**EMBEDDING_MODELS, **load_dynamic_models()})
+        _MODELS_CACHE["soa"] = soa
+        _MODELS_CACHE["groups"] = _group_models(soa)
+        _MODELS_CACHE["groups_version"] = _MODELS_CACHE["version"]
+    return _MODELS_CACHE["soa"], _MODELS_CACHE["groups"]
 
-            # 新格式动态模型：显式保存 provider_id，优先按 provider_id 归属
-            if model_provider_id:
-                if model_provider_id == provider_id:
-                    provider_models[model_id] = model_config.get("name", model_id)
-                continue
 
-            # 非本地模型：先匹配 provider type，再通过 base_url 域名区分
-            if model_provider_type not in {provider_type, provider_id}:
-                continue
+def _build_models_payload() -> dict:
+    """合并静态与动态配置，构建 /models 的返回结构"""
+    merged_providers = {**PROVIDER_CONFIG, **load_dynamic_providers()}
+    soa, groups = _get_model_groups()
+    positions = soa["positions"]
 
-            model_base_url = model_config.get("base_url", "")
-            model_domain = _extract_domain(model_base_url)
+    result = {}
+    for provider_id, provider_config in merged_providers.items():
+        # 通过 endpoint 域名区分同 type 的不同服务商
+        provider_domain = _extract_domain(provider_config.get("endpoint", ""))
+        provider_type = provider_config.get("type", provider_id)
 
-            # 通过域名匹配区分同 type 的不同服务商
-            if provider_domain and model_domain and provider_domain == model_domain:
-                provider_models[model_id] = model_config.get("name", model_id)
-            elif not model_domain and model_provider_type == provider_id:
-                # 兼容旧动态数据：未配置 base_url 时按 providerId 直接归属
-                provider_models[model_id] = model_config.get("name", model_id)
+        keys = [("provider_id", provider_id), ("type", provider_id)]
+        if provider_id == "local":
+            keys.append(("local",))
+        if provider_domain:
+            keys.append(("type_domain", provider_type, provider_domain))
+            if provider_type != provider_id:
+                keys.append(("type_domain", provider_id, provider_domain))
+
+        buckets = [groups[key] for key in keys if key in groups]
+        if len(buckets) == 1:
+            provider_models = dict(buckets[0])
+        else:
+            # 多个桶命中时按模型原始顺序合并，保持与配置文件一致的展示顺序
+            merged = {model_id: name for bucket in buckets for model_id, name in bucket.items()}
+            provider_models = {
+                model_id: merged[model_id] for model_id in sorted(merged, key=positions.__getitem__)
+            }
 
         # 合并 chat 模型
-        chat_models = CHAT_MODELS.get(provider_id, {})
-        provider_models.update(chat_models)
+        provider_models.update(CHAT_MODELS.get(provider_id, {}))
 
         result[provider_id] = {
             **provider_config,
@@ -228,6 +428,7 @@ class ProviderTestRequest(BaseModel):
     apiKey: str
     apiHost: str
     fetchModelsEndpoint: str | None = None
+    probeOnly: bool = False  # 仅做连通性探测（HEAD），不拉取模型列表
 
 
 def _build_endpoint(base: str, path: str | None) -> str:
@@ -240,6 +441,10 @@ def _build_endpoint(base: str, path: str | None) -> str:
     return f"{base_clean}/{path_clean}"
 
 
+# 已知的 chat/embedding 尾部路径，按长度降序排列，保证 /v1/chat/completions 整体被去掉
+_API_SUFFIX_REGEX = re.compile(r"(?:/v1/chat/completions|/chat/completions|/embeddings|/completions)$")
+
+
 def _normalize_api_host(provider_id: str, api_host: str | None) -> str:
     """
     把传入的 api_host 还原成可拼接 /models 的 base url。
@@ -253,60 +458,76 @@ def _normalize_api_host(provider_id: str, api_host: str | None) -> str:
         return host
 
     # 去掉已知的 API 尾部路径，保留 base path
-    known_suffixes = [
-        "/chat/completions",
-        "/completions",
-        "/embeddings",
-        "/v1/chat/completions",
-    ]
-    for suffix in known_suffixes:
-        if host.endswith(suffix):
-            host = host[: -len(suffix)]
-            break
+    host = _API_SUFFIX_REGEX.sub("", host.rstrip("/"))
 
     return host.rstrip("/")
 
 
 
+async def _probe_models_endpoint(url: str, headers: dict):
+    """请求单个模型列表端点，返回 (url, data, error, is_auth_error)，成功时 error 为 None"""
+    try:
+        response = await _get_http_client().get(url, headers=headers, timeout=10.0)
+        if response.status_code == 200:
+            return url, response.json(), None, False
+        # 401/403 表示 API Key 无效
+        if response.status_code in (401, 403):
+            try:
+                err_body = response.json()
+                err_msg = (
+                    err_body.get("error", {}).get("message")
+                    or err_body.get("message")
+                    or str(err_body)
+                )
+            except Exception:
+                err_msg = response.text[:200]
+            auth_error = f"API Key 无效或格式错误（HTTP {response.status_code}）: {err_msg}"
+            return url, None, auth_error, True
+        return url, None, f"HTTP {response.status_code}", False
+    except Exception as e:
+        return url, None, str(e), False
+
+
 async def _fetch_models_with_fallback(api_host: str, api_key: str, endpoints: List[str]):
+    """并发请求候选模型列表端点
+
+    返回 (data, url_or_error, kind)，kind 取值：
+    - "ok": 获取成功，第二项为命中的 URL
+    - "auth_error": 401/403 认证失败（key 错误），第二项为错误信息
+    - "transport_error": 端点不存在、网络错误等，第二项为错误信息
+    """
     # 从 API Key 池中随机选择一个有效 Key（支持逗号分隔的多 Key 轮换）
     actual_key = select_api_key(api_key) if api_key else None
     if not actual_key:
-        return None, "API Key 池为空，无法发送请求"
+        return None, "API Key 池为空，无法发送请求", "transport_error"
     headers = {
         "Authorization": f"Bearer {actual_key}",
         "Content-Type": "application/json"
     }
-    last_error = None
-    auth_error = None  # 记录 401/403 认证失败，用于区分「key错误」和「端点不存在」
 
-    for ep in endpoints:
-        if not ep:
-            continue
-        url = _build_endpoint(api_host, ep)
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json(), url
-            # 401/403 表示 API Key 无效，立即返回认证失败（不继续尝试其他 endpoint）
-            if response.status_code in (401, 403):
-                try:
-                    err_body = response.json()
-                    err_msg = (
-                        err_body.get("error", {}).get("message")
-                        or err_body.get("message")
-                        or str(err_body)
-                    )
-                except Exception:
-                    err_msg = response.text[:200]
-                auth_error = f"API Key 无效或格式错误（HTTP {response.status_code}）: {err_msg}"
-                return None, auth_error
-            last_error = f"HTTP {response.status_code}"
-        except Exception as e:
-            last_error = str(e)
-            continue
-    return None, last_error
+    # 候选端点去重后并发请求，取最先成功的结果，最坏延迟从 N×timeout 降到约 1×timeout
+    urls = list(dict.fromkeys(_build_endpoint(api_host, ep) for ep in endpoints if ep))
+    if not urls:
+        return None, None, "transport_error"
+
+    tasks = [asyncio.create_task(_probe_models_endpoint(url, headers)) for url in urls]
+    errors = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            url, data, error, is_auth_error = await next_done
+            if error is None:
+                return data, url, "ok"
+            # 认证失败（key 错误）立即返回，区别于「端点不存在」，不再等待其他 endpoint
+            if is_auth_error:
+                return None, error, "auth_error"
+            errors[url] = error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # 全部失败时按原端点顺序返回最后一个错误
+    return None, errors[urls[-1]], "transport_error"
 
 
 @router.post("/api/providers/test")
@@ -325,10 +546,23 @@ async def test_provider_connection(request: ProviderTestRequest):
                 "latency": latency
             }
 
+        if request.probeOnly:
+            # 单次 HEAD 探测：只关心服务器是否可达及延迟，非 5xx 即视为连通
+            actual_key = select_api_key(request.apiKey) if request.apiKey else None
+            headers = {"Authorization": f"Bearer {actual_key}"} if actual_key else {}
+            response = await _get_http_client().head(request.apiHost, headers=headers, timeout=5.0)
+            if response.status_code >= 500:
+                return {"success": False, "message": f"服务器返回错误（HTTP {response.status_code}）"}
+            return {
+                "success": True,
+                "message": "连接成功",
+                "latency": int((time() - start_time) * 1000)
+            }
+
         endpoints = [request.fetchModelsEndpoint or "/models", "/v1/models", "/models"]
-        data, last_error = await _fetch_models_with_fallback(request.apiHost, request.apiKey, endpoints)
+        data, last_error, kind = await _fetch_models_with_fallback(request.apiHost, request.apiKey, endpoints)
 
-        if data is not None:
+        if kind == "ok":
             model_count = len(data.get('data', [])) if isinstance(data.get('data'), list) else 0
             latency = int((time() - start_time) * 1000)
             return {
@@ -339,7 +573,7 @@ async def test_provider_connection(request: ProviderTestRequest):
             }
 
         # 401/403 认证失败：API Key 无效或格式错误
-        if last_error and ("401" in last_error or "403" in last_error or "API Key 无效" in last_error):
+        if kind == "auth_error":
             return {"success": False, "message": last_error}
 
         # 虽然未获取到模型列表，但连接本身成功（服务器可达且未返回 401/403）
@@ -362,6 +596,98 @@ async def test_provider_connection(request: ProviderTestRequest):
         return {"success": False, "message": f"测试失败：{str(e)}"}
 
 
+def _wrap_preset_models(provider_id: str, presets: list[dict]) -> list[dict]:
+    """将预设模型包装为 /api/models/fetch 的返回格式（tags 在此一次性推断）"""
+    return [
+        {
+            "id": m["id"],
+            "name": m["name"],
+            "providerId": provider_id,
+            "type": m["type"],
+            "capabilities": [{"type": m["type"], "isUserSelected": False}],
+            "tags": infer_model_tags(m["id"]),
+            "metadata": m["metadata"],
+            "isSystem": True,
+            "isUserAdded": False
+        }
+        for m in presets
+    ]
+
+
+# Anthropic Claude：使用非 OpenAI 格式 API，返回预设模型列表
+ANTHROPIC_PRESET_MODELS = [
+    {"id": "claude-opus-4-6", "name": "Claude Opus 4.6", "type": "chat",
+     "metadata": {"description": "Anthropic 旗舰模型，200K 上下文，最强编程与推理，支持 1M 上下文 (beta)"}},
+    {"id": "claude-sonnet-4-6", "name": "Claude Sonnet 4.6", "type": "chat",
+     "metadata": {"description": "Anthropic 最新均衡模型，Opus 级别推理能力，200K 上下文，同等价格"}},
+    {"id": "claude-opus-4-5", "name": "Claude Opus 4.5", "type": "chat",
+     "metadata": {"description": "Claude Opus 系列前代，超强编程、Agent 工作流"}},
+    {"id": "claude-sonnet-4-5", "name": "Claude Sonnet 4.5", "type": "chat",
+     "metadata": {"description": "Claude 均衡前代版本，高性价比"}},
+    {"id": "claude-haiku-3-5", "name": "Claude Haiku 3.5", "type": "chat",
+     "metadata": {"description": "最快速轻量 Claude 模型，低成本高并发"}},
+]
+
+# Google Gemini：返回预设模型列表
+GEMINI_PRESET_MODELS = [
+    {"id": "gemini-3-pro", "name": "Gemini 3 Pro", "type": "chat",
+     "metadata": {"description": "Google 最新旗舰推理模型，1M 上下文，自适应思考，强多模态 (preview)"}},
+    {"id": "gemini-3-flash", "name": "Gemini 3 Flash", "type": "chat",
+     "metadata": {"description": "Google 最新多模态理解模型，强编程与推理 (preview)"}},
+    {"id": "gemini-2.5-pro", "name": "Gemini 2.5 Pro", "type": "chat",
+     "metadata": {"description": "Gemini 旗舰稳定版，1M 上下文，自适应思考"}},
+    {"id": "gemini-2.5-flash", "name": "Gemini 2.5 Flash", "type": "chat",
+     "metadata": {"description": "Gemini 快速均衡版，可控推理预算"}},
+    {"id": "gemini-2.5-flash-lite", "name": "Gemini 2.5 Flash-Lite", "type": "chat",
+     "metadata": {"description": "Gemini 超轻量版，大规模低成本场景"}},
+]
+
+# 字节跳动豆包：火山引擎 Ark API 不提供 GET /models 端点，返回预设模型列表
+DOUBAO_PRESET_MODELS = [
+    {"id": "doubao-seed-2-0-pro", "name": "Doubao Seed 2.0 Pro", "type": "chat",
+     "metadata": {"description": "豆包 2.0 旗舰模型，对标 GPT-5.2 / Gemini 3 Pro，支持长链路推理与多模态"}},
+    {"id": "doubao-seed-2-0-lite-260215", "name": "Doubao Seed 2.0 Lite", "type": "chat",
+     "metadata": {"description": "豆包 2.0 Lite，均衡性能与成本，能力超越上一代豆包 1.8"}},
+    {"id": "doubao-seed-2-0-mini-260215", "name": "Doubao Seed 2.0 Mini", "type": "chat",
+     "metadata": {"description": "豆包 2.0 Mini，低延迟高并发，适合成本敏感场景"}},
+    {"id": "doubao-seed-2-0-code-preview-260215", "name": "Doubao Seed 2.0 Code", "type": "chat",
+     "metadata": {"description": "豆包 2.0 编程专项模型，深度优化 Agentic Coding 场景"}},
+    {"id": "doubao-seed-1-8", "name": "Doubao Seed 1.8", "type": "chat",
+     "metadata": {"description": "豆包 1.8，上一代主力模型，多模态 Agent 场景优化"}},
+    {"id": "doubao-1-5-pro-32k-250115", "name": "Doubao 1.5 Pro 32K", "type": "chat",
+     "metadata": {"description": "豆包 1.5 Pro，32K 上下文"}},
+    {"id": "doubao-embedding-large-250104", "name": "Doubao Embedding Large", "type": "embedding",
+     "metadata": {"dimension": 4096, "maxTokens": 32768, "description": "豆包大尺寸嵌入模型"}},
+    {"id": "doubao-embedding-250104", "name": "Doubao Embedding", "type": "embedding",
+     "metadata": {"dimension": 2048, "maxTokens": 32768, "description": "豆包标准嵌入模型"}},
+]
+
+# 预设模型的响应体在导入时一次性构建，请求时只需附加 timestamp
+_ANTHROPIC_PAYLOAD_MODELS = _wrap_preset_models("anthropic", ANTHROPIC_PRESET_MODELS)
+_GEMINI_PAYLOAD_MODELS = _wrap_preset_models("gemini", GEMINI_PRESET_MODELS)
+_DOUBAO_PAYLOAD_MODELS = _wrap_preset_models("doubao", DOUBAO_PRESET_MODELS)
+_LOCAL_PAYLOAD_MODELS = [
+    {
+        "id": "all-MiniLM-L6-v2",
+        "name": "MiniLM-L6-v2",
+        "providerId": "local",
+        "type": "embedding",
+        "metadata": {"dimension": 384, "maxTokens": 256, "description": "快速通用模型"},
+        "isSystem": True,
+        "isUserAdded": False
+    },
+    {
+        "id": "paraphrase-multilingual-MiniLM-L12-v2",
+        "name": "Multilingual MiniLM-L12-v2",
+        "providerId": "local",
+        "type": "embedding",
+        "metadata": {"dimension": 384, "maxTokens": 128, "description": "多语言支持"},
+        "isSystem": True,
+        "isUserAdded": False
+    },
+]
+
+
 class ModelFetchRequest(BaseModel):
     providerId: str
     apiKey: str
@@ -370,39 +696,19 @@ class ModelFetchRequest(BaseModel):
     providerType: str | None = None  # "openai" | "anthropic" | "gemini" | ...
 
 
-@router.post("/api/models/fetch")
+@router.post("/api/models/fetch", response_model=None)
 async def fetch_provider_models(request: ModelFetchRequest):
     """从Provider API获取模型列表（支持动态/静态）"""
+    # 返回体均为服务端构造的纯 dict，直接交给 orjson 序列化，跳过 jsonable_encoder
+    return ORJSONResponse(await _collect_provider_models(request))
+
+
+async def _collect_provider_models(request: ModelFetchRequest) -> dict:
     try:
         # Anthropic Claude：使用非 OpenAI 格式 API，返回预设模型列表
         if request.providerId == 'anthropic':
-            ANTHROPIC_PRESET_MODELS = [
-                {"id": "claude-opus-4-6", "name": "Claude Opus 4.6", "type": "chat",
-                 "metadata": {"description": "Anthropic 旗舰模型，200K 上下文，最强编程与推理，支持 1M 上下文 (beta)"}},
-                {"id": "claude-sonnet-4-6", "name": "Claude Sonnet 4.6", "type": "chat",
-                 "metadata": {"description": "Anthropic 最新均衡模型，Opus 级别推理能力，200K 上下文，同等价格"}},
-                {"id": "claude-opus-4-5", "name": "Claude Opus 4.5", "type": "chat",
-                 "metadata": {"description": "Claude Opus 系列前代，超强编程、Agent 工作流"}},
-                {"id": "claude-sonnet-4-5", "name": "Claude Sonnet 4.5", "type": "chat",
-                 "metadata": {"description": "Claude 均衡前代版本，高性价比"}},
-                {"id": "claude-haiku-3-5", "name": "Claude Haiku 3.5", "type": "chat",
-                 "metadata": {"description": "最快速轻量 Claude 模型，低成本高并发"}},
-            ]
             return {
-                "models": [
-                    {
-                        "id": m["id"],
-                        "name": m["name"],
-                        "providerId": "anthropic",
-                        "type": m["type"],
-                        "capabilities": [{"type": m["type"], "isUserSelected": False}],
-                        "tags": infer_model_tags(m["id"]),
-                        "metadata": m["metadata"],
-                        "isSystem": True,
-                        "isUserAdded": False
-                    }
-                    for m in ANTHROPIC_PRESET_MODELS
-                ],
+                "models": _ANTHROPIC_PAYLOAD_MODELS,
                 "providerId": "anthropic",
                 "timestamp": int(datetime.now().timestamp()),
                 "message": "已返回 Claude 预设模型列表（Anthropic 使用自定义 API 格式，如有新模型请手动添加）"
@@ -410,33 +716,8 @@ async def fetch_provider_models(request: ModelFetchRequest):
 
         # Google Gemini：返回预设模型列表
         if request.providerId == 'gemini':
-            GEMINI_PRESET_MODELS = [
-                {"id": "gemini-3-pro", "name": "Gemini 3 Pro", "type": "chat",
-                 "metadata": {"description": "Google 最新旗舰推理模型，1M 上下文，自适应思考，强多模态 (preview)"}},
-                {"id": "gemini-3-flash", "name": "Gemini 3 Flash", "type": "chat",
-                 "metadata": {"description": "Google 最新多模态理解模型，强编程与推理 (preview)"}},
-                {"id": "gemini-2.5-pro", "name": "Gemini 2.5 Pro", "type": "chat",
-                 "metadata": {"description": "Gemini 旗舰稳定版，1M 上下文，自适应思考"}},
-                {"id": "gemini-2.5-flash", "name": "Gemini 2.5 Flash", "type": "chat",
-                 "metadata": {"description": "Gemini 快速均衡版，可控推理预算"}},
-                {"id": "gemini-2.5-flash-lite", "name": "Gemini 2.5 Flash-Lite", "type": "chat",
-                 "metadata": {"description": "Gemini 超轻量版，大规模低成本场景"}},
-            ]
             return {
-                "models": [
-                    {
-                        "id": m["id"],
-                        "name": m["name"],
-                        "providerId": "gemini",
-                        "type": m["type"],
-                        "capabilities": [{"type": m["type"], "isUserSelected": False}],
-                        "tags": infer_model_tags(m["id"]),
-                        "metadata": m["metadata"],
-                        "isSystem": True,
-                        "isUserAdded": False
-                    }
-                    for m in GEMINI_PRESET_MODELS
-                ],
+                "models": _GEMINI_PAYLOAD_MODELS,
                 "providerId": "gemini",
                 "timestamp": int(datetime.now().timestamp()),
                 "message": "已返回 Gemini 预设模型列表（如有新模型请手动添加）"
@@ -457,39 +738,8 @@ async def fetch_provider_models(request: ModelFetchRequest):
 
         # 字节跳动豆包：火山引擎 Ark API 不提供 GET /models 端点，返回预设模型列表
         if request.providerId == 'doubao':
-            DOUBAO_PRESET_MODELS = [
-                {"id": "doubao-seed-2-0-pro", "name": "Doubao Seed 2.0 Pro", "type": "chat",
-                 "metadata": {"description": "豆包 2.0 旗舰模型，对标 GPT-5.2 / Gemini 3 Pro，支持长链路推理与多模态"}},
-                {"id": "doubao-seed-2-0-lite-260215", "name": "Doubao Seed 2.0 Lite", "type": "chat",
-                 "metadata": {"description": "豆包 2.0 Lite，均衡性能与成本，能力超越上一代豆包 1.8"}},
-                {"id": "doubao-seed-2-0-mini-260215", "name": "Doubao Seed 2.0 Mini", "type": "chat",
-                 "metadata": {"description": "豆包 2.0 Mini，低延迟高并发，适合成本敏感场景"}},
-                {"id": "doubao-seed-2-0-code-preview-260215", "name": "Doubao Seed 2.0 Code", "type": "chat",
-                 "metadata": {"description": "豆包 2.0 编程专项模型，深度优化 Agentic Coding 场景"}},
-                {"id": "doubao-seed-1-8", "name": "Doubao Seed 1.8", "type": "chat",
-                 "metadata": {"description": "豆包 1.8，上一代主力模型，多模态 Agent 场景优化"}},
-                {"id": "doubao-1-5-pro-32k-250115", "name": "Doubao 1.5 Pro 32K", "type": "chat",
-                 "metadata": {"description": "豆包 1.5 Pro，32K 上下文"}},
-                {"id": "doubao-embedding-large-250104", "name": "Doubao Embedding Large", "type": "embedding",
-                 "metadata": {"dimension": 4096, "maxTokens": 32768, "description": "豆包大尺寸嵌入模型"}},
-                {"id": "doubao-embedding-250104", "name": "Doubao Embedding", "type": "embedding",
-                 "metadata": {"dimension": 2048, "maxTokens": 32768, "description": "豆包标准嵌入模型"}},
-            ]
             return {
-                "models": [
-                    {
-                        "id": m["id"],
-                        "name": m["name"],
-                        "providerId": "doubao",
-                        "type": m["type"],
-                        "capabilities": [{"type": m["type"], "isUserSelected": False}],
-                        "tags": infer_model_tags(m["id"]),
-                        "metadata": m["metadata"],
-                        "isSystem": True,
-                        "isUserAdded": False
-                    }
-                    for m in DOUBAO_PRESET_MODELS
-                ],
+                "models": _DOUBAO_PAYLOAD_MODELS,
                 "providerId": "doubao",
                 "timestamp": int(datetime.now().timestamp()),
                 "message": "已返回豆包预设模型列表（火山引擎不支持动态拉取，如有新模型请手动添加）"
@@ -497,35 +747,16 @@ async def fetch_provider_models(request: ModelFetchRequest):
 
         if request.providerId == 'local':
             return {
-                "models": [
-                    {
-                        "id": "all-MiniLM-L6-v2",
-                        "name": "MiniLM-L6-v2",
-                        "providerId": "local",
-                        "type": "embedding",
-                        "metadata": {"dimension": 384, "maxTokens": 256, "description": "快速通用模型"},
-                        "isSystem": True,
-                        "isUserAdded": False
-                    },
-                    {
-                        "id": "paraphrase-multilingual-MiniLM-L12-v2",
-                        "name": "Multilingual MiniLM-L12-v2",
-                        "providerId": "local",
-                        "type": "embedding",
-                        "metadata": {"dimension": 384, "maxTokens": 128, "description": "多语言支持"},
-                        "isSystem": True,
-                        "isUserAdded": False
-                    }
-                ],
+                "models": _LOCAL_PAYLOAD_MODELS,
                 "providerId": "local",
                 "timestamp": int(datetime.now().timestamp())
             }
 
         api_host = _normalize_api_host(request.providerId, request.apiHost)
         endpoints = [request.fetchModelsEndpoint or "/models", "/v1/models", "/models"]
-        data, last_error = await _fetch_models_with_fallback(api_host, request.apiKey, endpoints)
+        data, last_error, kind = await _fetch_models_with_fallback(api_host, request.apiKey, endpoints)
 
-        if data is None:
+        if kind != "ok":
             return {
                 "models": [],
                 "providerId": request.providerId,
@@ -542,7 +773,7 @@ async def fetch_provider_models(request: ModelFetchRequest):
                     continue
                 model_type = _detect_model_type(model_id)
                 # 推断模型标签（如 free、vision、reasoning 等）
-                tags = infer_model_tags(model_id)
+                tags = list(_infer_model_tags_cached(model_id))
                 model = {
                     "id": model_id,
                     "name": model_id,
@@ -576,6 +807,22 @@ async def fetch_provider_models(request: ModelFetchRequest):
         }
 
 
+@functools.lru_cache(maxsize=8)
+def _get_local_st_model(model_id: str):
+    """进程级缓存已加载的本地 SentenceTransformer 模型，重复测试时跳过冷启动
+
+    有 CUDA 时切换为半精度，推理显存带宽减半。
+    """
+    model = SentenceTransformer(model_id)
+    try:
+        import torch
+        if torch.cuda.is_available():
+            model = model.half()
+    except Exception:
+        pass
+    return model
+
+
 class ModelTestRequest(BaseModel):
     providerId: str
     modelId: str
@@ -595,17 +842,22 @@ async def test_model(request: ModelTestRequest):
 
     try:
         if request.providerId == 'local':
-            try:
-                from sentence_transformers import SentenceTransformer
-            except (ImportError, OSError):
+            if not _HAS_SENTENCE_TRANSFORMERS:
                 raise HTTPException(
                     status_code=400,
                     detail="本地模型不可用（sentence-transformers 未安装）。"
                            "请使用远程模型，或安装完整依赖: pip install -r requirements.txt"
                 )
-            model = SentenceTransformer(request.modelId)
+            # 模型加载与推理均为同步 CPU 密集操作，放到线程中执行，避免阻塞事件循环
+            model = await asyncio.to_thread(_get_local_st_model, request.modelId)
             test_text = "这是一个测试句子用于验证模型功能"
-            embedding = model.encode([test_text])
+            embedding = await asyncio.to_thread(
+                model.encode,
+                [test_text],
+                batch_size=1,
+                convert_to_numpy=True,
+                normalize_embeddings=False,
+            )
             response_time = int((time() - start_time) * 1000)
             return {
                 "success": True,
@@ -625,8 +877,7 @@ async def test_model(request: ModelTestRequest):
                 "model": request.modelId
             }
             url = _build_endpoint(request.apiHost, request.embeddingEndpoint or "/v1/embeddings")
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(url, json=payload, headers=headers)
+            resp = await _get_http_client().post(url, json=payload, headers=headers, timeout=15.0)
             if resp.status_code != 200:
                 raise HTTPException(status_code=resp.status_code, detail=f"Embedding接口返回错误: {resp.text}")
             data = resp.json()
@@ -650,8 +901,7 @@ async def test_model(request: ModelTestRequest):
                 "documents": ["a", "b"]
             }
             url = request.rerankEndpoint or "https://api.cohere.com/v1/rerank"
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(url, json=payload, headers=headers)
+            resp = await _get_http_client().post(url, json=payload, headers=headers, timeout=15.0)
             if resp.status_code != 200:
                 raise HTTPException(status_code=resp.status_code, detail=f"Rerank接口返回错误: {resp.text}")
             return {
@@ -676,10 +926,10 @@ class ProviderUpsertRequest(BaseModel):
     type: str = "openai"  # openai | anthropic | gemini | ollama
 
 
-@router.get("/api/providers/custom")
+@router.get("/api/providers/custom", response_model=None)
 async def list_custom_providers():
     """列出动态配置的 provider"""
-    return load_dynamic_providers()
+    return ORJSONResponse(load_dynamic_providers())
 
 
 @router.post("/api/providers/custom")
@@ -690,7 +940,7 @@ async def upsert_custom_provider(req: ProviderUpsertRequest):
         "endpoint": req.endpoint,
         "type": req.type
     }
-    save_dynamic_providers(providers)
+    _schedule_save("providers", providers)
     return {"success": True, "providers": providers}
 
 
@@ -699,7 +949,7 @@ async def delete_custom_provider(provider_id: str):
     providers = load_dynamic_providers()
     if provider_id in providers:
         providers.pop(provider_id)
-        save_dynamic_providers(providers)
+        _schedule_save("providers", providers)
     return {"success": True, "providers": providers}
 
 
@@ -715,9 +965,9 @@ class ModelUpsertRequest(BaseModel):
     tags: list[str] | None = None  # 模型标签列表（如 free、vision、reasoning 等）
 
 
-@router.get("/api/models/custom")
+@router.get("/api/models/custom", response_model=None)
 async def list_custom_models():
-    return load_dynamic_models()
+    return ORJSONResponse(load_dynamic_models())
 
 
 @router.post("/api/models/custom")
@@ -739,7 +989,7 @@ async def upsert_custom_model(req: ModelUpsertRequest):
     if req.tags is not None:
         model_data["tags"] = req.tags
     models[req.modelId] = model_data
-    save_dynamic_models(models)
+    _schedule_save("models", models)
     return {"success": True, "models": models}
 
 
@@ -748,30 +998,46 @@ async def delete_custom_model(model_id: str):
     models = load_dynamic_models()
     if model_id in models:
         models.pop(model_id)
-        save_dynamic_models(models)
+        _schedule_save("models", models)
     return {"success": True, "models": models}
 
 
 # Helpers reused from app.py for model inference
-import re
 
 
+# 将 rerank / embedding / image 检测融合为一个预编译正则：
+# 在位置 0 按优先级依次尝试各分支的前瞻，命中分支的空命名组即为类型，单次 match 完成分类
+_MODEL_TYPE_REGEX = re.compile(
+    rf"(?=.*?(?:{RERANKING_REGEX.pattern}))(?P<rerank>)"
+    rf"|(?=.*?(?:{EMBEDDING_REGEX.pattern}))(?P<embedding>)"
+    r"|(?=.*?(?:image|img|diffusion|sd|dall-e|dalle))(?P<image>)",
+    re.I,
+)
+
+
+@functools.lru_cache(maxsize=4096)
 def _detect_model_type(model_id: str) -> str:
     """统一使用 model_detector.py 的正则检测模型类型
 
     优先级：rerank > embedding > image > chat（默认）
     """
-    if is_rerank_model(model_id):
-        return 'rerank'
-    if is_embedding_model(model_id):
-        return 'embedding'
-    lower_id = model_id.lower()
-    if re.search(r'image|img|diffusion|sd|dall-e|dalle', lower_id):
-        return 'image'
-    return 'chat'
+    m = _MODEL_TYPE_REGEX.match(model_id or "")
+    return m.lastgroup if m else 'chat'
+
+
+@functools.lru_cache(maxsize=4096)
+def _infer_model_tags_cached(model_id: str) -> tuple:
+    """infer_model_tags 的进程级缓存版本；返回 tuple 防止调用方修改缓存值"""
+    return tuple(infer_model_tags(model_id))
 
 
 def _infer_model_metadata(model_id: str, model_type: str) -> dict:
+    # 调用方会继续写入 description 等字段，因此每次返回新的 dict
+    return dict(_infer_model_metadata_cached(model_id, model_type))
+
+
+@functools.lru_cache(maxsize=4096)
+def _infer_model_metadata_cached(model_id: str, model_type: str) -> tuple:
     metadata = {}
     lower_id = model_id.lower()
     if model_type == 'embedding':
@@ -801,4 +1067,4 @@ def _infer_model_metadata(model_id: str, model_type: str) -> dict:
             metadata['contextWindow'] = 1000000
         else:
             metadata['contextWindow'] = 4096
-    return metadata
+    return tuple(metadata.items())
@@ -4,18 +4,32 @@
 提供 GET /api/presets 端点，返回预设问题列表。
 """
 
-from fastapi import APIRouter
+import hashlib
+
+import orjson
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import ORJSONResponse
 
 from services.preset_service import PRESET_QUESTIONS
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 预设问题在进程生命周期内不变，导入时一次性序列化并计算 ETag
+_PRESETS_JSON = orjson.dumps({"presets": PRESET_QUESTIONS})
+_PRESETS_ETAG = f'W/"{hashlib.md5(_PRESETS_JSON).hexdigest()}"'
+_PRESETS_HEADERS = {
+    "Cache-Control": "public, max-age=86400, immutable",
+    "ETag": _PRESETS_ETAG,
+}
 
 
 @router.get("/api/presets")
-async def get_presets():
+async def get_presets(request: Request):
     """获取预设问题列表
 
     返回预定义的常用问题按钮列表，前端可用于在文档加载完成后
     显示预设问题按钮，方便用户快速发起查询。
     """
-    return {"presets": PRESET_QUESTIONS}
+    if request.headers.get("if-none-match") == _PRESETS_ETAG:
+        return Response(status_code=304, headers=_PRESETS_HEADERS)
+    return Response(_PRESETS_JSON, media_type="application/json", headers=_PRESETS_HEADERS)
@@ -1,13 +1,34 @@
 """
 提示词池 API 路由
 """
+import functools
+import uuid
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from services.prompt_pool_service import prompt_pool_service
 
-router = APIRouter(prefix="/prompts", tags=["prompts"])
+router = APIRouter(prefix="/prompts", tags=["prompts"], default_response_class=ORJSONResponse)
+
+# 版本号只在进程内递增，ETag 带上启动标识，避免重启后旧 ETag 误命中
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+@functools.lru_cache(maxsize=2)
+def _serialize_prompts(version: int) -> bytes:
+    """按池版本号缓存序列化结果，版本未变时直接复用"""
+    return orjson.dumps({"prompts": prompt_pool_service.get_all_prompts()})
+
+
+# 默认模板在进程内不变，导入时一次性序列化
+_DEFAULTS_JSON = orjson.dumps({"prompts": prompt_pool_service.get_default_prompts()})
+_DEFAULTS_ETAG = f'"{_BOOT_ID}-defaults"'
+# 默认模板在进程生命周期内不变，允许浏览器及中间代理缓存；ETag 随进程重启变化
+_DEFAULTS_HEADERS = {"ETag": _DEFAULTS_ETAG, "Cache-Control": "public, max-age=3600"}
 
 
 class AddPromptRequest(BaseModel):
@@ -30,16 +51,22 @@ class TogglePromptRequest(BaseModel):
     selected: bool
 
 
-@router.get("/")
-async def get_all_prompts():
+@router.get("/", response_model=None)
+async def get_all_prompts(request: Request):
     """获取所有提示词"""
-    return {"prompts": prompt_pool_service.get_all_prompts()}
+    version = prompt_pool_service.version
+    etag = f'"{_BOOT_ID}-{version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(_serialize_prompts(version), media_type="application/json", headers={"ETag": etag})
 
 
-@router.get("/defaults")
-async def get_default_prompts():
+@router.get("/defaults", response_model=None)
+async def get_default_prompts(request: Request):
     """获取默认提示词模板"""
-    return {"prompts": prompt_pool_service.get_default_prompts()}
+    if request.headers.get("if-none-match") == _DEFAULTS_ETAG:
+        return Response(status_code=304, headers=_DEFAULTS_HEADERS)
+    return Response(_DEFAULTS_JSON, media_type="application/json", headers=_DEFAULTS_HEADERS)
 
 
 @router.post("/")
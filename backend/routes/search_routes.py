@@ -1,15 +1,41 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import orjson
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, model_validator
 
 from services.vector_service import vector_search
 from services.query_analyzer import get_retrieval_strategy
-from services.advanced_search import AdvancedSearchService
+from services.advanced_search import (
+    AdvancedSearchService,
+    attach_context_snippets,
+    boolean_search_worker,
+    build_match_results,
+    compile_search_pattern,
+    merge_scan_spans,
+    plan_regex_scan,
+    regex_scan_range_worker,
+    regex_search_worker,
+)
 from services.grep_service import grep_search
 from services.semantic_group_service import SemanticGroupService
-from services.embedding_service import _get_semantic_groups_dir
+from services.embedding_service import (
+    _get_semantic_groups_dir,
+    get_query_vector_cache_stats,
+    prefetch_query_vectors,
+)
+from utils.query_cache import make_query_key, search_result_cache
 from utils.middleware import (
     LoggingMiddleware,
     RetryMiddleware,
@@ -19,11 +45,94 @@ from utils.middleware import (
 )
 from config import settings
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # 高级搜索服务实例
 _advanced_search_service = AdvancedSearchService()
 
+# 大文档正则/布尔扫描的进程池，首次使用时创建，避免小文档与测试付出进程启动开销
+_PROC_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _process_pool_size() -> int:
+    return settings.search_process_workers or os.cpu_count() or 1
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _PROC_POOL
+    if _PROC_POOL is None:
+        # 服务进程已加载 torch/faiss/OpenMP 且为多线程，fork 出的子进程可能继承被占用的锁而死锁，统一用 spawn
+        _PROC_POOL = ProcessPoolExecutor(
+            max_workers=_process_pool_size(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _PROC_POOL
+
+
+def _reset_process_pool() -> None:
+    """终止进程池的全部工作进程并丢弃该池，下次调用时重建
+
+    超时后 asyncio.wait_for 无法停止子进程里仍在回溯的正则，不终止的话后续扫描都要排在它后面。
+    工作进程被终止后，池内其余未完成的任务会收到 BrokenProcessPool，由 _run_in_process_pool 改在线程中重跑。
+    """
+    global _PROC_POOL
+    pool, _PROC_POOL = _PROC_POOL, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor 没有公开的终止接口（3.14 才有 terminate_workers），直接终止其子进程
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False)
+
+
+async def _run_in_process_pool(worker, *args):
+    """在进程池中执行 CPU 密集的全文扫描；进程池损坏时重建并退回线程执行"""
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    try:
+        return await loop.run_in_executor(pool, worker, *args)
+    except BrokenProcessPool:
+        logger.warning("[Search] 搜索进程池已损坏，重建后改用线程执行本次扫描")
+        global _PROC_POOL
+        if _PROC_POOL is pool:
+            _PROC_POOL = None
+        return await asyncio.to_thread(worker, *args)
+
+
+async def _scan_with_timeout(scan, detail: str, uses_process_pool: bool):
+    """等待全文扫描完成，超过 search_timeout 返回 408；进程池扫描超时时终止工作进程"""
+    try:
+        return await asyncio.wait_for(scan, timeout=settings.search_timeout)
+    except asyncio.TimeoutError:
+        if uses_process_pool:
+            logger.warning("[Search] 进程池扫描超时，终止工作进程并重建进程池")
+            _reset_process_pool()
+        raise HTTPException(status_code=408, detail=detail)
+
+
+async def _parallel_regex_search(pattern: str, text: str, limit: int, context_chars: int) -> List[dict]:
+    """大文档正则搜索：分块在不同进程中扫描后按顺序合并
+
+    单个请求最多占用一半工作进程，病态模式在超时终止前不会占满整个进程池、阻塞其他用户的扫描；
+    超时后由 _scan_with_timeout 终止全部工作进程。
+    """
+    parts = max(1, _process_pool_size() // 2)
+    if parts < 2:
+        results = await _run_in_process_pool(regex_search_worker, pattern, text, limit, context_chars)
+        return attach_context_snippets(text, results)
+    span_lists = await asyncio.gather(*(
+        _run_in_process_pool(regex_scan_range_worker, pattern, *plan, limit)
+        for plan in plan_regex_scan(text, parts)
+    ))
+    return build_match_results(text, merge_scan_spans(span_lists, limit), context_chars)
+
+
+@router.on_event("shutdown")
+async def _shutdown_process_pool():
+    _reset_process_pool()
+
 
 class GrepSearchRequest(BaseModel):
     """精确文本搜索（grep）请求模型"""
@@ -50,6 +159,11 @@ class BooleanSearchRequest(BaseModel):
     context_chars: int = 200
 
 
+_CLOUD_RERANK_PROVIDERS = frozenset({
+    "cohere", "jina", "silicon", "aliyun", "openai", "moonshot", "deepseek", "zhipu", "minimax",
+})
+
+
 class SearchRequest(BaseModel):
     doc_id: str
     query: str
@@ -63,14 +177,27 @@ class SearchRequest(BaseModel):
     rerank_endpoint: Optional[str] = None
     doc_store_key: Optional[str] = None  # injected
 
-    def validate_rerank(self):
+    @model_validator(mode="after")
+    def _check_rerank(self):
+        # 所有非本地的 rerank provider 都需要 api_key；在模型解析阶段校验，失败时由 FastAPI 返回 422
         provider = (self.rerank_provider or "").lower()
-        # 所有非本地的 rerank provider 都需要 api_key
-        cloud_providers = {"cohere", "jina", "silicon", "aliyun", "openai", "moonshot", "deepseek", "zhipu", "minimax"}
-        if self.use_rerank and provider in cloud_providers and not self.rerank_api_key:
-            raise HTTPException(status_code=400, detail=f"使用 {provider} rerank 需要提供 rerank_api_key")
+        if self.use_rerank and provider in _CLOUD_RERANK_PROVIDERS and not self.rerank_api_key:
+            raise ValueError(f"使用 {provider} rerank 需要提供 rerank_api_key")
+        return self
+
+
+class BatchSearchRequest(SearchRequest):
+    """批量语义检索请求：对同一文档执行多条查询，其余参数与 SearchRequest 相同"""
+    query: str = ""
+    queries: List[str]
+
 
+# 单次批量检索允许的最大查询数
+_MAX_BATCH_QUERIES = 20
 
+
+# 中间件只持有 settings 中的只读配置，不含请求级状态，进程内构建一次即可复用
+@functools.lru_cache(maxsize=1)
 def build_search_middlewares():
     middlewares = []
     if settings.enable_search_logging:
@@ -85,33 +212,87 @@ def build_search_middlewares():
     return middlewares
 
 
-@router.post("/api/search")
-async def search_in_pdf(request: SearchRequest):
-    request.validate_rerank()
-    try:
-        # pages/doc store 将由 app 注入，避免全局重复
-        if not hasattr(router, "documents_store"):
-            raise HTTPException(status_code=500, detail="文档存储未初始化")
+_SEARCH_MIDDLEWARES = build_search_middlewares()
 
-        store = router.documents_store if not request.doc_store_key else router.documents_store.get(request.doc_store_key, {})
-        if request.doc_id not in store:
-            raise HTTPException(status_code=404, detail="文档未找到")
 
-        doc = store[request.doc_id]
-        pages = doc.get("data", {}).get("pages", [])
+def _iter_ndjson(matches: Iterator[dict], limit: int) -> Iterator[bytes]:
+    """逐条输出 NDJSON：每行一个结果，最后一行为 {"_meta": {...}}
+
+    同步生成器由 StreamingResponse 在线程池中逐步迭代，扫描到一条即发送一条；
+    达到 limit 或超过 search_timeout 时停止扫描，超时在 _meta.timed_out 中标记。
+    """
+    dumps = orjson.dumps
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    deadline = time.monotonic() + settings.search_timeout
+    total = 0
+    timed_out = False
+    for item in matches:
+        if total >= limit:
+            break
+        if time.monotonic() > deadline:
+            timed_out = True
+            break
+        yield dumps(item, option=option) + b"\n"
+        total += 1
+    yield dumps({"_meta": {"total": total, "timed_out": timed_out}}, option=option) + b"\n"
+
+
+def _ndjson_response(matches: Iterator[dict], limit: int) -> StreamingResponse:
+    return StreamingResponse(_iter_ndjson(matches, limit), media_type="application/x-ndjson")
 
-        # 智能分析查询类型，动态调整top_k
-        strategy = get_retrieval_strategy(request.query)
-        dynamic_top_k = strategy['top_k']
-        
-        print(f"[Search] 查询类型: {strategy['query_type']}, 动态top_k: {dynamic_top_k}, 原因: {strategy['reasoning']}")
 
-        middlewares = build_search_middlewares()
+# 依赖声明为 async，避免 FastAPI 把同步依赖派发到线程池
+async def get_document_store() -> dict:
+    """获取由 app 注入的文档存储，未初始化时返回 500"""
+    store = getattr(router, "documents_store", None)
+    if store is None:
+        raise HTTPException(status_code=500, detail="文档存储未初始化")
+    return store
 
+
+async def get_vector_store_dir() -> str:
+    """获取由 app 注入的向量索引目录"""
+    return getattr(router, "vector_store_dir", "")
+
+
+def _search_cache_key(request: SearchRequest, query: str, dynamic_top_k: int) -> str:
+    """语义检索结果缓存键，包含所有影响检索结果的请求参数
+
+    api_key 决定 embedding/HyDE 所用账号，rerank_endpoint 与 rerank_api_key 决定实际调用的重排服务，
+    均需纳入键中；make_query_key 对整体取 sha1，密钥不会以明文留在缓存里。
+    """
+    return make_query_key(
+        request.doc_id,
+        query,
+        request.doc_store_key,
+        dynamic_top_k,
+        max(request.candidate_k, dynamic_top_k),
+        request.use_rerank,
+        request.reranker_model,
+        request.rerank_provider,
+        request.rerank_endpoint,
+        request.api_key,
+        request.rerank_api_key,
+    )
+
+
+async def _search_one(
+    request: SearchRequest, query: str, pages: list, vector_store_dir: str
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """执行单条语义检索（先查结果缓存），返回 (results, meta)"""
+    # 智能分析查询类型，动态调整top_k
+    strategy = get_retrieval_strategy(query)
+    dynamic_top_k = strategy['top_k']
+    
+    print(f"[Search] 查询类型: {strategy['query_type']}, 动态top_k: {dynamic_top_k}, 原因: {strategy['reasoning']}")
+
+    cache_key = _search_cache_key(request, query, dynamic_top_k)
+    results = search_result_cache.get(cache_key)
+    if results is None:
         results = await vector_search(
             request.doc_id,
-            request.query,
-            vector_store_dir=router.vector_store_dir,
+            query,
+            vector_store_dir=vector_store_dir,
             pages=pages,
             api_key=request.api_key,
             top_k=dynamic_top_k,  # 使用动态计算的top_k
@@ -121,19 +302,42 @@ async def search_in_pdf(request: SearchRequest):
             rerank_provider=request.rerank_provider,
             rerank_api_key=request.rerank_api_key,
             rerank_endpoint=request.rerank_endpoint,
-            middlewares=middlewares
+            middlewares=_SEARCH_MIDDLEWARES
         )
+        # 空结果可能来自超时或降级，不缓存，避免短暂故障被放大为 TTL 内的持续空结果
+        if results:
+            search_result_cache.put(cache_key, results, doc_id=request.doc_id)
+
+    meta = {
+        "query_type": strategy['query_type'],
+        "dynamic_top_k": dynamic_top_k,
+        "rerank_enabled": request.use_rerank and len(results) > 0,
+        "candidate_k": max(request.candidate_k, dynamic_top_k),
+        "used_provider": request.rerank_provider or "local",
+        "used_model": request.reranker_model or ("BAAI/bge-reranker-base" if request.use_rerank else None),
+        "fallback_used": False
+    }
+    return results, meta
 
-        return {
-            "results": results,
-            "query_type": strategy['query_type'],
-            "dynamic_top_k": dynamic_top_k,
-            "rerank_enabled": request.use_rerank and len(results) > 0,
-            "candidate_k": max(request.candidate_k, dynamic_top_k),
-            "used_provider": request.rerank_provider or "local",
-            "used_model": request.reranker_model or ("BAAI/bge-reranker-base" if request.use_rerank else None),
-            "fallback_used": False
-        }
+
+@router.post("/api/search")
+async def search_in_pdf(
+    request: SearchRequest,
+    store: dict = Depends(get_document_store),
+    vector_store_dir: str = Depends(get_vector_store_dir),
+):
+    """语义检索"""
+    try:
+        if request.doc_store_key:
+            store = store.get(request.doc_store_key, {})
+        if request.doc_id not in store:
+            raise HTTPException(status_code=404, detail="文档未找到")
+
+        doc = store[request.doc_id]
+        pages = doc.get("data", {}).get("pages", [])
+
+        results, meta = await _search_one(request, request.query, pages, vector_store_dir)
+        return ORJSONResponse({"results": results, **meta})
 
     except HTTPException as e:
         raise e
@@ -141,20 +345,66 @@ async def search_in_pdf(request: SearchRequest):
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
 
+@router.post("/api/search/batch")
+async def batch_search_in_pdf(
+    request: BatchSearchRequest,
+    store: dict = Depends(get_document_store),
+    vector_store_dir: str = Depends(get_vector_store_dir),
+):
+    """批量语义检索：各查询先查结果缓存，未命中的查询向量一次批量编码后并发检索，结果按输入顺序返回"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries 不能为空")
+    if len(request.queries) > _MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"单次最多 {_MAX_BATCH_QUERIES} 条查询")
+    try:
+        if request.doc_store_key:
+            store = store.get(request.doc_store_key, {})
+        if request.doc_id not in store:
+            raise HTTPException(status_code=404, detail="文档未找到")
+
+        pages = store[request.doc_id].get("data", {}).get("pages", [])
+        # 重复查询只检索一次
+        unique_queries = list(dict.fromkeys(request.queries))
+        # 结果缓存未命中的查询先改写并批量编码一次，写入查询向量缓存，后续逐条检索直接命中
+        uncached = [
+            query for query in unique_queries
+            if _search_cache_key(request, query, get_retrieval_strategy(query)['top_k']) not in search_result_cache
+        ]
+        if uncached:
+            try:
+                await asyncio.to_thread(
+                    prefetch_query_vectors, request.doc_id, uncached, vector_store_dir, request.api_key
+                )
+            except Exception as e:
+                # 预编码只是优化，失败时由各条检索自行编码并按原路径报错/降级
+                logger.warning(f"批量预编码查询向量失败，回退为逐条编码: {e}")
+        unique_outcomes = await asyncio.gather(
+            *(_search_one(request, query, pages, vector_store_dir) for query in unique_queries)
+        )
+        by_query = dict(zip(unique_queries, unique_outcomes))
+        outcomes = [by_query[query] for query in request.queries]
+        return ORJSONResponse({
+            "results": [results for results, _ in outcomes],
+            "meta": [meta for _, meta in outcomes],
+        })
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量搜索失败: {str(e)}")
+
+
 @router.post("/api/search/grep")
-async def grep_search_endpoint(request: GrepSearchRequest):
+async def grep_search_endpoint(request: GrepSearchRequest, store: dict = Depends(get_document_store)):
     """精确文本搜索（grep）端点
 
     支持 | 分隔多关键词 OR 逻辑，返回匹配位置和上下文片段。
     """
     try:
-        if not hasattr(router, "documents_store"):
-            raise HTTPException(status_code=500, detail="文档存储未初始化")
-
-        if request.doc_id not in router.documents_store:
+        if request.doc_id not in store:
             raise HTTPException(status_code=404, detail="文档未找到")
 
-        doc = router.documents_store[request.doc_id]
+        doc = store[request.doc_id]
         full_text = doc.get("data", {}).get("full_text", "")
 
         if not full_text:
@@ -168,7 +418,8 @@ async def grep_search_endpoint(request: GrepSearchRequest):
             case_insensitive=request.case_insensitive,
         )
 
-        return {"results": results, "total": len(results)}
+        # 结果可能很大，直接用 orjson 序列化，跳过 jsonable_encoder 的逐项遍历
+        return ORJSONResponse({"results": results, "total": len(results)})
 
     except HTTPException:
         raise
@@ -177,36 +428,50 @@ async def grep_search_endpoint(request: GrepSearchRequest):
 
 
 @router.post("/api/search/regex")
-async def regex_search(request: RegexSearchRequest):
+async def regex_search(request: RegexSearchRequest, store: dict = Depends(get_document_store)):
     """正则表达式搜索端点
 
     在指定文档的全文中执行正则表达式匹配搜索。
     正则语法无效时返回 HTTP 400 错误。
     """
     try:
-        # 检查文档存储是否已初始化
-        if not hasattr(router, "documents_store"):
-            raise HTTPException(status_code=500, detail="文档存储未初始化")
-
         # 查找文档
-        if request.doc_id not in router.documents_store:
+        if request.doc_id not in store:
             raise HTTPException(status_code=404, detail="文档未找到")
 
-        doc = router.documents_store[request.doc_id]
+        doc = store[request.doc_id]
         full_text = doc.get("data", {}).get("full_text", "")
 
         if not full_text:
             return {"results": [], "total": 0}
 
-        # 调用高级搜索服务执行正则搜索
-        results = _advanced_search_service.regex_search(
-            pattern=request.pattern,
-            text=full_text,
-            limit=request.limit,
-            context_chars=request.context_chars,
+        cache_key = make_query_key(
+            request.doc_id, request.pattern, "regex", request.limit, request.context_chars,
+            fold_case=False,
         )
-
-        return {"results": results, "total": len(results)}
+        results = search_result_cache.get(cache_key)
+        if results is None:
+            # 复用已编译的正则对象，语法无效时抛出 ValueError（返回 400）
+            compiled = compile_search_pattern(request.pattern) if request.pattern else request.pattern
+            # 大文档分块交给进程池并行扫描，其余在工作线程中执行；均设置超时，病态模式不会阻塞事件循环
+            use_pool = len(full_text) >= settings.search_process_min_chars
+            if use_pool:
+                scan = _parallel_regex_search(
+                    request.pattern, full_text, request.limit, request.context_chars
+                )
+            else:
+                scan = asyncio.to_thread(
+                    _advanced_search_service.regex_search,
+                    compiled,
+                    full_text,
+                    request.limit,
+                    request.context_chars,
+                )
+            results = await _scan_with_timeout(scan, "正则搜索超时，请简化表达式后重试", use_pool)
+            search_result_cache.put(cache_key, results, doc_id=request.doc_id)
+
+        # 结果可能很大，直接用 orjson 序列化，跳过 jsonable_encoder 的逐项遍历
+        return ORJSONResponse({"results": results, "total": len(results)})
 
     except ValueError as e:
         # 正则表达式语法无效，返回 400
@@ -218,36 +483,63 @@ async def regex_search(request: RegexSearchRequest):
 
 
 @router.post("/api/search/boolean")
-async def boolean_search(request: BooleanSearchRequest):
+async def boolean_search(
+    request: BooleanSearchRequest,
+    stream: bool = False,
+    store: dict = Depends(get_document_store),
+):
     """布尔逻辑搜索端点
 
     在指定文档的全文中执行布尔逻辑搜索（支持 AND/OR/NOT）。
-    结果按相关性分数降序排列。
+    结果按相关性分数降序排列；?stream=true 时以 NDJSON 边扫描边输出，
+    按匹配在文中出现的顺序返回前 limit 条（不排序、不经结果缓存），末行为 _meta 元信息。
     """
     try:
-        # 检查文档存储是否已初始化
-        if not hasattr(router, "documents_store"):
-            raise HTTPException(status_code=500, detail="文档存储未初始化")
-
         # 查找文档
-        if request.doc_id not in router.documents_store:
+        if request.doc_id not in store:
             raise HTTPException(status_code=404, detail="文档未找到")
 
-        doc = router.documents_store[request.doc_id]
+        doc = store[request.doc_id]
         full_text = doc.get("data", {}).get("full_text", "")
 
+        if stream:
+            return _ndjson_response(
+                _advanced_search_service.iter_boolean_matches(
+                    request.query, full_text, context_chars=request.context_chars
+                ),
+                request.limit,
+            )
+
         if not full_text:
             return {"results": [], "total": 0}
 
-        # 调用高级搜索服务执行布尔搜索
-        results = _advanced_search_service.boolean_search(
-            query=request.query,
-            text=full_text,
-            limit=request.limit,
-            context_chars=request.context_chars,
+        cache_key = make_query_key(
+            request.doc_id, request.query, "boolean", request.limit, request.context_chars,
+            fold_case=False,
         )
-
-        return {"results": results, "total": len(results)}
+        results = search_result_cache.get(cache_key)
+        if results is None:
+            if len(full_text) >= settings.search_process_min_chars:
+                # 大文档交给进程池扫描，避免长时间占用事件循环；与正则搜索一样受 search_timeout 约束
+                results = await _scan_with_timeout(
+                    _run_in_process_pool(
+                        boolean_search_worker, request.query, full_text, request.limit, request.context_chars
+                    ),
+                    "布尔搜索超时，请简化查询后重试",
+                    True,
+                )
+            else:
+                # 调用高级搜索服务执行布尔搜索
+                results = _advanced_search_service.boolean_search(
+                    query=request.query,
+                    text=full_text,
+                    limit=request.limit,
+                    context_chars=request.context_chars,
+                )
+            search_result_cache.put(cache_key, results, doc_id=request.doc_id)
+
+        # 结果可能很大，直接用 orjson 序列化，跳过 jsonable_encoder 的逐项遍历
+        return ORJSONResponse({"results": results, "total": len(results)})
 
     except HTTPException:
         raise
@@ -255,6 +547,18 @@ async def boolean_search(request: BooleanSearchRequest):
         raise HTTPException(status_code=500, detail=f"布尔搜索失败: {str(e)}")
 
 
+@router.get("/api/search/cache_stats")
+async def search_cache_stats():
+    """检索结果缓存统计（条目数、命中率等）"""
+    return search_result_cache.stats()
+
+
+@router.get("/api/search/embed_cache_stats")
+async def embed_cache_stats():
+    """查询向量缓存统计（条目数、命中率等）"""
+    return get_query_vector_cache_stats()
+
+
 class DocumentMapRequest(BaseModel):
     """文档地图请求模型"""
     doc_id: str
@@ -1,7 +1,10 @@
+import asyncio
+import functools
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
 from models.provider_registry import PROVIDER_CONFIG
@@ -16,7 +19,7 @@ from utils.middleware import (
 )
 from config import settings
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 class SummaryRequest(BaseModel):
@@ -26,6 +29,8 @@ class SummaryRequest(BaseModel):
     api_provider: str
 
 
+# 中间件只持有 settings 中的只读配置，不含请求级状态，进程内构建一次即可复用
+@functools.lru_cache(maxsize=1)
 def build_summary_middlewares():
     middlewares = []
     if settings.enable_chat_logging:
@@ -40,6 +45,25 @@ def build_summary_middlewares():
     return middlewares
 
 
+_SUMMARY_MIDDLEWARES = build_summary_middlewares()
+
+# 摘要/问题生成使用的文档开头片段长度（字符）
+_SUMMARY_EXCERPT_CHARS = 8000
+_QUESTIONS_EXCERPT_CHARS = 4000
+_SENTENCE_ENDS = "。！？!?.\n"
+
+
+def _head_excerpt(text: str, limit: int) -> str:
+    """截取文本开头 limit 个字符，尽量停在句末，避免把半句话发给模型
+
+    只在截断点前 20% 范围内回退寻找句末标点，找不到时按字符硬截断。
+    """
+    if len(text) <= limit:
+        return text
+    cut = max(text.rfind(ch, limit - limit // 5, limit) for ch in _SENTENCE_ENDS)
+    return text[:cut + 1] if cut >= 0 else text[:limit]
+
+
 @router.post("/summary")
 async def generate_summary(request: SummaryRequest):
     if not hasattr(router, "documents_store"):
@@ -49,6 +73,9 @@ async def generate_summary(request: SummaryRequest):
 
     doc = router.documents_store[request.doc_id]
     full_text = doc["data"]["full_text"]
+    # 两次调用共用同一份开头片段，问题生成取其前半部分
+    summary_text = _head_excerpt(full_text, _SUMMARY_EXCERPT_CHARS)
+    questions_text = _head_excerpt(summary_text, _QUESTIONS_EXCERPT_CHARS)
 
     system_prompt = """你是专业的文档摘要专家。请为文档生成简洁的摘要。
 
@@ -60,38 +87,40 @@ async def generate_summary(request: SummaryRequest):
 
     messages = [
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"请为以下文档生成摘要：\n\n{full_text[:8000]}"}
+        {"role": "user", "content": f"请为以下文档生成摘要：\n\n{summary_text}"}
     ]
 
     try:
         endpoint = PROVIDER_CONFIG.get(request.api_provider, {}).get("endpoint", "")
-        middlewares = build_summary_middlewares()
-        response = await call_ai_api(
-            messages,
-            request.api_key,
-            request.model,
-            request.api_provider,
-            endpoint=endpoint,
-            middlewares=middlewares
-        )
-        summary = response["choices"][0]["message"]["content"]
 
         questions_messages = [
             {
                 "role": "system",
                 "content": "根据文档内容，生成5个有价值的问题。只输出问题列表，每行一个问题。"
             },
-            {"role": "user", "content": f"文档内容：\n{full_text[:4000]}"}
+            {"role": "user", "content": f"文档内容：\n{questions_text}"}
         ]
 
-        questions_response = await call_ai_api(
-            questions_messages,
-            request.api_key,
-            request.model,
-            request.api_provider,
-            endpoint=endpoint,
-            middlewares=middlewares
+        # 摘要与问题生成互不依赖，并发请求以缩短总耗时（中间件无请求级状态，可安全共享）
+        response, questions_response = await asyncio.gather(
+            call_ai_api(
+                messages,
+                request.api_key,
+                request.model,
+                request.api_provider,
+                endpoint=endpoint,
+                middlewares=_SUMMARY_MIDDLEWARES
+            ),
+            call_ai_api(
+                questions_messages,
+                request.api_key,
+                request.model,
+                request.api_provider,
+                endpoint=endpoint,
+                middlewares=_SUMMARY_MIDDLEWARES
+            ),
         )
+        summary = response["choices"][0]["message"]["content"]
         suggested_questions = questions_response["choices"][0]["message"]["content"].split("\n")
         suggested_questions = [q.strip() for q in suggested_questions if q.strip()]
 
@@ -1,12 +1,15 @@
-import glob
+import asyncio
 import os
 import platform
+import time
 from datetime import datetime
 from pathlib import Path
 
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
+from fastapi.responses import ORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Align storage paths with project root (same as app.py/document_routes)
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -15,15 +18,47 @@ DATA_DIR = BASE_DIR / "data"
 DOCS_DIR = DATA_DIR / "docs"
 VECTOR_STORES_DIR = DATA_DIR / "vector_stores"
 
+# 目录文件计数缓存：(dir_path, suffix) -> (timestamp, count)，短 TTL 内复用，避免轮询时反复扫描目录
+_COUNT_CACHE: dict = {}
+_COUNT_TTL = 5.0
 
-@router.get("/health")
+
+def _count_suffix(dir_path: str, suffix: str) -> int:
+    """统计目录下指定后缀的文件数（与 glob("*<suffix>") 一致，忽略隐藏文件）"""
+    key = (dir_path, suffix)
+    now = time.monotonic()
+    cached = _COUNT_CACHE.get(key)
+    if cached is not None and now - cached[0] < _COUNT_TTL:
+        return cached[1]
+
+    count = 0
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.name.endswith(suffix) and not entry.name.startswith("."):
+                    count += 1
+    except OSError:
+        count = 0
+
+    _COUNT_CACHE[key] = (now, count)
+    return count
+
+
+# /health、/version 会被频繁探测，响应体在导入时预先序列化
+_VERSION_BYTES = orjson.dumps({"version": "2.0.1", "build_time": "2025-11-25 19:30:00", "feature": "native_pdf_url"})
+_HEALTH_PREFIX = b'{"status":"healthy","timestamp":"'
+_HEALTH_SUFFIX = b'"}'
+
+
+@router.get("/health", response_model=None)
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    body = _HEALTH_PREFIX + datetime.now().isoformat().encode() + _HEALTH_SUFFIX
+    return Response(body, media_type="application/json")
 
 
-@router.get("/version")
+@router.get("/version", response_model=None)
 async def get_version():
-    return {"version": "2.0.1", "build_time": "2025-11-25 19:30:00", "feature": "native_pdf_url"}
+    return Response(_VERSION_BYTES, media_type="application/json")
 
 
 @router.get("/storage_info")
@@ -33,8 +68,9 @@ async def get_storage_info():
     docs_path = str(DOCS_DIR.resolve())
     vector_stores_path = str(VECTOR_STORES_DIR.resolve())
 
-    pdf_count = len(glob.glob(os.path.join(uploads_path, "*.pdf")))
-    doc_count = len(glob.glob(os.path.join(docs_path, "*.json")))
+    pdf_count, doc_count = await asyncio.to_thread(
+        lambda: (_count_suffix(uploads_path, ".pdf"), _count_suffix(docs_path, ".json"))
+    )
 
     return {
         "uploads_dir": uploads_path,
@@ -7,7 +7,7 @@
 """
 
 import logging
-from collections import OrderedDict
+import threading
 from typing import Optional
 
 from services.memory_store import MemoryEntry
@@ -15,13 +15,27 @@ from services.memory_store import MemoryEntry
 logger = logging.getLogger(__name__)
 
 
+class _Node:
+    """LRU 双向链表节点"""
+
+    __slots__ = ("entry", "prev", "next")
+
+    def __init__(self, entry: Optional[MemoryEntry] = None):
+        self.entry = entry
+        self.prev: Optional["_Node"] = None
+        self.next: Optional["_Node"] = None
+
+
 class ActivePool:
     """类 OS 活跃记忆池（LRU 策略）
 
-    使用 OrderedDict 实现 LRU：
-    - 最近使用的条目在末尾
-    - 最久未使用的条目在头部
+    使用 dict + 双向链表实现 LRU：
+    - 最近使用的条目在链表尾部（_tail 之前）
+    - 最久未使用的条目在链表头部（_head 之后）
     - 达到容量上限时淘汰头部条目
+
+    命中时只需摘链再挂到尾部的几次指针赋值；所有读写都在锁内完成，
+    可被多个工作线程并发访问。
     """
 
     def __init__(self, capacity: int = 100):
@@ -31,7 +45,25 @@ class ActivePool:
             capacity: 池容量上限，默认 100 条
         """
         self.capacity = max(1, capacity)  # 至少容纳 1 条
-        self._pool: OrderedDict[str, MemoryEntry] = OrderedDict()
+        self._map: dict[str, _Node] = {}
+        # 头尾哨兵节点，省去链表端点的空值判断
+        self._head = _Node()
+        self._tail = _Node()
+        self._head.next = self._tail
+        self._tail.prev = self._head
+        self._lock = threading.Lock()
+
+    def _unlink(self, node: _Node) -> None:
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _append(self, node: _Node) -> None:
+        tail = self._tail
+        last = tail.prev
+        last.next = node
+        node.prev = last
+        node.next = tail
+        tail.prev = node
 
     def get(self, entry_id: str) -> Optional[MemoryEntry]:
         """获取记忆条目（命中时移到最近使用位置）
@@ -45,11 +77,15 @@ class ActivePool:
         Returns:
             命中的 MemoryEntry，未命中返回 None
         """
-        if entry_id not in self._pool:
-            return None
-        # 移到末尾（最近使用位置）
-        self._pool.move_to_end(entry_id)
-        return self._pool[entry_id]
+        with self._lock:
+            node = self._map.get(entry_id)
+            if node is None:
+                return None
+            # 移到末尾（最近使用位置）
+            if node.next is not self._tail:
+                self._unlink(node)
+                self._append(node)
+            return node.entry
 
     def put(self, entry: MemoryEntry) -> Optional[MemoryEntry]:
         """放入记忆条目，返回被淘汰的记忆（如果有）
@@ -65,20 +101,27 @@ class ActivePool:
         """
         evicted = None
 
-        # 如果已存在，先移除旧条目（不算淘汰）
-        if entry.id in self._pool:
-            self._pool.move_to_end(entry.id)
-            self._pool[entry.id] = entry
-            return None
-
-        # 池已满，淘汰最久未使用的条目（头部）
-        if len(self._pool) >= self.capacity:
-            # popitem(last=False) 弹出头部（最久未使用）
-            evicted_id, evicted = self._pool.popitem(last=False)
-            logger.debug(f"[ActivePool] 淘汰记忆: {evicted_id}")
-
-        # 放入新条目（末尾，最近使用位置）
-        self._pool[entry.id] = entry
+        with self._lock:
+            node = self._map.get(entry.id)
+            # 如果已存在，更新并移到末尾（不算淘汰）
+            if node is not None:
+                node.entry = entry
+                self._unlink(node)
+                self._append(node)
+                return None
+
+            # 池已满，淘汰最久未使用的条目（头部）
+            if len(self._map) >= self.capacity:
+                oldest = self._head.next
+                self._unlink(oldest)
+                evicted = oldest.entry
+                del self._map[evicted.id]
+                logger.debug(f"[ActivePool] 淘汰记忆: {evicted.id}")
+
+            # 放入新条目（末尾，最近使用位置）
+            node = _Node(entry)
+            self._map[entry.id] = node
+            self._append(node)
         return evicted
 
     def search(self, entry_ids: list[str]) -> list[MemoryEntry]:
@@ -92,11 +135,9 @@ class ActivePool:
         Returns:
             在池中找到的 MemoryEntry 列表
         """
-        results = []
-        for eid in entry_ids:
-            if eid in self._pool:
-                results.append(self._pool[eid])
-        return results
+        # map(dict.get) 在 C 层批量探测，节点本身不会为 None，无需哨兵值
+        with self._lock:
+            return [n.entry for n in map(self._map.get, entry_ids) if n is not None]
 
     def preload(self, entries: list[MemoryEntry]) -> None:
         """预加载记忆条目（服务启动时调用）
@@ -107,12 +148,23 @@ class ActivePool:
         Args:
             entries: 要预加载的记忆条目列表（应按 last_hit_at 降序排列）
         """
-        for entry in entries:
-            if len(self._pool) >= self.capacity and entry.id not in self._pool:
-                # 池已满且不是更新已有条目，跳过
-                break
-            self._pool[entry.id] = entry
-        logger.info(f"[ActivePool] 预加载完成，当前池大小: {len(self._pool)}/{self.capacity}")
+        with self._lock:
+            nodes = self._map
+            cap = self.capacity
+            for entry in entries:
+                node = nodes.get(entry.id)
+                if node is not None:
+                    # 更新已有条目，保持其 LRU 位置
+                    node.entry = entry
+                    continue
+                if len(nodes) >= cap:
+                    # 池已满且不是更新已有条目，跳过
+                    break
+                node = _Node(entry)
+                nodes[entry.id] = node
+                self._append(node)
+            size = len(nodes)
+        logger.info(f"[ActivePool] 预加载完成，当前池大小: {size}/{cap}")
 
     def size(self) -> int:
         """当前池中记忆数量
@@ -120,4 +172,4 @@ class ActivePool:
         Returns:
             池中条目数量
         """
-        return len(self._pool)
+        return len(self._map)
@@ -9,8 +9,298 @@
 - boolean_search: 布尔逻辑搜索（AND/OR/NOT），按相关性分数降序排列
 """
 
+import heapq
 import re
-from typing import List
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+# 可选依赖：google-re2（线性时间 DFA 匹配，不会发生灾难性回溯）
+try:
+    import re2
+    _RE2_OPTIONS = re2.Options()
+    _RE2_OPTIONS.case_sensitive = False
+    _RE2_OPTIONS.log_errors = False
+    _HAS_RE2 = True
+except ImportError:
+    _HAS_RE2 = False
+
+# 可选依赖：pyahocorasick（多词项单遍扫描）
+try:
+    import ahocorasick
+    _HAS_AHOCORASICK = True
+except ImportError:
+    _HAS_AHOCORASICK = False
+
+# 可选依赖：hyperscan（SIMD 多模式匹配，用于纯字面量模式的快速扫描）
+try:
+    import hyperscan
+    _HAS_HYPERSCAN = True
+except ImportError:
+    _HAS_HYPERSCAN = False
+
+# 正则元字符：模式不含这些字符时即为纯字面量
+_REGEX_META_REGEX = re.compile(r"[.^$*+?{}\[\]\\|()]")
+# hyperscan 分块扫描的块大小（字符数），分块编码使 limit 命中后可提前结束
+_HS_BLOCK_CHARS = 1 << 16
+
+# re2 的 \w \d \s \b 等简写类只匹配 ASCII，含这些写法的模式仍交给 re，保证中文文本上的语义不变
+_UNICODE_SHORTHAND_REGEX = re.compile(r"\\[wWdDsSbB]")
+# 布尔查询操作符（必须大写，前后为单词边界）
+_BOOL_OPERATOR_REGEX = re.compile(r"\b(AND|OR|NOT)\b")
+
+# 分块并行正则扫描：块尾向后多取的字符数（跨块匹配的长度上限），以及块首保留的上文
+# 字符数（使 ^、\b、后行断言在块起点处按原文判断）
+_SCAN_OVERLAP_CHARS = 4096
+_SCAN_LOOKBEHIND_CHARS = 256
+
+# 大文档全文的小写副本缓存：id(text) -> (text, text_lower)，按对象身份校验
+_LOWER_CACHE: "OrderedDict[int, tuple]" = OrderedDict()
+_LOWER_CACHE_SIZE = 4
+_LOWER_CACHE_MIN_CHARS = 50_000
+_LOWER_CACHE_LOCK = threading.Lock()
+
+
+class _LiteralMatch:
+    """_LiteralScanner 产出的匹配对象，提供 regex_search 用到的 re.Match 接口子集"""
+
+    __slots__ = ("_text", "_start", "_end")
+
+    def __init__(self, text: str, start: int, end: int):
+        self._text = text
+        self._start = start
+        self._end = end
+
+    def group(self, index: int = 0) -> str:
+        return self._text[self._start:self._end]
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+
+class _LiteralScanner:
+    """基于 hyperscan 的忽略大小写字面量扫描器，finditer 语义与 re 一致（不重叠、从左到右）
+
+    文本按 _HS_BLOCK_CHARS 分块编码为 UTF-8 后扫描，字节偏移在块内增量换算为字符偏移；
+    scratch 空间不可并发共享，按线程各建一份。
+    """
+
+    def __init__(self, literal: str):
+        self._width = len(literal)
+        self._db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        self._db.compile(
+            expressions=[literal.encode("utf-8")],
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST],
+        )
+        self._local = threading.local()
+
+    def finditer(self, text: str, pos: int = 0):
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None:
+            scratch = self._local.scratch = hyperscan.Scratch(self._db)
+
+        width = self._width
+        last_end = pos
+        for block_start in range(pos, len(text), _HS_BLOCK_CHARS):
+            block_end = block_start + _HS_BLOCK_CHARS
+            # 多取 width-1 个字符，使起点落在本块内的匹配完整可见
+            chunk = text[block_start:block_end + width - 1]
+            data = chunk.encode("utf-8")
+            starts: List[int] = []
+            self._db.scan(
+                data,
+                match_event_handler=lambda _id, start, _end, _flags, _ctx: starts.append(start),
+                scratch=scratch,
+            )
+            is_ascii = len(data) == len(chunk)
+            prev_byte = prev_char = 0
+            for byte_start in starts:
+                if is_ascii:
+                    char_start = byte_start
+                else:
+                    prev_char += len(data[prev_byte:byte_start].decode("utf-8"))
+                    prev_byte = byte_start
+                    char_start = prev_char
+                start = block_start + char_start
+                if start >= block_end:
+                    break
+                if start < last_end:
+                    continue
+                last_end = start + width
+                yield _LiteralMatch(text, start, last_end)
+
+
+def _is_hyperscan_literal(pattern: str) -> bool:
+    """纯字面量且非 ASCII 字符均无大小写之分（hyperscan 的 CASELESS 只折叠 ASCII）"""
+    if _REGEX_META_REGEX.search(pattern):
+        return False
+    return all(ch.isascii() or ch.lower() == ch.upper() for ch in pattern)
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> Any:
+    if _HAS_HYPERSCAN and _is_hyperscan_literal(pattern):
+        try:
+            return _LiteralScanner(pattern)
+        except hyperscan.error:
+            pass
+    if _HAS_RE2 and not _UNICODE_SHORTHAND_REGEX.search(pattern):
+        try:
+            return re2.compile("(?m)" + pattern, _RE2_OPTIONS)
+        except re2.error:
+            # 反向引用、环视等 re2 不支持的语法回退到 re
+            pass
+    return re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+
+
+@lru_cache(maxsize=256)
+def _build_term_automaton(terms_lower: tuple) -> Any:
+    """为一组小写词项构建 Aho-Corasick 自动机，相同词项组合复用"""
+    automaton = ahocorasick.Automaton()
+    for term in terms_lower:
+        automaton.add_word(term, (term, len(term)))
+    automaton.make_automaton()
+    return automaton
+
+
+@lru_cache(maxsize=256)
+def _term_regex(term_lower: str) -> "re.Pattern":
+    """编译词项的大小写不敏感查找正则，直接在原文上扫描，无需整篇小写副本
+
+    词项可与自身重叠（存在相同的真前缀与真后缀，如 "aa"、"abab"）时用前瞻捕获，
+    以保留重叠出现；其余词项的出现不可能重叠，普通 finditer 即可。
+    """
+    escaped = re.escape(term_lower)
+    if any(term_lower[:k] == term_lower[-k:] for k in range(1, len(term_lower))):
+        return re.compile(f"(?=({escaped}))", re.IGNORECASE)
+    return re.compile(f"({escaped})", re.IGNORECASE)
+
+
+def _lowered(text: str) -> str:
+    """返回全文的小写副本；同一文档文本对象被反复布尔检索时复用，不再每次复制整篇"""
+    if len(text) < _LOWER_CACHE_MIN_CHARS:
+        return text.lower()
+    key = id(text)
+    with _LOWER_CACHE_LOCK:
+        entry = _LOWER_CACHE.get(key)
+        if entry is not None and entry[0] is text:
+            _LOWER_CACHE.move_to_end(key)
+            return entry[1]
+    text_lower = text.lower()
+    with _LOWER_CACHE_LOCK:
+        _LOWER_CACHE[key] = (text, text_lower)
+        _LOWER_CACHE.move_to_end(key)
+        while len(_LOWER_CACHE) > _LOWER_CACHE_SIZE:
+            _LOWER_CACHE.popitem(last=False)
+    return text_lower
+
+
+def compile_search_pattern(pattern: str) -> Any:
+    """编译正则搜索模式（忽略大小写、多行），相同模式复用已编译对象
+
+    纯字面量模式在安装了 hyperscan 时走 SIMD 扫描；其余模式在安装了 google-re2 时
+    优先使用线性时间的 re2，语法不兼容时回退到 re。
+
+    异常:
+        ValueError: 正则表达式语法无效时抛出
+    """
+    try:
+        return _compile_pattern(pattern)
+    except re.error as e:
+        raise ValueError(f"正则表达式语法错误: {e}")
+
+
+def plan_regex_scan(text: str, parts: int) -> List[Tuple[str, int, int, int]]:
+    """把全文切成 parts 个扫描区间，返回 (文本切片, 切片起点, 区间起点, 区间终点)
+
+    切片在区间前后各多取一段上下文，匹配起点仍只认落在 [区间起点, 区间终点) 内的，
+    相邻区间的结果拼接后与整篇扫描一致（跨块匹配长度不超过 _SCAN_OVERLAP_CHARS 时）。
+    """
+    size = -(-len(text) // parts)
+    plans = []
+    for start in range(0, len(text), size):
+        end = min(start + size, len(text))
+        slice_start = max(0, start - _SCAN_LOOKBEHIND_CHARS)
+        plans.append((text[slice_start:end + _SCAN_OVERLAP_CHARS], slice_start, start, end))
+    return plans
+
+
+def regex_scan_range_worker(
+    pattern: str, text_slice: str, slice_start: int, start: int, end: int, limit: int
+) -> List[Tuple[int, int]]:
+    """进程池入口：返回起点落在 [start, end) 内的前 limit 个非空匹配的全文 (start, end)"""
+    regex = _compile_pattern(pattern)
+    spans = []
+    for match in regex.finditer(text_slice, start - slice_start):
+        match_start = match.start() + slice_start
+        if match_start >= end:
+            break
+        match_end = match.end() + slice_start
+        if match_start == match_end:
+            continue
+        spans.append((match_start, match_end))
+        if len(spans) >= limit:
+            break
+    return spans
+
+
+def merge_scan_spans(span_lists: List[List[Tuple[int, int]]], limit: int) -> List[Tuple[int, int]]:
+    """按区间顺序合并各块结果，丢弃与上一块末尾匹配重叠的匹配（与顺序扫描的不重叠语义一致）"""
+    merged = []
+    last_end = -1
+    for spans in span_lists:
+        for span in spans:
+            if span[0] < last_end:
+                continue
+            merged.append(span)
+            last_end = span[1]
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+def build_match_results(text: str, spans: List[Tuple[int, int]], context_chars: int) -> List[dict]:
+    """由匹配区间构造 regex_search 的返回结构"""
+    text_len = len(text)
+    return [
+        {
+            "match_text": text[start:end],
+            "match_offset": start,
+            "context_snippet": text[max(0, start - context_chars):min(text_len, end + context_chars)],
+            "score": 1.0,
+        }
+        for start, end in spans
+    ]
+
+
+def attach_context_snippets(text: str, results: List[dict]) -> List[dict]:
+    """把 return_offsets_only 结果中的 context_start/context_end 就地替换为 context_snippet"""
+    for item in results:
+        item["context_snippet"] = text[item.pop("context_start"):item.pop("context_end")]
+    return results
+
+
+def regex_search_worker(pattern: str, text: str, limit: int, context_chars: int) -> List[dict]:
+    """进程池入口：在子进程内编译并执行正则搜索（编译对象不跨进程传递）
+
+    只回传上下文偏移，片段由父进程用 attach_context_snippets 切取，
+    避免 limit 个上下文片段在子进程中复制后再经 pickle 传回。
+    """
+    return AdvancedSearchService().regex_search(
+        pattern, text, limit, context_chars, return_offsets_only=True
+    )
+
+
+def boolean_search_worker(query: str, text: str, limit: int, context_chars: int) -> List[dict]:
+    """进程池入口：在子进程内执行布尔搜索"""
+    return AdvancedSearchService().boolean_search(query, text, limit, context_chars)
 
 
 class AdvancedSearchService:
@@ -18,18 +308,21 @@ class AdvancedSearchService:
 
     def regex_search(
         self,
-        pattern: str,
+        pattern: Union[str, Any],
         text: str,
         limit: int = 20,
         context_chars: int = 200,
+        return_offsets_only: bool = False,
     ) -> List[dict]:
         """正则表达式搜索，返回匹配结果和上下文片段
 
         参数:
-            pattern: 正则表达式模式
+            pattern: 正则表达式模式，或 compile_search_pattern 返回的已编译对象（re / re2 / hyperscan）
             text: 要搜索的文本
             limit: 最大返回结果数，默认 20
             context_chars: 上下文片段的前后字符数，默认 200
+            return_offsets_only: 为 True 时不切取 context_snippet，改为返回
+                context_start / context_end，由调用方在需要时再切片
 
         返回:
             匹配结果列表，每项包含:
@@ -41,14 +334,15 @@ class AdvancedSearchService:
         异常:
             ValueError: 正则表达式语法无效时抛出
         """
-        if not pattern or not text:
-            return []
-
-        # 编译正则表达式，语法无效时抛出 ValueError
-        try:
-            regex = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
-        except re.error as e:
-            raise ValueError(f"正则表达式语法错误: {e}")
+        if isinstance(pattern, str):
+            if not pattern or not text:
+                return []
+            # 编译正则表达式，语法无效时抛出 ValueError
+            regex = compile_search_pattern(pattern)
+        else:
+            regex = pattern
+            if not text:
+                return []
 
         results = []
         count = 0
@@ -68,14 +362,22 @@ class AdvancedSearchService:
             # 提取上下文片段
             context_start = max(0, match_start - context_chars)
             context_end = min(len(text), match_end + context_chars)
-            context_snippet = text[context_start:context_end]
 
-            results.append({
-                "match_text": match_text,
-                "match_offset": match_start,
-                "context_snippet": context_snippet,
-                "score": 1.0,
-            })
+            if return_offsets_only:
+                results.append({
+                    "match_text": match_text,
+                    "match_offset": match_start,
+                    "context_start": context_start,
+                    "context_end": context_end,
+                    "score": 1.0,
+                })
+            else:
+                results.append({
+                    "match_text": match_text,
+                    "match_offset": match_start,
+                    "context_snippet": text[context_start:context_end],
+                    "score": 1.0,
+                })
 
             count += 1
 
@@ -111,25 +413,56 @@ class AdvancedSearchService:
         if not query or not text:
             return []
 
+        max_score, matches = self._boolean_scan(query, text, context_chars)
+        results = []
+        # 已有 limit 个满分结果时，后续锚点按稳定顺序不可能再进入前 limit 名，可直接结束扫描
+        top_count = 0
+        for item in matches:
+            results.append(item)
+            if item["score"] >= max_score:
+                top_count += 1
+                if top_count >= limit:
+                    break
+
+        # 按 score 降序取前 limit 条：nlargest 为 O(N log k)，同分时保持原有顺序，
+        # 与完整稳定排序后截断的结果一致
+        return heapq.nlargest(limit, results, key=itemgetter("score"))
+
+    def iter_boolean_matches(
+        self,
+        query: str,
+        text: str,
+        context_chars: int = 200,
+    ) -> Iterator[dict]:
+        """按锚点在文中出现的顺序逐条产出布尔匹配（不排序、不截断），供流式输出边扫描边发送
+
+        本身是生成器，词项定位也推迟到首次迭代时执行，可整体放到线程池中逐步迭代。
+        每项结构与 boolean_search 的返回项相同。
+        """
+        if not query or not text:
+            return
+        yield from self._boolean_scan(query, text, context_chars)[1]
+
+    def _boolean_scan(self, query: str, text: str, context_chars: int) -> Tuple[float, Iterator[dict]]:
+        """解析布尔查询并定位词项，返回 (单个结果可能达到的最高分, 按锚点顺序产出匹配的迭代器)"""
         # 解析布尔查询，提取 must/should/not 词项
         must_terms, should_terms, not_terms = self._parse_boolean_query(query)
 
         # 如果没有任何有效词项，返回空结果
         if not must_terms and not should_terms:
-            return []
+            return 0.0, iter(())
 
         # 查找所有词项在文本中的位置
-        text_lower = text.lower()
-        term_positions = {}
-        all_terms = set(must_terms + should_terms + not_terms)
-        for term in all_terms:
-            term_positions[term] = self._find_term_positions(
-                term.lower(), text_lower
-            )
+        all_terms = set(chain(must_terms, should_terms, not_terms))
+        term_positions = self._find_all_term_positions(all_terms, text)
 
         # 确定基础搜索词项（must 优先，否则用 should 的第一个）
         if must_terms:
-            base_terms = must_terms
+            # 以出现次数最少的 must 词项为锚点，外层循环次数降到最低；
+            # 任一 must 词项未出现时不可能有结果
+            base_terms = sorted(must_terms, key=lambda t: len(term_positions.get(t, ())))
+            if not term_positions.get(base_terms[0]):
+                return 0.0, iter(())
         else:
             base_terms = [should_terms[0]]
             should_terms = should_terms[1:]
@@ -138,85 +471,78 @@ class AdvancedSearchService:
         base_positions = term_positions.get(base_terms[0], [])
         window_size = 500  # 布尔条件的窗口范围（字符数）
 
-        results = []
-        seen_positions = set()
-
-        for base_pos in base_positions:
-            base_start = base_pos["start"]
-            base_end = base_pos["end"]
-
-            # 检查所有 must 词项是否在窗口范围内
-            is_valid = True
-            matched_terms = [base_terms[0]]
-            min_pos = base_start
-            max_pos = base_end
-            score = 1.0
-
-            for term in base_terms[1:]:
-                positions = term_positions.get(term, [])
-                nearby = self._find_nearby_position(
-                    positions, base_start, window_size
-                )
-                if nearby is None:
-                    is_valid = False
-                    break
-                matched_terms.append(term)
-                min_pos = min(min_pos, nearby["start"])
-                max_pos = max(max_pos, nearby["end"])
-                score += 1.0
-
-            if not is_valid:
-                continue
-
-            # 检查 should 词项（加分项）
-            for term in should_terms:
-                positions = term_positions.get(term, [])
-                nearby = self._find_nearby_position(
-                    positions, base_start, window_size
-                )
-                if nearby is not None:
-                    matched_terms.append(term)
-                    min_pos = min(min_pos, nearby["start"])
-                    max_pos = max(max_pos, nearby["end"])
-                    score += 0.5
-
-            # 检查 NOT 词项（排除）
-            for term in not_terms:
-                positions = term_positions.get(term, [])
-                nearby = self._find_nearby_position(
-                    positions, base_start, window_size
-                )
-                if nearby is not None:
-                    is_valid = False
-                    break
-
-            if not is_valid:
-                continue
-
-            # 去重：避免同一位置重复出现
-            pos_key = (min_pos, max_pos)
-            if pos_key in seen_positions:
-                continue
-            seen_positions.add(pos_key)
+        # 各词项的位置列表及其 start 平行列表在锚点循环外备好，循环内只做二分与比较
+        def positions_with_starts(term):
+            positions = term_positions.get(term, [])
+            return positions, [start for start, _ in positions]
+
+        must_positions = [positions_with_starts(term) for term in base_terms[1:]]
+        should_positions = [positions_with_starts(term) for term in should_terms]
+        not_positions = [positions_with_starts(term) for term in not_terms]
+        find_nearby = self._find_nearby_position
+        max_score = 1.0 + len(must_positions) + 0.5 * len(should_positions)
+
+        def matches():
+            seen_positions = set()
+            for base_start, base_end in base_positions:
+                # 检查所有 must 词项是否在窗口范围内
+                is_valid = True
+                min_pos = base_start
+                max_pos = base_end
+                score = 1.0
+
+                for positions, starts in must_positions:
+                    nearby = find_nearby(positions, base_start, window_size, starts)
+                    if nearby is None:
+                        is_valid = False
+                        break
+                    start, end = nearby
+                    if start < min_pos:
+                        min_pos = start
+                    if end > max_pos:
+                        max_pos = end
+                    score += 1.0
+
+                if not is_valid:
+                    continue
 
-            # 提取匹配文本和上下文片段
-            match_text = text[min_pos:max_pos]
-            context_start = max(0, min_pos - context_chars)
-            context_end = min(len(text), max_pos + context_chars)
-            context_snippet = text[context_start:context_end]
+                # 检查 should 词项（加分项）
+                for positions, starts in should_positions:
+                    nearby = find_nearby(positions, base_start, window_size, starts)
+                    if nearby is not None:
+                        start, end = nearby
+                        if start < min_pos:
+                            min_pos = start
+                        if end > max_pos:
+                            max_pos = end
+                        score += 0.5
+
+                # 检查 NOT 词项（排除）
+                for positions, starts in not_positions:
+                    if find_nearby(positions, base_start, window_size, starts) is not None:
+                        is_valid = False
+                        break
+
+                if not is_valid:
+                    continue
 
-            results.append({
-                "match_text": match_text,
-                "match_offset": min_pos,
-                "context_snippet": context_snippet,
-                "score": score,
-            })
+                # 去重：避免同一位置重复出现
+                pos_key = (min_pos, max_pos)
+                if pos_key in seen_positions:
+                    continue
+                seen_positions.add(pos_key)
 
-        # 按 score 降序排列
-        results.sort(key=lambda x: x["score"], reverse=True)
+                # 提取匹配文本和上下文片段
+                context_start = max(0, min_pos - context_chars)
+                context_end = min(len(text), max_pos + context_chars)
+                yield {
+                    "match_text": text[min_pos:max_pos],
+                    "match_offset": min_pos,
+                    "context_snippet": text[context_start:context_end],
+                    "score": score,
+                }
 
-        # 限制结果数量
-        return results[:limit]
+        return max_score, matches()
 
     def _parse_boolean_query(self, query: str):
         """解析布尔查询表达式，提取 must/should/not 词项
@@ -272,7 +598,7 @@ class AdvancedSearchService:
         tokens = []
         # 使用正则匹配 AND/OR/NOT 操作符（前后需要空白或边界）
         # 操作符必须大写
-        parts = re.split(r'\b(AND|OR|NOT)\b', query)
+        parts = _BOOL_OPERATOR_REGEX.split(query)
 
         for part in parts:
             part = part.strip()
@@ -285,52 +611,97 @@ class AdvancedSearchService:
 
         return tokens
 
+    def _find_all_term_positions(self, terms: set, text: str) -> dict:
+        """查找多个词项在文本中的所有出现位置（大小写不敏感）
+
+        安装了 pyahocorasick 且词项多于一个时，用 Aho-Corasick 自动机单遍扫描全文的
+        小写副本；否则逐词项用大小写不敏感正则直接扫描原文，不复制整篇文档。
+        两种方式都返回包含重叠出现的完整位置列表。
+
+        返回:
+            {原始词项: [(start, end), ...]}，按 start 升序
+        """
+        # 仅大小写不同的词项共用一份位置列表
+        lower_to_terms: dict = {}
+        for term in terms:
+            lower_to_terms.setdefault(term.lower(), []).append(term)
+
+        text_lower = None
+        if _HAS_AHOCORASICK and len(lower_to_terms) >= 2:
+            text_lower = _lowered(text)
+            # 个别字符（如 "İ"）小写后长度改变，小写副本上的偏移与原文不再对齐
+            if len(text_lower) != len(text):
+                text_lower = None
+
+        if text_lower is None:
+            term_positions = {}
+            for term_lower, originals in lower_to_terms.items():
+                positions = self._find_term_positions(term_lower, text)
+                term_positions.update(dict.fromkeys(originals, positions))
+            return term_positions
+
+        automaton = _build_term_automaton(tuple(sorted(lower_to_terms)))
+
+        hits: dict = {term_lower: [] for term_lower in lower_to_terms}
+        for end_idx, (term_lower, length) in automaton.iter(text_lower):
+            hits[term_lower].append((end_idx - length + 1, end_idx + 1))
+
+        term_positions = {}
+        for term_lower, originals in lower_to_terms.items():
+            for term in originals:
+                term_positions[term] = hits[term_lower]
+        return term_positions
+
     def _find_term_positions(
-        self, term_lower: str, text_lower: str
-    ) -> List[dict]:
+        self, term_lower: str, text: str
+    ) -> List[Tuple[int, int]]:
         """查找词项在文本中的所有出现位置（大小写不敏感）
 
         参数:
             term_lower: 小写化的搜索词项
-            text_lower: 小写化的文本
+            text: 原始文本
 
         返回:
-            位置列表，每项包含 start 和 end
+            位置列表，每项为 (start, end)，包含重叠出现
         """
-        positions = []
-        pos = 0
-        while True:
-            idx = text_lower.find(term_lower, pos)
-            if idx == -1:
-                break
-            positions.append({
-                "start": idx,
-                "end": idx + len(term_lower),
-            })
-            pos = idx + 1
-        return positions
+        if not term_lower:
+            return []
+        return [match.span(1) for match in _term_regex(term_lower).finditer(text)]
 
     def _find_nearby_position(
         self,
-        positions: List[dict],
+        positions: List[Tuple[int, int]],
         anchor: int,
         window_size: int,
-    ) -> dict:
+        starts: Optional[List[int]] = None,
+    ) -> Optional[Tuple[int, int]]:
         """在位置列表中查找距离锚点最近且在窗口范围内的位置
 
         参数:
-            positions: 位置列表
+            positions: (start, end) 位置列表（按 start 升序）
             anchor: 锚点位置
             window_size: 窗口大小（字符数）
+            starts: 与 positions 平行的 start 列表；同一词项被多次查询时预先算好传入
 
         返回:
-            最近的位置字典，或 None（无匹配）
+            最近的 (start, end)，或 None（无匹配）
         """
+        # positions 按 start 升序，二分定位锚点两侧的最近位置；距离相同时取左侧（与顺序扫描一致）
+        if starts is not None:
+            idx = bisect_left(starts, anchor)
+        else:
+            # (anchor,) 小于任何 (anchor, end)，bisect_left 落在第一个 start >= anchor 处
+            idx = bisect_left(positions, (anchor,))
         best = None
-        best_distance = float("inf")
-        for pos in positions:
-            distance = abs(pos["start"] - anchor)
-            if distance <= window_size and distance < best_distance:
-                best = pos
+        best_distance = window_size + 1
+        if idx > 0:
+            left = positions[idx - 1]
+            best_distance = anchor - left[0]
+            best = left
+        if idx < len(positions):
+            right = positions[idx]
+            distance = right[0] - anchor
+            if distance < best_distance:
+                best = right
                 best_distance = distance
-        return best
+        return best if best_distance <= window_size else None
@@ -7,15 +7,24 @@ BM25检索服务 - 轻量级关键词检索，作为向量检索的补充
 - 两者结合使用，互补优势
 
 实现说明：
-- 纯Python实现，无需额外依赖（不需要rank-bm25/jieba）
+- 不依赖 rank-bm25/jieba；打分用 NumPy 按词项倒排数组向量化累加
 - 中文使用字符级unigram+bigram分词（效果接近jieba，零依赖）
 - 英文使用空格分词+小写化
-- 支持内存缓存，避免重复构建索引
+- 支持内存缓存，避免重复构建索引；配置持久化目录后按内容指纹落盘，重启后免重建
 """
-import math
+import glob
+import hashlib
+import logging
+import os
 import re
+from collections import Counter
+from itertools import repeat
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 try:
     import jieba
@@ -23,6 +32,19 @@ try:
 except ImportError:
     _HAS_JIEBA = False
 
+# 可选依赖：numba（把逐 token 的倒排累加融合为一次原生调用；桌面打包排除了 numba）
+try:
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# 倒排词频以 uint16 存储，单个 chunk 内同一 term 出现更多次时截断
+_MAX_TF = np.iinfo(np.uint16).max
+
+# 中文片段 / 英文数字片段
+_SEGMENT_REGEX = re.compile(r'[\u4e00-\u9fff]+|[a-z0-9]+')
+
 # 运行时开关：由 config.settings.bm25_use_jieba 控制
 _use_jieba: Optional[bool] = None
 
@@ -38,7 +60,7 @@ def _should_use_jieba() -> bool:
         return _HAS_JIEBA
 
 
-def _tokenize(text: str) -> List[str]:
+def _tokenize(text: str, trigrams: bool = True) -> List[str]:
     """
     混合分词：中文用 jieba 分词（可选）或字符级 n-gram，英文用空格分词
 
@@ -47,7 +69,8 @@ def _tokenize(text: str) -> List[str]:
     - 英文：整词 + 小写化
     - 数字：保留（用于匹配公式编号、年份等）
 
-    当 jieba 不可用时回退到字符级 unigram+bigram+trigram（零依赖）。
+    当 jieba 不可用时回退到字符级 unigram+bigram(+trigram)（零依赖），
+    trigrams=False 时不生成 trigram。
     """
     if not text:
         return []
@@ -56,117 +79,207 @@ def _tokenize(text: str) -> List[str]:
     text = text.lower()
 
     # 分离中文和英文/数字片段
-    segments = re.findall(r'[\u4e00-\u9fff]+|[a-z0-9]+', text)
+    segments = _SEGMENT_REGEX.findall(text)
 
     use_jieba = _should_use_jieba()
 
     for seg in segments:
-        if re.match(r'[\u4e00-\u9fff]', seg):
+        if "\u4e00" <= seg[0] <= "\u9fff":
             if use_jieba:
                 # jieba 分词 + bigram 补充
                 words = list(jieba.cut(seg))
-                tokens.extend(w for w in words if w.strip())
+                tokens.extend([w for w in words if w.strip()])
                 # 补充 bigram 提升短语匹配
-                for i in range(len(words) - 1):
-                    tokens.append(words[i] + words[i + 1])
+                tokens.extend([words[i] + words[i + 1] for i in range(len(words) - 1)])
             else:
-                # 回退：unigram + bigram + trigram
-                for ch in seg:
-                    tokens.append(ch)
-                for i in range(len(seg) - 1):
-                    tokens.append(seg[i:i+2])
-                for i in range(len(seg) - 2):
-                    tokens.append(seg[i:i+3])
-        else:
+                # 回退：unigram + bigram (+ trigram)，直接对片段切片批量生成
+                n = len(seg)
+                tokens.extend(seg)
+                tokens.extend([seg[i:i + 2] for i in range(n - 1)])
+                if trigrams:
+                    tokens.extend([seg[i:i + 3] for i in range(n - 2)])
+        elif len(seg) > 1:
             # 英文/数字：整词
-            if len(seg) > 1:
-                tokens.append(seg)
+            tokens.append(seg)
 
     return tokens
 
 
+def _accumulate_postings_py(term_ids, term_offsets, posting_docs, posting_weights, scores):
+    """按查询 term 顺序把各自倒排区间的贡献累加到 scores（NumPy 实现）"""
+    for tid in term_ids:
+        # 同一 term 的文档索引互不重复，可直接花式索引累加
+        lo, hi = term_offsets[tid], term_offsets[tid + 1]
+        scores[posting_docs[lo:hi]] += posting_weights[lo:hi]
+
+
+if _HAS_NUMBA:
+    @njit(cache=True, nogil=True)
+    def _accumulate_postings(term_ids, term_offsets, posting_docs, posting_weights, scores):
+        for tid in term_ids:
+            for p in range(term_offsets[tid], term_offsets[tid + 1]):
+                scores[posting_docs[p]] += posting_weights[p]
+else:
+    _accumulate_postings = _accumulate_postings_py
+
+
 class BM25Index:
     """
     BM25Okapi实现
-    
+
+    倒排索引以 CSC（term 主序）的平行数组存储：term 的倒排区间为
+    term_offsets[tid]:term_offsets[tid + 1]，区间内依次为文档索引与该文档上的
+    BM25 贡献，打分时顺序读取连续内存。
+
     参数：
     - k1: 词频饱和参数，默认1.5
     - b: 文档长度归一化参数，默认0.75
+    - use_trigrams: 回退分词是否生成中文 trigram，默认关闭（查询通常很短，
+      trigram 很少命中，却让中文 token 数从 2n-1 增到 3n-3）
     """
 
-    def __init__(self, k1: float = 1.5, b: float = 0.75):
+    # 旧版（逐文档 dict 存储）持久化对象上的属性，重建时清除
+    _LEGACY_ATTRS = ("term_freqs", "inverted_index", "doc_freqs", "idf", "_postings")
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, use_trigrams: bool = False):
         self.k1 = k1
         self.b = b
+        self.use_trigrams = use_trigrams
         self.doc_count = 0
         self.avg_dl = 0.0
-        self.doc_lengths: List[int] = []
-        self.doc_freqs: Dict[str, int] = {}  # term -> 出现该term的文档数
-        self.term_freqs: List[Dict[str, int]] = []  # 每个文档的term频率
-        self.idf: Dict[str, float] = {}
         self.chunks: List[str] = []
-        # 倒排索引: term -> 包含该 term 的文档索引列表
-        self.inverted_index: Dict[str, List[int]] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.vocab: Dict[str, int] = {}  # term -> term id
+        self.idf_vec = np.zeros(0, dtype=np.float64)
+        self.term_offsets = np.zeros(1, dtype=np.int64)
+        self.posting_docs = np.zeros(0, dtype=np.int32)
+        self.posting_tfs = np.zeros(0, dtype=np.uint16)
+        self.posting_weights = np.zeros(0, dtype=np.float32)
 
     def build(self, chunks: List[str]):
         """构建BM25索引"""
+        for attr in self._LEGACY_ATTRS:
+            self.__dict__.pop(attr, None)
+
         self.chunks = chunks
         self.doc_count = len(chunks)
-        self.doc_lengths = []
-        self.doc_freqs = {}
-        self.term_freqs = []
-
-        for chunk in chunks:
-            tokens = _tokenize(chunk)
-            self.doc_lengths.append(len(tokens))
-
-            # 统计该文档的term频率
-            tf: Dict[str, int] = {}
-            for token in tokens:
-                tf[token] = tf.get(token, 0) + 1
-            self.term_freqs.append(tf)
-
-            # 统计文档频率（每个term在多少文档中出现）
-            seen = set(tf.keys())
-            for token in seen:
-                self.doc_freqs[token] = self.doc_freqs.get(token, 0) + 1
-
-        self.avg_dl = sum(self.doc_lengths) / max(self.doc_count, 1)
-
-        # 构建倒排索引: term -> 包含该 term 的文档索引列表
-        self.inverted_index = {}
-        for i, tf in enumerate(self.term_freqs):
-            for term in tf:
-                if term not in self.inverted_index:
-                    self.inverted_index[term] = []
-                self.inverted_index[term].append(i)
-
-        # 预计算IDF
-        self.idf = {}
-        for term, df in self.doc_freqs.items():
-            # BM25 IDF公式
-            self.idf[term] = math.log((self.doc_count - df + 0.5) / (df + 0.5) + 1.0)
-
-    def score(self, query: str) -> List[float]:
-        """计算查询与所有文档的BM25分数（使用倒排索引加速）"""
-        query_tokens = _tokenize(query)
-        scores = [0.0] * self.doc_count
-
-        for token in query_tokens:
-            if token not in self.idf:
-                continue
-            idf_val = self.idf[token]
-
-            # 通过倒排索引只访问包含该 term 的文档，避免 O(D) 全量遍历
-            for i in self.inverted_index.get(token, ()):
-                tf = self.term_freqs[i][token]
-                dl = self.doc_lengths[i]
-                # BM25 scoring
-                numerator = tf * (self.k1 + 1)
-                denominator = tf + self.k1 * (1 - self.b + self.b * dl / max(self.avg_dl, 1))
-                scores[i] += idf_val * numerator / denominator
 
+        # 逐文档用 Counter 统计 tf，(term id, 文档, tf) 以平行列表批量追加，
+        # 再由 NumPy 稳定排序转为 term 主序，避免逐条记录的 Python 级 append
+        vocab: Dict[str, int] = {}
+        assign_id = vocab.setdefault
+        flat_terms: List[int] = []
+        flat_docs: List[int] = []
+        flat_tfs: List[int] = []
+        doc_lengths: List[int] = []
+        for doc_id, chunk in enumerate(chunks):
+            tokens = _tokenize(chunk, trigrams=self._trigrams)
+            doc_lengths.append(len(tokens))
+            tf = Counter(tokens)
+            flat_terms.extend([assign_id(token, len(vocab)) for token in tf])
+            flat_tfs.extend(tf.values())
+            flat_docs.extend(repeat(doc_id, len(tf)))
+
+        term_ids = np.asarray(flat_terms, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        df = np.bincount(term_ids, minlength=len(vocab))
+        self.vocab = vocab
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.int32)
+        self.avg_dl = float(self.doc_lengths.sum()) / max(self.doc_count, 1)
+        self.term_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.term_offsets[1:])
+        self.posting_docs = np.asarray(flat_docs, dtype=np.int32)[order]
+        tfs = np.asarray(flat_tfs, dtype=np.int64)[order]
+        if tfs.size and tfs.max() > _MAX_TF:
+            logger.warning(f"BM25 词频超过 {_MAX_TF}，按上限截断")
+            np.minimum(tfs, _MAX_TF, out=tfs)
+        self.posting_tfs = tfs.astype(np.uint16)
+        # BM25 IDF公式
+        self.idf_vec = np.log((self.doc_count - df + 0.5) / (df + 0.5) + 1.0)
+        self._compute_weights()
+
+    @property
+    def _trigrams(self) -> bool:
+        # 引入该开关之前持久化的索引带 trigram 构建，查询时保持一致
+        return getattr(self, "use_trigrams", True)
+
+    def _compute_weights(self):
+        """预计算每条倒排记录的完整 BM25 贡献
+
+        k1、b、avg_dl 在 build 后固定，逐文档的 tf 饱和与长度归一化可一次算好，
+        查询时每个 token 只需一次 NumPy 散列累加。
+        """
+        # 归一化因子 k1*(1-b+b*dl/avg_dl) 只与文档有关，按文档算一次再按倒排取用；
+        # 其余步骤原地运算，构建大索引时不再产生多份倒排长度的临时数组
+        dl_norm = self.doc_lengths * (self.b / max(self.avg_dl, 1))
+        dl_norm += 1 - self.b
+        dl_norm *= self.k1
+        tf = self.posting_tfs.astype(np.float64)
+        weights = dl_norm[self.posting_docs]
+        weights += tf
+        np.divide(tf, weights, out=weights)
+        weights *= self.k1 + 1
+        weights *= np.repeat(self.idf_vec, np.diff(self.term_offsets))
+        # 以 float64 计算后存为 float32：打分时每条倒排只读 4+4 字节，累加仍用 float64
+        self.posting_weights = weights.astype(np.float32)
+
+    def _score_array(self, query: str) -> np.ndarray:
+        # 旧版持久化的索引没有 CSC 数组，首次查询时按 chunks 重建
+        if getattr(self, "vocab", None) is None:
+            self.build(self.chunks)
+
+        scores = np.zeros(self.doc_count, dtype=np.float64)
+        term_ids = [tid for tid in map(self.vocab.get, _tokenize(query, trigrams=self._trigrams)) if tid is not None]
+        if term_ids:
+            _accumulate_postings(
+                np.asarray(term_ids, dtype=np.int64),
+                self.term_offsets, self.posting_docs, self.posting_weights, scores,
+            )
         return scores
 
+    def score(self, query: str) -> List[float]:
+        """计算查询与所有文档的BM25分数（按倒排数组向量化累加）"""
+        return self._score_array(query).tolist()
+
+    def save(self, path: Path):
+        """把索引数组写入 .npz（先写临时文件再替换，避免并发读到半个文件）"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                # 分词结果不含换行符，词表按插入顺序（即 term id）以换行拼接
+                terms=np.asarray("\n".join(self.vocab)),
+                params=np.asarray([self.k1, self.b, self.avg_dl, float(self.use_trigrams)]),
+                doc_lengths=self.doc_lengths,
+                idf_vec=self.idf_vec,
+                term_offsets=self.term_offsets,
+                posting_docs=self.posting_docs,
+                posting_tfs=self.posting_tfs,
+                posting_weights=self.posting_weights,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, chunks: List[str]) -> "BM25Index":
+        """从 save 写出的 .npz 恢复索引，chunks 由调用方提供"""
+        with np.load(path, allow_pickle=False) as data:
+            k1, b, avg_dl, use_trigrams = data["params"].tolist()
+            idx = cls(k1=k1, b=b, use_trigrams=bool(use_trigrams))
+            terms = str(data["terms"][()])
+            idx.vocab = {term: tid for tid, term in enumerate(terms.split("\n"))} if terms else {}
+            idx.avg_dl = avg_dl
+            idx.doc_lengths = data["doc_lengths"]
+            idx.idf_vec = data["idf_vec"]
+            idx.term_offsets = data["term_offsets"]
+            idx.posting_docs = data["posting_docs"]
+            idx.posting_tfs = data["posting_tfs"]
+            idx.posting_weights = data["posting_weights"]
+        if len(idx.doc_lengths) != len(chunks) or len(idx.vocab) + 1 != len(idx.term_offsets):
+            raise ValueError("持久化的 BM25 索引与当前 chunks 不一致")
+        idx.chunks = chunks
+        idx.doc_count = len(chunks)
+        return idx
+
     def search(self, query: str, top_k: int = 10) -> List[dict]:
         """
         BM25检索
@@ -177,17 +290,23 @@ class BM25Index:
         if not self.chunks:
             return []
 
-        scores = self.score(query)
+        scores = self._score_array(query)
 
-        # 获取top_k结果
-        indexed_scores = [(i, s) for i, s in enumerate(scores) if s > 0]
-        indexed_scores.sort(key=lambda x: x[1], reverse=True)
+        # 获取top_k结果（稳定排序：同分时索引小的在前）
+        positive = np.flatnonzero(scores > 0)
+        if 0 < top_k < len(positive):
+            # 先用 O(D) 的 partition 找第 k 大分数，只对不低于它的候选排序；
+            # 保留全部与第 k 名同分的文档，截断结果与全量稳定排序一致
+            values = scores[positive]
+            kth = np.partition(values, len(values) - top_k)[len(values) - top_k]
+            positive = positive[values >= kth]
+        order = positive[np.argsort(-scores[positive], kind="stable")][:top_k]
 
         results = []
-        for idx, sc in indexed_scores[:top_k]:
+        for idx in order.tolist():
             results.append({
                 'chunk': self.chunks[idx],
-                'score': sc,
+                'score': float(scores[idx]),
                 'index': idx
             })
 
@@ -198,28 +317,89 @@ class BM25Index:
 # 全局BM25索引缓存（按doc_id）
 # ============================================================
 _bm25_cache: Dict[str, BM25Index] = {}
+# 持久化目录：由 app 启动时通过 init_bm25_cache_dir 注入，未设置时只做内存缓存
+_bm25_cache_dir: Optional[Path] = None
+
+
+def init_bm25_cache_dir(cache_dir: Path):
+    """初始化 BM25 索引持久化目录"""
+    global _bm25_cache_dir
+    _bm25_cache_dir = Path(cache_dir)
+    _bm25_cache_dir.mkdir(parents=True, exist_ok=True)
+
+
+def _chunks_fingerprint(chunks: List[str], trigrams: bool) -> str:
+    """chunk 内容与分词配置的指纹，内容或分词方式任一变化都会得到新指纹"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"jieba={int(_should_use_jieba())};trigrams={int(trigrams)}".encode())
+    for chunk in chunks:
+        h.update(chunk.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _persisted_path(doc_id: str, fingerprint: str) -> Optional[Path]:
+    if _bm25_cache_dir is None:
+        return None
+    return _bm25_cache_dir / f"{doc_id}_{fingerprint}.npz"
+
+
+def _remove_persisted(doc_id: str, keep: Optional[Path] = None):
+    if _bm25_cache_dir is None:
+        return
+    for path in _bm25_cache_dir.glob(f"{glob.escape(doc_id)}_*.npz"):
+        if path != keep:
+            path.unlink(missing_ok=True)
 
 
 def get_or_build_bm25(doc_id: str, chunks: List[str]) -> BM25Index:
-    """获取或构建BM25索引（带缓存）"""
-    if doc_id in _bm25_cache:
-        cached = _bm25_cache[doc_id]
-        # 简单校验：chunk数量一致就复用
-        if len(cached.chunks) == len(chunks):
-            return cached
-
-    idx = BM25Index()
-    idx.build(chunks)
+    """获取或构建BM25索引（带缓存）
+
+    同一 chunks 列表对象直接复用；否则按内容指纹校验，内存未命中时尝试
+    加载持久化的索引数组，仍未命中才重新构建并落盘。
+    """
+    cached = _bm25_cache.get(doc_id)
+    if cached is not None and cached.chunks is chunks:
+        return cached
+
+    fingerprint = _chunks_fingerprint(chunks, trigrams=False)
+    if cached is not None and getattr(cached, "fingerprint", None) == fingerprint:
+        cached.chunks = chunks
+        return cached
+
+    path = _persisted_path(doc_id, fingerprint)
+    idx = None
+    if path is not None and path.exists():
+        try:
+            idx = BM25Index.load(path, chunks)
+        except Exception as e:
+            logger.warning(f"[{doc_id}] 加载持久化 BM25 索引失败，重新构建: {e}")
+
+    if idx is None:
+        idx = BM25Index()
+        idx.build(chunks)
+        if path is not None:
+            try:
+                idx.save(path)
+                _remove_persisted(doc_id, keep=path)
+            except OSError as e:
+                logger.warning(f"[{doc_id}] 持久化 BM25 索引失败: {e}")
+
+    idx.fingerprint = fingerprint
     _bm25_cache[doc_id] = idx
     return idx
 
 
 def clear_bm25_cache(doc_id: Optional[str] = None):
-    """清除BM25缓存"""
+    """清除BM25缓存（含持久化文件）"""
     if doc_id:
         _bm25_cache.pop(doc_id, None)
+        _remove_persisted(doc_id)
     else:
         _bm25_cache.clear()
+        if _bm25_cache_dir is not None:
+            for path in _bm25_cache_dir.glob("*.npz"):
+                path.unlink(missing_ok=True)
 
 
 def bm25_search(doc_id: str, query: str, chunks: List[str], top_k: int = 10) -> List[dict]:
@@ -1,8 +1,14 @@
 from typing import Dict, List, Optional
 import asyncio
-import json as _json
+import copy
+import dataclasses
+import functools
+import hashlib
 import logging
+import math
+import random
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,278 @@ from utils.middleware import (
     RetryMiddleware,
     FallbackMiddleware,
 )
+from utils.query_cache import QueryCache
+
+
+# 思考模型自动输出 reasoning_content、无需额外参数的 provider，合并为一次成员判断
+_AUTO_THINKING = MOONSHOT | DOUBAO
+
+# 流式请求头中与请求无关的部分，导入时构建一次；按请求只补充鉴权字段（均只读，不可原地修改）。
+# 请求体用 orjson 预先序列化后以 content= 发送，因此三个分支都必须带上 Content-Type
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_ANTHROPIC_HEADERS = {"anthropic-version": "2023-06-01", "Content-Type": "application/json"}
+
+# 流式解析时字段缺失的只读默认值，避免逐事件新建空 dict
+_EMPTY: dict = {}
+
+# 模块级共享的流式 HTTP 客户端：各 provider 的流式对话复用 keep-alive 连接，
+# 避免每次对话重新进行 TCP+TLS 握手
+# 可选依赖：h2（安装后共享流式客户端启用 HTTP/2，同一 provider 的并发流复用一条连接）
+try:
+    import h2  # noqa: F401
+    _HAS_H2 = True
+except ImportError:
+    _HAS_H2 = False
+
+_STREAM_CLIENT: httpx.AsyncClient | None = None
+
+
+def _get_stream_client() -> httpx.AsyncClient:
+    """获取共享的流式 httpx.AsyncClient（惰性创建，关闭后自动重建）。
+
+    超时按请求单独传入 client.stream，客户端本身只承载连接池配置。
+    """
+    global _STREAM_CLIENT
+    if _STREAM_CLIENT is None or _STREAM_CLIENT.is_closed:
+        from config import settings
+
+        _STREAM_CLIENT = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0),
+            http2=_HAS_H2,
+            limits=httpx.Limits(
+                max_connections=settings.stream_max_connections,
+                max_keepalive_connections=settings.stream_max_keepalive_connections,
+                keepalive_expiry=30,
+            ),
+        )
+    return _STREAM_CLIENT
+
+
+async def close_stream_client() -> None:
+    """应用关闭时释放共享流式客户端的连接池"""
+    global _STREAM_CLIENT
+    if _STREAM_CLIENT is not None and not _STREAM_CLIENT.is_closed:
+        await _STREAM_CLIENT.aclose()
+    _STREAM_CLIENT = None
+
+
+# 流式分支中 endpoint 不取自 PROVIDER_CONFIG 的 provider，预热时使用的固定地址
+_PREWARM_ORIGINS = {
+    "anthropic": "https://api.anthropic.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
+
+
+async def prewarm_stream_connections(providers: List[str], timeout: float = 5.0) -> int:
+    """向给定 provider 的服务器并发发送 HEAD 请求，让共享流式客户端提前建立好 TLS 连接
+
+    只预热 https 地址，同源去重；网络错误与非 2xx 响应都忽略（连接建立即达到目的）。
+    返回成功建立连接的数量。
+    """
+    origins = set()
+    for provider in providers:
+        provider = provider.strip().lower()
+        url = _PREWARM_ORIGINS.get(provider) or _default_endpoint(provider)
+        if url.startswith("https://"):
+            parsed = httpx.URL(url)
+            origins.add(f"https://{parsed.netloc.decode('ascii')}")
+    if not origins:
+        return 0
+    client = _get_stream_client()
+    results = await asyncio.gather(
+        *(client.head(origin, timeout=timeout) for origin in origins), return_exceptions=True
+    )
+    return sum(1 for r in results if not isinstance(r, BaseException))
+
+
+# SSE 中不携带数据的字段行与注释行（Anthropic 每个事件前都有一行 event:），
+# 在分帧阶段直接丢弃，避免逐事件交给 orjson.loads 解析失败再走异常分支
+_SSE_NON_DATA_PREFIXES = (b"event:", b"id:", b"retry:", b":")
+
+
+def _sse_payload(line: bytes) -> Optional[bytes]:
+    """去掉 SSE 行的 "data:" 前缀（兼容省略空格的写法）；非数据字段行返回 None，其余行原样返回"""
+    if line.startswith(b"data:"):
+        return line[5:].lstrip()
+    if line.startswith(_SSE_NON_DATA_PREFIXES):
+        return None
+    return line
+
+
+async def _iter_sse_batches(resp: httpx.Response):
+    """按网络块产出 SSE 数据载荷列表（bytes，已去前缀与首尾空白，跳过空行与非数据字段行）
+
+    直接在字节流上按换行切分，载荷不经 UTF-8 解码即可交给 orjson.loads。
+    aiter_bytes 不指定 chunk_size，收到多少转发多少，不会为凑满块而延迟输出；
+    同一网络块中到达的多个事件作为一批返回，调用方可合并后再 yield。
+    """
+    buf = bytearray()
+    async for data in resp.aiter_bytes():
+        if b"\n" not in data:
+            # 行未结束（如大载荷跨多个网络块），先累积，避免反复拼接 bytes
+            buf += data
+            continue
+        if buf:
+            buf += data
+            data = bytes(buf)
+            buf.clear()
+        # bytes.split 在 C 层一次切出整块中的全部行，最后一段是未结束的行
+        *lines, rest = data.split(b"\n")
+        buf += rest
+        batch = []
+        for line in lines:
+            line = line.strip()
+            if line:
+                payload = _sse_payload(line)
+                if payload is not None:
+                    batch.append(payload)
+        if batch:
+            yield batch
+    line = bytes(buf).strip()
+    if line:
+        payload = _sse_payload(line)
+        if payload is not None:
+            yield [payload]
+
+
+async def _iter_sse_data(resp: httpx.Response):
+    """逐条产出 SSE 数据载荷，格式同 _iter_sse_batches"""
+    async for batch in _iter_sse_batches(resp):
+        for data in batch:
+            yield data
+
+
+def _delta_event(content: str, reasoning_content: str, provider: str, model: str) -> dict:
+    """流式增量事件"""
+    return {
+        "content": content,
+        "reasoning_content": reasoning_content,
+        "done": False,
+        "used_provider": provider,
+        "used_model": model,
+        "fallback_used": False,
+    }
+
+
+# 超过该字节数的 SSE 载荷（如 Gemini 内联图片）放到线程中解析，避免阻塞事件循环上的其他流；
+# 小载荷 orjson 解析只需微秒级，线程切换反而更慢，仍在事件循环内同步解析
+_SSE_OFFLOAD_BYTES = 1 << 20
+
+# 同时进行中的非流式上游调用上限，突发并发时防止连接与文件描述符耗尽
+_PROVIDER_CALL_LIMIT = asyncio.Semaphore(64)
+# payload 未指定 _timeout 时单次上游调用的总时长上限（秒）
+_DEFAULT_CALL_TIMEOUT = 120.0
+
+# 非流式调用的精确匹配响应缓存：相同 provider/模型/消息/采样参数的重复请求直接复用上次成功的响应
+_RESPONSE_CACHE = QueryCache()
+
+
+def _response_cache_ttl() -> float:
+    from config import settings
+    return settings.chat_response_cache_ttl
+
+
+@dataclasses.dataclass(slots=True)
+class _CallTarget:
+    """中间件处理后的一次上游调用目标；重试、对冲与备用切换期间按属性读取，不再反复查 payload dict"""
+    provider: str
+    endpoint: str
+    model: str
+    messages: list
+    api_key: str
+
+
+def _response_cache_key(target: _CallTarget, *params) -> Optional[str]:
+    """由调用目标与采样参数生成缓存键；含无法序列化的参数时返回 None（不缓存）
+
+    api_key 一并纳入：不同（或已失效）的密钥不能命中其他密钥的缓存回答；
+    键为 blake2b 摘要，密钥不会以明文留在缓存里。
+    """
+    try:
+        raw = orjson.dumps(
+            [target.provider, target.endpoint, target.model, target.api_key, target.messages, *params],
+            option=orjson.OPT_SORT_KEYS,
+        )
+    except TypeError:
+        return None
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=32)
+def _default_endpoint(provider: str) -> str:
+    """PROVIDER_CONFIG 中 provider 的默认 endpoint（内置配置导入后不再变化，按 provider 缓存）"""
+    return (PROVIDER_CONFIG.get(provider) or _EMPTY).get("endpoint") or ""
+
+
+def _get_provider_client(provider: str, endpoint: str):
+    """按 (provider, endpoint) 复用 Provider 实例；Provider 只保存端点配置，不含请求级状态
+
+    provider id 先转小写再查缓存，"OpenAI" 与 "openai" 共用同一实例（ProviderFactory 本身也不区分大小写）。
+    """
+    return _cached_provider_client((provider or "").lower(), endpoint)
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_provider_client(provider: str, endpoint: str):
+    return ProviderFactory.create(provider, endpoint)
+
+
+async def _hedged_call(primary, fallback, hedge_delay: float):
+    """对冲调用：先发起 primary，hedge_delay 秒内未成功（失败或未返回）即发起 fallback，
+    返回先成功者的 (结果, 是否为 fallback)；两者都失败时抛出 fallback 的异常。
+
+    未完成的一方会被取消并等待其退出，不遗留后台任务。
+    """
+    primary_task = asyncio.create_task(primary())
+    pending = {primary_task}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if primary_task in done and primary_task.exception() is None:
+            return primary_task.result(), False
+
+        fallback_task = asyncio.create_task(fallback())
+        pending.add(fallback_task)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # 同时完成时优先采用主 provider 的结果
+            for task in sorted(done, key=lambda t: t is fallback_task):
+                if task.exception() is None:
+                    return task.result(), task is fallback_task
+        raise fallback_task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+# 4xx 中仍可能靠重试恢复的状态码：请求超时、冲突、过早请求、限流
+_RETRYABLE_CLIENT_STATUS = frozenset({408, 409, 425, 429})
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """上游明确拒绝请求（鉴权失败、参数错误等 4xx）时重试无意义，直接交给备用 provider 或报错"""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in _RETRYABLE_CLIENT_STATUS
+    return True
+
+
+def _retry_wait(exc: Exception, attempt: int, delay: float, cap: Optional[float]) -> float:
+    """计算第 attempt 次重试前的等待秒数
+
+    cap 为 None 时保持固定 delay；否则按 delay * 2^(attempt-1) 指数增长并截断到 cap，
+    再乘以 [0, 1) 的随机系数（全抖动），避免并发会话在限流后同步重试。
+    上游 429 且带 Retry-After 时改为遵循该值（同样不超过 cap）。
+    """
+    if cap is None:
+        return delay
+    if getattr(exc, "status_code", None) == 429:
+        retry_after = (getattr(exc, "headers", None) or {}).get("Retry-After")
+        try:
+            return min(float(retry_after), cap)
+        except (TypeError, ValueError):
+            pass
+    return min(delay * (2 ** (attempt - 1)), cap) * random.random()
 
 
 def _sanitize_api_key(api_key: Optional[str]) -> str:
@@ -29,7 +307,7 @@ def _extract_api_error_message(body: str, status_code: int) -> str:
     兼容 OpenAI 兼容格式：{"error": {"code": "...", "message": "..."}}。
     """
     try:
-        parsed = _json.loads(body) if body else {}
+        parsed = orjson.loads(body) if body else {}
         error_obj = parsed.get("error") if isinstance(parsed, dict) else None
         if isinstance(error_obj, dict):
             msg = error_obj.get("message") or ""
@@ -53,38 +331,25 @@ def _extract_api_error_message(body: str, status_code: int) -> str:
     return f"API 返回错误（HTTP {status_code}）"
 
 
+def _reasoning_text(item) -> str:
+    """单个 reasoning 片段转文本：字符串原样返回，dict 取 text/content，其余类型忽略"""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        text = item.get("text") or item.get("content") or ""
+        return text if isinstance(text, str) else ""
+    return ""
+
+
 def extract_reasoning_content(chunk: dict | list | str | None) -> str:
     """Normalize reasoning content across providers (DeepSeek-R1 / o1)."""
-    if chunk is None:
-        return ""
-
     # DeepSeek/OpenAI responses often nest reasoning_content under message/delta
-    if isinstance(chunk, dict):
-        candidate = chunk.get("reasoning_content")
-        if candidate is None:
-            return ""
-    else:
-        candidate = chunk
-
-    if isinstance(candidate, str):
-        return candidate
-
-    if isinstance(candidate, dict):
-        text = candidate.get("text") or candidate.get("content") or ""
-        return text if isinstance(text, str) else ""
-
+    candidate = chunk.get("reasoning_content") if isinstance(chunk, dict) else chunk
+    if not candidate:
+        return ""
     if isinstance(candidate, list):
-        parts = []
-        for item in candidate:
-            if isinstance(item, str):
-                parts.append(item)
-            elif isinstance(item, dict):
-                text = item.get("text") or item.get("content") or ""
-                if isinstance(text, str):
-                    parts.append(text)
-        return "".join(parts)
-
-    return ""
+        return "".join(map(_reasoning_text, candidate))
+    return _reasoning_text(candidate)
 
 
 async def call_ai_api(
@@ -110,66 +375,116 @@ async def call_ai_api(
         "model": model,
         "provider": provider,
         # 如果未显式传入 endpoint，使用 ProviderRegistry 中的默认值（支持集成/单一服务商）
-        "endpoint": endpoint or PROVIDER_CONFIG.get(provider, {}).get("endpoint", "")
+        "endpoint": endpoint or _default_endpoint(provider)
     }
 
     payload = await apply_middlewares_before(payload, middlewares or [])
-    # 读取 FallbackMiddleware 标记
+    # 读取 FallbackMiddleware 标记（之后只经 fb_target 使用，不再留在 payload 中）
     fb_target = payload.pop("_fallback_target", None)
-    if fb_target:
-        payload["_fallback_target"] = fb_target
 
     retry_cfg = payload.pop("_retry_cfg", None) or {"retries": 0, "delay": 0.0}
     retries = retry_cfg.get("retries", 0)
     delay = retry_cfg.get("delay", 0.0)
+    backoff_cap = retry_cfg.get("cap")
+    hedge_delay = retry_cfg.get("hedge_delay")
     timeout = payload.get("_timeout")
+    effective_timeout = timeout or _DEFAULT_CALL_TIMEOUT
+
+    # 中间件只在 dict 边界上读写 payload，之后的调用状态收敛到 _CallTarget
+    target = _CallTarget(
+        provider=payload["provider"],
+        endpoint=payload.get("endpoint", endpoint) or "",
+        model=payload["model"],
+        messages=payload["messages"],
+        api_key=payload["api_key"],
+    )
+
+    async def chat_with_retries(target: _CallTarget) -> dict:
+        client = _get_provider_client(target.provider, target.endpoint)
+        attempt = 0
+        while True:
+            try:
+                # 总时长上限：httpx 的超时只约束单次读写，上游接受连接后迟迟不返回时由这里兜底
+                async with _PROVIDER_CALL_LIMIT:
+                    try:
+                        response = await asyncio.wait_for(client.chat(
+                            target.messages,
+                            target.api_key,
+                            target.model,
+                            timeout=timeout,
+                            stream=stream,
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            top_p=top_p,
+                            custom_params=custom_params,
+                            reasoning_effort=reasoning_effort,
+                        ), timeout=effective_timeout)
+                    except asyncio.TimeoutError:
+                        raise RuntimeError(f"上游响应超时（{effective_timeout:g} 秒）")
+                # 如果上游返回错误结构，同样走重试逻辑
+                if isinstance(response, dict) and response.get("error"):
+                    raise RuntimeError(response.get("error"))
+                return response
+            except Exception as exc:
+                attempt += 1
+                if attempt > retries or not _is_retryable(exc):
+                    raise
+                wait = _retry_wait(exc, attempt, delay, backoff_cap)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+    fb_call = None
+    if fb_target:
+        fb_provider = fb_target.get("provider") or target.provider
+        fb_call = dataclasses.replace(
+            target,
+            provider=fb_provider,
+            endpoint=_default_endpoint(fb_provider) or endpoint or "",
+            model=fb_target.get("model") or target.model,
+        )
+
+    cache_ttl = _response_cache_ttl()
+    cache_key = None
+    if cache_ttl > 0 and not stream:
+        cache_key = _response_cache_key(
+            target, max_tokens, temperature, top_p, custom_params, reasoning_effort
+        )
+    cached = _RESPONSE_CACHE.get(cache_key) if cache_key else None
 
-    client = ProviderFactory.create(payload["provider"], payload.get("endpoint", endpoint))
-
-    attempt = 0
     fallback_used = False
-    fallback_payload = payload.copy()
-    while True:
+    if cached is not None:
+        # 缓存的是已标记 _used_provider 等字段的响应，复制一份避免后置中间件改动缓存内容
+        response = copy.deepcopy(cached)
+        response["_cache"] = "exact"
+    elif fb_call is not None and hedge_delay is not None:
+        # 对冲请求：主 provider 超过 hedge_delay 未成功时并发发起备用请求，取先成功者
         try:
-            response = await client.chat(
-                payload["messages"],
-                payload["api_key"],
-                payload["model"],
-                timeout=timeout,
-                stream=stream,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                custom_params=custom_params,
-                reasoning_effort=reasoning_effort,
+            response, fallback_used = await _hedged_call(
+                lambda: chat_with_retries(target), lambda: chat_with_retries(fb_call), hedge_delay
             )
-            # 如果上游返回错误结构，同样走重试逻辑
-            if isinstance(response, dict) and response.get("error"):
-                raise RuntimeError(response.get("error"))
-            break
         except Exception as e:
-            attempt += 1
-            if attempt > retries:
-                response = {"error": str(e)}
-                # 尝试从 response/fallback 中读取备用信息
-                fb = payload.get("_fallback_target")
-                if fb and not fallback_used:
-                    fallback_used = True
-                    payload["provider"] = fb.get("provider") or payload["provider"]
-                    payload["endpoint"] = PROVIDER_CONFIG.get(payload["provider"], {}).get("endpoint", endpoint)
-                    payload["model"] = fb.get("model") or payload["model"]
-                    client = ProviderFactory.create(payload["provider"], payload.get("endpoint", endpoint))
-                    attempt = 0
-                    continue
-                break
-            if delay > 0:
-                await asyncio.sleep(delay)
+            response, fallback_used = {"error": str(e)}, True
+    else:
+        try:
+            response = await chat_with_retries(target)
+        except Exception as e:
+            response = {"error": str(e)}
+            # 主 provider 重试耗尽后切换到备用 provider/model
+            if fb_call is not None:
+                fallback_used = True
+                try:
+                    response = await chat_with_retries(fb_call)
+                except Exception as fb_error:
+                    response = {"error": str(fb_error)}
+    used = fb_call if fallback_used else target
 
     # 标记使用的最终 provider/model，便于前端判断计费/来源
-    if isinstance(response, dict):
-        response["_used_provider"] = payload.get("provider")
-        response["_used_model"] = payload.get("model")
+    if cached is None and isinstance(response, dict):
+        response["_used_provider"] = used.provider
+        response["_used_model"] = used.model
         response["_fallback_used"] = fallback_used
+        if cache_key and not response.get("error"):
+            _RESPONSE_CACHE.put(cache_key, copy.deepcopy(response), ttl=cache_ttl)
 
     response = await apply_middlewares_after(response, middlewares or [])
     return response
@@ -195,7 +510,7 @@ async def call_ai_api_stream(
         "api_key": api_key,
         "model": model,
         "provider": provider,
-        "endpoint": endpoint or PROVIDER_CONFIG.get(provider, {}).get("endpoint", "")
+        "endpoint": endpoint or _default_endpoint(provider)
     }
 
     payload = await apply_middlewares_before(payload, middlewares or [])
@@ -203,16 +518,16 @@ async def call_ai_api_stream(
     endpoint = payload.get("endpoint") or endpoint
     provider = payload.get("provider") or provider
     model = payload.get("model") or model
+    provider_lc = provider.lower()
 
     # OpenAI 兼容流式
-    if provider.lower() in OPENAI_LIKE and endpoint:
+    if provider_lc in OPENAI_LIKE and endpoint:
         # 清理 API Key：去除首尾空白（处理复制粘贴带来的换行/空格），支持多 Key 轮换池
         sanitized_key = _sanitize_api_key(api_key)
-        headers = {
-            "Content-Type": "application/json"
-        }
         if sanitized_key:
-            headers["Authorization"] = f"Bearer {sanitized_key}"
+            headers = {**_JSON_HEADERS, "Authorization": f"Bearer {sanitized_key}"}
+        else:
+            headers = _JSON_HEADERS
         body = {
             "model": model,
             "messages": messages,
@@ -233,15 +548,15 @@ async def call_ai_api_stream(
             body.update(custom_params)
         # 深度思考模式：根据 provider 使用不同参数
         if enable_thinking:
-            if provider.lower() in OPENAI_NATIVE:
+            if provider_lc in OPENAI_NATIVE:
                 # OpenAI 原生 API（GPT-5/o3/o4 系列）：使用 reasoning_effort 参数
                 # 如果前端已传入 reasoning_effort 则优先使用，否则默认 high
                 if "reasoning_effort" not in body:
                     body["reasoning_effort"] = "high"
-            elif provider.lower() in MINIMAX:
+            elif provider_lc in MINIMAX:
                 # MiniMax：使用 reasoning_split 分离思考内容
                 body["reasoning_split"] = True
-            elif provider.lower() not in MOONSHOT and provider.lower() not in DOUBAO:
+            elif provider_lc not in _AUTO_THINKING:
                 # DeepSeek / 智谱 / 通用 OpenAI 兼容：使用 thinking 参数
                 # Moonshot/Kimi 和豆包 Seed 系列自动思考，无需额外参数
                 body["thinking"] = {"type": "enabled"}
@@ -258,47 +573,48 @@ async def call_ai_api_stream(
             body.setdefault("top_logprobs", 1)
 
         # ── 诊断日志 ──
-        logger.debug(f"[Stream] ▶ provider={provider}, model={model}, endpoint={endpoint}, enable_thinking={enable_thinking}, body keys={list(body.keys())}")
+        # 日志级别在请求内不变，只查询一次；未开启 DEBUG 时逐事件的诊断日志连 f-string 都不构造
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            logger.debug(f"[Stream] ▶ provider={provider}, model={model}, endpoint={endpoint}, enable_thinking={enable_thinking}, body keys={list(body.keys())}")
         _chunk_count = 0
         _content_chars = 0
         _reasoning_chars = 0
         _logprobs_sum = 0.0
         _logprobs_count = 0
 
-        async with httpx.AsyncClient(timeout=timeout or 120.0) as client:
-            async with client.stream("POST", endpoint, headers=headers, json=body) as resp:
-                logger.debug(f"[Stream] HTTP {resp.status_code}")
-                if resp.status_code != 200:
-                    err_text = await resp.aread()
-                    err_body = err_text.decode("utf-8", errors="ignore")
-                    logger.warning(f"[Stream] Error body: {err_body[:500]}")
-                    yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
-                    return
-
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    # 前 3 行原始 SSE 打印，帮助诊断格式问题
-                    if _chunk_count < 3:
-                        logger.debug(f"[Stream] raw[{_chunk_count}]: {line[:200]}")
-                    # 兼容 "data: " 和 "data:" 两种 SSE 前缀（某些代理/服务商省略空格）
-                    if line.startswith("data: "):
-                        data = line[6:].strip()
-                    elif line.startswith("data:"):
-                        data = line[5:].strip()
-                    else:
-                        data = line.strip()
-                    if data == "[DONE]":
-                        logger.debug(f"[Stream] done chunks={_chunk_count}, content_chars={_content_chars}, reasoning_chars={_reasoning_chars}")
+        client = _get_stream_client()
+        async with client.stream("POST", endpoint, headers=headers, content=orjson.dumps(body), timeout=timeout or 120.0) as resp:
+            logger.debug("[Stream] HTTP %s", resp.status_code)
+            if resp.status_code != 200:
+                err_text = await resp.aread()
+                err_body = err_text.decode("utf-8", errors="ignore")
+                logger.warning(f"[Stream] Error body: {err_body[:500]}")
+                yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
+                return
+
+            # 同一网络块中的多个事件合并为一次 yield，减少快速模型逐 token 事件带来的协程切换
+            async for batch in _iter_sse_batches(resp):
+                contents: List[str] = []
+                reasonings: List[str] = []
+                heartbeat = False
+                for data in batch:
+                    # 前 3 行 SSE 载荷打印，帮助诊断格式问题
+                    if debug_enabled and _chunk_count < 3:
+                        logger.debug("[Stream] raw[%d]: %r", _chunk_count, data[:200])
+                    if data == b"[DONE]":
+                        if contents or reasonings:
+                            yield _delta_event("".join(contents), "".join(reasonings), provider, model)
+                        if debug_enabled:
+                            logger.debug("[Stream] done chunks=%d, content_chars=%d, reasoning_chars=%d", _chunk_count, _content_chars, _reasoning_chars)
                         _done_payload = {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
                         if _logprobs_count > 0:
-                            import math
                             _done_payload["qa_score"] = round(math.exp(_logprobs_sum / _logprobs_count), 4)
                         yield _done_payload
                         return
                     try:
-                        chunk = _json.loads(data)
-                    except Exception:
+                        chunk = orjson.loads(data)
+                    except orjson.JSONDecodeError:
                         continue
                     # Detect API-level errors embedded inside HTTP-200 SSE bodies
                     # (e.g. Doubao / volcengine returns {"error": {...}} with status 200)
@@ -309,16 +625,21 @@ async def call_ai_api_stream(
                         else:
                             err_msg = str(api_error)
                         logger.warning(f"[Stream] API error in SSE: {err_msg}")
+                        if contents or reasonings:
+                            yield _delta_event("".join(contents), "".join(reasonings), provider, model)
                         yield {"error": err_msg, "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
                         return
-                    # 防止 choices 为空列表时 [0] 抛 IndexError
-                    choices = chunk.get("choices") or []
-                    if not choices:
+                    # choices 缺失或为空列表时跳过该事件
+                    try:
+                        choice = chunk["choices"][0]
+                    except (KeyError, IndexError, TypeError):
                         continue
-                    choice = choices[0]
-                    delta = choice.get("delta") or choice.get("message") or {}
+                    delta = choice.get("delta") or choice.get("message") or _EMPTY
                     content = delta.get("content") or ""
-                    reasoning_content = extract_reasoning_content(delta)
+                    # 绝大多数事件没有 reasoning_content 或为纯字符串，直接取值省去一次函数调用
+                    reasoning_content = delta.get("reasoning_content") or ""
+                    if not isinstance(reasoning_content, str):
+                        reasoning_content = extract_reasoning_content(delta)
                     # MiniMax 的思考内容在 reasoning_details 字段中
                     if not reasoning_content:
                         reasoning_details = delta.get("reasoning_details") or choice.get("reasoning_details")
@@ -332,48 +653,55 @@ async def call_ai_api_stream(
                             if lp is not None and isinstance(lp, (int, float)):
                                 _logprobs_sum += lp
                                 _logprobs_count += 1
-                    # 只要有内容或推理内容，就 yield。
+                    # 有内容或推理内容的事件累积到本批次末尾统一 yield
                     if content or reasoning_content:
                         _chunk_count += 1
-                        _content_chars += len(content)
-                        _reasoning_chars += len(reasoning_content)
-                        yield {
-                            "content": content,
-                            "reasoning_content": reasoning_content,
-                            "done": False,
-                            "used_provider": provider,
-                            "used_model": model,
-                            "fallback_used": False
-                        }
+                        # 字符统计只用于调试日志
+                        if debug_enabled:
+                            _content_chars += len(content)
+                            _reasoning_chars += len(reasoning_content)
+                        contents.append(content)
+                        reasonings.append(reasoning_content)
                     elif _chunk_count == 0:
-                        # 发送一个空的心跳包，防止前端因长时间拿不到第一个 chunk 而判定超时/无响应
-                        yield {
-                            "content": "",
-                            "done": False,
-                            "used_provider": provider,
-                            "used_model": model,
-                            "fallback_used": False
-                        }
-                logger.debug(f"[Stream] end-of-stream (no [DONE]) chunks={_chunk_count}, content_chars={_content_chars}, reasoning_chars={_reasoning_chars}")
-                _done_payload2 = {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
-                if _logprobs_count > 0:
-                    import math
-                    _done_payload2["qa_score"] = round(math.exp(_logprobs_sum / _logprobs_count), 4)
-                yield _done_payload2
+                        heartbeat = True
+                if contents or reasonings:
+                    yield _delta_event("".join(contents), "".join(reasonings), provider, model)
+                elif heartbeat:
+                    # 发送一个空的心跳包，防止前端因长时间拿不到第一个 chunk 而判定超时/无响应
+                    yield {
+                        "content": "",
+                        "done": False,
+                        "used_provider": provider,
+                        "used_model": model,
+                        "fallback_used": False
+                    }
+            if debug_enabled:
+                logger.debug("[Stream] end-of-stream (no [DONE]) chunks=%d, content_chars=%d, reasoning_chars=%d", _chunk_count, _content_chars, _reasoning_chars)
+            _done_payload2 = {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
+            if _logprobs_count > 0:
+                _done_payload2["qa_score"] = round(math.exp(_logprobs_sum / _logprobs_count), 4)
+            yield _done_payload2
         return
 
     # Anthropic 流式
-    if provider.lower() in ANTHROPIC:
+    if provider_lc in ANTHROPIC:
         sanitized_key = _sanitize_api_key(api_key)
-        headers = {
-            "x-api-key": sanitized_key,
-            "anthropic-version": "2023-06-01",
-            "Content-Type": "application/json"
-        }
+        headers = {"x-api-key": sanitized_key, **_ANTHROPIC_HEADERS}
+        # 单遍拆分：system 消息取第一条作为顶层 system 字段，其余消息按原顺序保留
+        system_content = ""
+        has_system = False
+        chat_messages = []
+        for m in messages:
+            if m.get("role") == "system":
+                if not has_system:
+                    system_content = m["content"]
+                    has_system = True
+            else:
+                chat_messages.append(m)
         body = {
             "model": model,
-            "messages": [m for m in messages if m.get("role") != "system"],
-            "system": next((m["content"] for m in messages if m.get("role") == "system"), ""),
+            "messages": chat_messages,
+            "system": system_content,
             "stream": True
         }
         # 仅在参数非 None 时添加对应字段
@@ -389,50 +717,59 @@ async def call_ai_api_stream(
         # 深度思考模式：Anthropic extended thinking
         if enable_thinking:
             body["thinking"] = {"type": "enabled", "budget_tokens": 8192}
-        async with httpx.AsyncClient(timeout=timeout or 120.0) as client:
-            async with client.stream("POST", "https://api.anthropic.com/v1/messages", headers=headers, json=body) as resp:
-                if resp.status_code != 200:
-                    err_text = await resp.aread()
-                    err_body = err_text.decode("utf-8", errors="ignore")
-                    yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
+        client = _get_stream_client()
+        async with client.stream(
+            "POST", "https://api.anthropic.com/v1/messages",
+            headers=headers, content=orjson.dumps(body), timeout=timeout or 120.0,
+        ) as resp:
+            if resp.status_code != 200:
+                err_text = await resp.aread()
+                err_body = err_text.decode("utf-8", errors="ignore")
+                yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
+                return
+            async for data in _iter_sse_data(resp):
+                if data == b"[DONE]":
+                    yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
                     return
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    data = line[6:].strip() if line.startswith("data: ") else line.strip()
-                    if data == "[DONE]":
-                        yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
-                        return
-                    try:
-                        chunk = httpx.Response(200, content=data).json()
-                    except Exception:
+                try:
+                    chunk = orjson.loads(data)
+                except orjson.JSONDecodeError:
+                    continue
+                # Anthropic streaming fields: content_block_delta 事件的 delta 是单个 dict
+                # （text_delta -> text，thinking_delta -> thinking）；兼容部分代理返回的 delta 列表
+                delta = chunk.get("delta") if isinstance(chunk, dict) else None
+                if not delta:
+                    continue
+                for item in (delta,) if isinstance(delta, dict) else delta:
+                    if not isinstance(item, dict):
                         continue
-                    # Anthropic streaming fields: delta -> text
-                    delta_list = chunk.get("delta") or []
-                    for delta in delta_list:
-                        content = delta.get("text", "")
-                        if content:
-                            yield {"content": content, "done": False, "used_provider": provider, "used_model": model, "fallback_used": False}
-                yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
+                    content = item.get("text")
+                    if content:
+                        yield {"content": content, "done": False, "used_provider": provider, "used_model": model, "fallback_used": False}
+                    thinking = item.get("thinking")
+                    if thinking:
+                        yield {"content": "", "reasoning_content": thinking, "done": False, "used_provider": provider, "used_model": model, "fallback_used": False}
+            yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
         return
 
     # Gemini 流式（简单版，若失败则回退）
-    if provider.lower() in GEMINI:
+    if provider_lc in GEMINI:
         sanitized_key = _sanitize_api_key(api_key)
         # Gemini 流式 endpoint：:streamGenerateContent
         endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse&key={sanitized_key}"
         contents = []
         for msg in messages:
-            if msg["role"] == "system":
+            role = msg["role"]
+            if role == "system":
                 continue
-            parts = []
-            if isinstance(msg["content"], str):
-                parts.append({"text": msg["content"]})
-            elif isinstance(msg["content"], list):
-                for item in msg["content"]:
-                    if item["type"] == "text":
-                        parts.append({"text": item["text"]})
-            contents.append({"role": "user" if msg["role"] == "user" else "model", "parts": parts})
+            content = msg["content"]
+            if isinstance(content, str):
+                parts = [{"text": content}]
+            elif isinstance(content, list):
+                parts = [{"text": item["text"]} for item in content if item["type"] == "text"]
+            else:
+                parts = []
+            contents.append({"role": "user" if role == "user" else "model", "parts": parts})
 
         payload = {
             "contents": contents,
@@ -457,33 +794,33 @@ async def call_ai_api_stream(
                 payload["generationConfig"] = {}
             payload["generationConfig"]["thinkingConfig"] = {"thinkingBudget": 8192}
 
-        async with httpx.AsyncClient(timeout=timeout or 120.0) as client:
-            async with client.stream("POST", endpoint, json=payload) as resp:
-                if resp.status_code != 200:
-                    err_text = await resp.aread()
-                    err_body = err_text.decode("utf-8", errors="ignore")
-                    yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
+        client = _get_stream_client()
+        async with client.stream(
+            "POST", endpoint, headers=_JSON_HEADERS, content=orjson.dumps(payload), timeout=timeout or 120.0,
+        ) as resp:
+            if resp.status_code != 200:
+                err_text = await resp.aread()
+                err_body = err_text.decode("utf-8", errors="ignore")
+                yield {"error": _extract_api_error_message(err_body, resp.status_code), "done": True}
+                return
+            async for data in _iter_sse_data(resp):
+                if data == b"[DONE]":
+                    yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
                     return
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    data = line[6:].strip() if line.startswith("data: ") else line.strip()
-                    if data == "[DONE]":
-                        yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
-                        return
-                    try:
-                        chunk = _json.loads(data)
-                    except Exception:
-                        continue
-                    # Gemini streaming uses candidates[].content.parts[].text
-                    candidates = chunk.get("candidates", [])
-                    for cand in candidates:
-                        parts = cand.get("content", {}).get("parts", [])
-                        for part in parts:
-                            text = part.get("text") or ""
-                            if text:
-                                yield {"content": text, "done": False, "used_provider": provider, "used_model": model, "fallback_used": False}
-                yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
+                try:
+                    if len(data) > _SSE_OFFLOAD_BYTES:
+                        chunk = await asyncio.to_thread(orjson.loads, data)
+                    else:
+                        chunk = orjson.loads(data)
+                except orjson.JSONDecodeError:
+                    continue
+                # Gemini streaming uses candidates[].content.parts[].text
+                for cand in chunk.get("candidates") or ():
+                    for part in (cand.get("content") or _EMPTY).get("parts") or ():
+                        text = part.get("text") or ""
+                        if text:
+                            yield {"content": text, "done": False, "used_provider": provider, "used_model": model, "fallback_used": False}
+            yield {"content": "", "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
         return
 
     # 其他 provider 回退为一次性响应
@@ -494,16 +831,19 @@ async def call_ai_api_stream(
         message = resp.get("choices", [{}])[0].get("message", {}) or {}
         answer = message.get("content", "")
         reasoning_text = extract_reasoning_content(message)
-        for idx, word in enumerate(answer.split(" ")):
-            chunk = word if idx == 0 else f" {word}"
-            yield {"content": chunk, "done": False, "used_provider": resp.get("_used_provider", provider), "used_model": resp.get("_used_model", model), "fallback_used": resp.get("_fallback_used", False)}
+        used_provider = resp.get("_used_provider", provider)
+        used_model = resp.get("_used_model", model)
+        fallback_used = resp.get("_fallback_used", False)
+        # 上游并未真正流式返回，整段回答作为一个事件发出，不再逐词拆分成大量伪 chunk
+        if answer:
+            yield {"content": answer, "done": False, "used_provider": used_provider, "used_model": used_model, "fallback_used": fallback_used}
         yield {
             "content": "",
             "reasoning_content": reasoning_text,
             "done": True,
-            "used_provider": resp.get("_used_provider", provider),
-            "used_model": resp.get("_used_model", model),
-            "fallback_used": resp.get("_fallback_used", False)
+            "used_provider": used_provider,
+            "used_model": used_model,
+            "fallback_used": fallback_used
         }
     except Exception as e:
         yield {"error": str(e), "done": True, "used_provider": provider, "used_model": model, "fallback_used": False}
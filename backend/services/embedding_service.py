@@ -6,7 +6,7 @@ import re
 import threading
 import time
 from collections import OrderedDict
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 import faiss
@@ -111,6 +111,21 @@ class _IndexCache:
         if doc_id in self._store:
             self._store[doc_id]["group_chunk_map"] = group_chunk_map
 
+    def get_page_index(self, doc_id: str, pages: List[dict]) -> dict:
+        """获取文档的页面前缀索引
+
+        pages 列表来自常驻内存的 documents_store，同一文档多次检索传入的是同一对象，
+        以对象身份判断是否可复用，避免每次检索都按页重建索引。
+        """
+        entry = self._store.get(doc_id)
+        if entry is not None and entry.get("pages") is pages:
+            return entry["page_index"]
+        page_index = _build_page_index(pages)
+        if entry is not None:
+            entry["pages"] = pages
+            entry["page_index"] = page_index
+        return page_index
+
     def invalidate(self, doc_id: str = ""):
         """使缓存失效"""
         if doc_id:
@@ -126,8 +141,10 @@ class QueryVectorCache:
     """查询向量 LRU 缓存（支持磁盘持久化）
     
     使用 OrderedDict 实现 LRU 淘汰策略，缓存键为 (embedding_model_id, query_text) 元组，
-    确保不同模型的查询向量不会混淆。
+    确保不同模型的查询向量不会混淆，切换 embedding 模型时自然不会命中旧向量。
+    查询文本去除首尾空白后作为键（不改大小写，避免改变 embedding 语义）。
     
+    检索在 to_thread 的工作线程中并发执行，读写均加锁。
     支持通过 persist_path 启用磁盘持久化，跨会话复用查询向量。
     """
 
@@ -137,6 +154,9 @@ class QueryVectorCache:
         self._persist_path = persist_path
         self._dirty_count = 0  # 自上次持久化以来的写入次数
         self._persist_interval = 20  # 每 N 次写入持久化一次
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
         if persist_path:
             self._load_from_disk()
 
@@ -152,11 +172,15 @@ class QueryVectorCache:
         Returns:
             缓存的查询向量，未命中时返回 None
         """
-        key = (model_id, query)
-        if key in self._cache:
+        key = (model_id, query.strip())
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
             self._cache.move_to_end(key)
-            return self._cache[key]
-        return None
+            self.hits += 1
+            return vector
 
     def put(self, model_id: str, query: str, vector: np.ndarray) -> None:
         """存入查询向量
@@ -168,16 +192,32 @@ class QueryVectorCache:
             query: 查询文本
             vector: 查询向量
         """
-        key = (model_id, query)
-        self._cache[key] = vector
-        self._cache.move_to_end(key)
-        if len(self._cache) > self._max_size:
-            self._cache.popitem(last=False)
-        # 定期持久化
-        self._dirty_count += 1
-        if self._persist_path and self._dirty_count >= self._persist_interval:
-            self._save_to_disk()
-            self._dirty_count = 0
+        key = (model_id, query.strip())
+        snapshot = None
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+            # 定期持久化（锁内只做浅拷贝，序列化写盘放到锁外）
+            self._dirty_count += 1
+            if self._persist_path and self._dirty_count >= self._persist_interval:
+                snapshot = OrderedDict(self._cache)
+                self._dirty_count = 0
+        if snapshot is not None:
+            self._save_to_disk(snapshot)
+
+    def stats(self) -> dict:
+        """缓存统计：条目数、容量与命中率"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self._max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
 
     def _load_from_disk(self):
         """从磁盘加载缓存"""
@@ -192,16 +232,19 @@ class QueryVectorCache:
         except Exception as e:
             logger.warning(f"[QueryVectorCache] 磁盘缓存加载失败: {e}")
 
-    def _save_to_disk(self):
+    def _save_to_disk(self, snapshot: Optional[OrderedDict] = None):
         """持久化缓存到磁盘"""
         if not self._persist_path:
             return
+        if snapshot is None:
+            with self._lock:
+                snapshot = OrderedDict(self._cache)
         try:
             cache_dir = os.path.dirname(self._persist_path)
             if cache_dir:
                 os.makedirs(cache_dir, exist_ok=True)
             with open(self._persist_path, "wb") as f:
-                pickle.dump(self._cache, f)
+                pickle.dump(snapshot, f)
         except Exception as e:
             logger.warning(f"[QueryVectorCache] 磁盘缓存保存失败: {e}")
 
@@ -212,12 +255,17 @@ class QueryVectorCache:
             self._dirty_count = 0
 
 
-# 全局查询向量缓存实例（默认容量 256，启用磁盘持久化）
+# 全局查询向量缓存实例（容量 1024，启用磁盘持久化）
 _cache_persist_path = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
     "data", "cache", "query_vector_cache.pkl"
 )
-_query_vector_cache = QueryVectorCache(persist_path=_cache_persist_path)
+_query_vector_cache = QueryVectorCache(max_size=1024, persist_path=_cache_persist_path)
+
+
+def get_query_vector_cache_stats() -> dict:
+    """查询向量缓存统计（供 /api/search/embed_cache_stats 使用）"""
+    return _query_vector_cache.stats()
 
 # 记录正在生成意群的文档 ID，防止重复提交（需求 6.1）
 _group_generation_in_progress: set[str] = set()
@@ -927,6 +975,12 @@ def _extract_snippet_and_highlights(text: str, query: str, window: int = 100) ->
     return snippet, highlights
 
 
+class _PageIndex(dict):
+    """prefix -> page_num 映射，附带预先小写化的 (key, page_num) 列表供模糊匹配复用"""
+
+    lower_items: List[Tuple[str, int]] = []
+
+
 def _build_page_index(pages: List[dict]) -> dict:
     """构建页面内容前缀索引，用于 O(1) 查找 chunk 所在页码
 
@@ -934,7 +988,7 @@ def _build_page_index(pages: List[dict]) -> dict:
     """
     if not pages:
         return {}
-    index = {}
+    index = _PageIndex()
     for page in pages:
         content = page.get("content", "")
         page_num = page.get("page", 1)
@@ -946,6 +1000,7 @@ def _build_page_index(pages: List[dict]) -> dict:
             key = content[i:i + 80]
             if key not in index:
                 index[key] = page_num
+    index.lower_items = [(key.lower(), page_num) for key, page_num in index.items()]
     return index
 
 
@@ -964,10 +1019,13 @@ def _find_page_for_chunk(chunk_text: str, pages: List[dict], page_index: dict =
     if page_index:
         if prefix in page_index:
             return page_index[prefix]
-        # 尝试在索引中查找匹配的窗口
+        # 尝试在索引中查找匹配的窗口（优先使用构建时已小写化的键）
         prefix60 = chunk_text[:60].lower()
-        for key, page_num in page_index.items():
-            if prefix60 in key.lower():
+        lower_items = getattr(page_index, "lower_items", None)
+        if lower_items is None:
+            lower_items = [(key.lower(), page_num) for key, page_num in page_index.items()]
+        for key_lower, page_num in lower_items:
+            if prefix60 in key_lower:
                 return page_num
 
     # 慢速路径：线性扫描
@@ -1489,6 +1547,10 @@ def _get_overlap_parts(parts: list[str], overlap_size: int) -> list[str]:
     return overlap_parts
 
 
+# int8 IVF 索引的 FP32 精排倍数：int8 粗排取 k * 该值个候选，再用原始向量重新打分
+_INT8_REFINE_K_FACTOR = 4.0
+
+
 def build_vector_index(
     doc_id: str,
     text: str,
@@ -1574,10 +1636,25 @@ def build_vector_index(
             # 大文档：使用 IVF 索引加速检索
             n_clusters = min(64, n_vectors // 10)
             quantizer = faiss.IndexFlatIP(dimension)
-            index = faiss.IndexIVFFlat(quantizer, dimension, n_clusters, faiss.METRIC_INNER_PRODUCT)
+            from config import settings as _cfg
+            if _cfg.vector_index_int8:
+                # 按维 min/max 做 int8 标量量化（scale + zero-point），IVF 扫描每次比较只读 d 字节；
+                # 外层 IndexRefineFlat 另存 FP32 向量，对 int8 粗排的前 k * k_factor 个候选按 FP32 内积重新打分，
+                # 返回的排序与分数与 FP32 一致，召回损失只来自 IVF 本身的簇裁剪
+                ivf_index = faiss.IndexIVFScalarQuantizer(
+                    quantizer, dimension, n_clusters,
+                    faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT,
+                )
+                index = faiss.IndexRefineFlat(ivf_index)
+                index.k_factor = _INT8_REFINE_K_FACTOR
+                index_name = "IndexIVFScalarQuantizer(int8)+RefineFlat"
+            else:
+                ivf_index = faiss.IndexIVFFlat(quantizer, dimension, n_clusters, faiss.METRIC_INNER_PRODUCT)
+                index = ivf_index
+                index_name = "IndexIVFFlat"
             index.train(embeddings_f32)
-            index.nprobe = min(8, n_clusters)
-            logger.info(f"[{doc_id}] 使用 IndexIVFFlat: {n_vectors} 向量, {n_clusters} 簇")
+            ivf_index.nprobe = min(8, n_clusters)
+            logger.info(f"[{doc_id}] 使用 {index_name}: {n_vectors} 向量, {n_clusters} 簇")
         else:
             index = faiss.IndexFlatIP(dimension)
 
@@ -2261,6 +2338,64 @@ def _phrase_boost(results: List[dict], query: str, boost_factor: float = 1.2) ->
     return sorted(results, key=lambda x: x.get("similarity", 0), reverse=True)
 
 
+def _load_document_index(doc_id: str, vector_store_dir: str) -> Tuple[Any, Any]:
+    """加载文档的 FAISS 索引与 chunk 数据，优先从 LRU 缓存读取，避免每次磁盘 I/O"""
+    index_path = os.path.join(vector_store_dir, f"{doc_id}.index")
+    chunks_path = os.path.join(vector_store_dir, f"{doc_id}.pkl")
+
+    if not os.path.exists(index_path) or not os.path.exists(chunks_path):
+        raise HTTPException(status_code=404, detail="向量索引未找到,请重新上传PDF")
+
+    cached = _index_cache.get_index(doc_id, index_path, chunks_path)
+    if cached is not None:
+        return cached
+    index = faiss.read_index(index_path)
+    with open(chunks_path, "rb") as f:
+        data = pickle.load(f)
+    _index_cache.put_index(doc_id, index, data, index_path)
+    return index, data
+
+
+def prefetch_query_vectors(
+    doc_id: str,
+    queries: List[str],
+    vector_store_dir: str,
+    api_key: str = None,
+) -> int:
+    """批量检索前预热查询向量缓存：按 search_document_chunks 的方式改写查询，
+    对未命中缓存的改写结果只调用一次 embedding 批量编码，逐条写入 QueryVectorCache。
+
+    Returns:
+        本次新编码的查询数
+    """
+    rewritten = []
+    for query in queries:
+        try:
+            rewritten.append(_query_rewriter_singleton.rewrite(query, selected_text=None))
+        except Exception:
+            rewritten.append(query)
+
+    index, data = _load_document_index(doc_id, vector_store_dir)
+    embedding_model_id = data.get("embedding_model", "local-minilm") if isinstance(data, dict) else "local-minilm"
+
+    missing = [
+        query for query in dict.fromkeys(rewritten)
+        if _query_vector_cache.get(embedding_model_id, query) is None
+    ]
+    if not missing:
+        return 0
+
+    embed_fn = get_embedding_function(embedding_model_id, api_key)
+    vectors = np.asarray(embed_fn(missing)).astype('float32')
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        faiss.normalize_L2(vectors)
+    # 与单条检索 embed_fn([query]) 的形状保持一致，逐条缓存 (1, d) 向量
+    for i, query in enumerate(missing):
+        _query_vector_cache.put(embedding_model_id, query, vectors[i:i + 1])
+    logger.info(f"[{doc_id}] 批量预编码 {len(missing)} 条查询向量")
+    return len(missing)
+
+
 def search_document_chunks(
     doc_id: str,
     query: str,
@@ -2317,21 +2452,7 @@ def search_document_chunks(
     timings = {}
     t_total = time.perf_counter()
 
-    index_path = os.path.join(vector_store_dir, f"{doc_id}.index")
-    chunks_path = os.path.join(vector_store_dir, f"{doc_id}.pkl")
-
-    if not os.path.exists(index_path) or not os.path.exists(chunks_path):
-        raise HTTPException(status_code=404, detail="向量索引未找到,请重新上传PDF")
-
-    # 优先从 LRU 缓存读取，避免每次磁盘 I/O
-    cached = _index_cache.get_index(doc_id, index_path, chunks_path)
-    if cached is not None:
-        index, data = cached
-    else:
-        index = faiss.read_index(index_path)
-        with open(chunks_path, "rb") as f:
-            data = pickle.load(f)
-        _index_cache.put_index(doc_id, index, data, index_path)
+    index, data = _load_document_index(doc_id, vector_store_dir)
 
     if isinstance(data, dict):
         chunks = data["chunks"]
@@ -2347,7 +2468,7 @@ def search_document_chunks(
     embed_fn = get_embedding_function(embedding_model_id, api_key)
 
     # 预构建页面前缀索引，加速 chunk → 页码映射
-    _page_index = _build_page_index(pages)
+    _page_index = _index_cache.get_page_index(doc_id, pages)
 
     # 检测索引类型：IP（新索引）还是 L2（旧索引）
     is_ip_index = (index.metric_type == faiss.METRIC_INNER_PRODUCT)
@@ -14,9 +14,16 @@ Grep 精确文本搜索服务
 """
 
 import re
+from functools import lru_cache
 from typing import List, Optional
 
 
+@lru_cache(maxsize=256)
+def _compile_keywords(keywords: tuple, flags: int) -> "re.Pattern":
+    """将关键词转义后以 | 连接编译，相同关键词组合复用已编译对象"""
+    return re.compile("|".join(re.escape(kw) for kw in keywords), flags)
+
+
 def grep_search(
     query: str,
     text: str,
@@ -51,12 +58,9 @@ def grep_search(
         return []
 
     # 构建正则表达式：将关键词用 | 连接，每个关键词转义特殊字符
-    escaped_keywords = [re.escape(kw) for kw in keywords]
-    pattern_str = "|".join(escaped_keywords)
-
     flags = re.IGNORECASE if case_insensitive else 0
     try:
-        pattern = re.compile(pattern_str, flags)
+        pattern = _compile_keywords(tuple(keywords), flags)
     except re.error:
         return []
 
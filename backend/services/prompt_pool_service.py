@@ -74,8 +74,15 @@ class PromptPoolService:
         
         self.prompts: Dict[str, PromptVariant] = {}
         self.health_config = HealthConfig()
+        # 提示词池版本号，每次变更落盘时递增，供路由层生成 ETag
+        self._version = 0
         self._load_prompts()
         self._load_config()
+
+    @property
+    def version(self) -> int:
+        """提示词池版本号（只读），每次变更落盘后递增，供路由层生成 ETag"""
+        return self._version
     
     def _load_prompts(self):
         """加载提示词"""
@@ -146,6 +153,8 @@ class PromptPoolService:
     
     def _save_prompts(self):
         """保存提示词"""
+        # 所有变更操作都经由此处落盘，在这里统一递增版本号
+        self._version += 1
         try:
             data = {
                 "prompts": [
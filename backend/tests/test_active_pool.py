@@ -0,0 +1,55 @@
+"""活跃记忆池（ActivePool）LRU 行为测试"""
+
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.active_pool import ActivePool
+from services.memory_store import MemoryEntry
+
+
+def _entry(eid: str, content: str = "") -> MemoryEntry:
+    return MemoryEntry(id=eid, content=content or eid)
+
+
+def test_put_evicts_least_recently_used():
+    pool = ActivePool(capacity=2)
+    assert pool.put(_entry("a")) is None
+    assert pool.put(_entry("b")) is None
+    # 访问 a 后，b 成为最久未使用
+    assert pool.get("a").id == "a"
+    evicted = pool.put(_entry("c"))
+    assert evicted.id == "b"
+    assert pool.get("b") is None
+    assert pool.size() == 2
+
+
+def test_put_existing_updates_without_eviction():
+    pool = ActivePool(capacity=2)
+    pool.put(_entry("a"))
+    pool.put(_entry("b"))
+    assert pool.put(_entry("a", "new")) is None
+    assert pool.get("a").content == "new"
+    # a 刚被更新为最近使用，再放入新条目应淘汰 b
+    assert pool.put(_entry("c")).id == "b"
+
+
+def test_search_keeps_order_and_skips_missing():
+    pool = ActivePool(capacity=3)
+    for eid in ("a", "b", "c"):
+        pool.put(_entry(eid))
+    assert [e.id for e in pool.search(["c", "x", "a"])] == ["c", "a"]
+    # search 不改变 LRU 顺序，a 仍是最久未使用
+    assert pool.put(_entry("d")).id == "a"
+
+
+def test_preload_stops_at_capacity_and_updates_existing():
+    pool = ActivePool(capacity=2)
+    pool.preload([_entry("a"), _entry("b"), _entry("c")])
+    assert pool.size() == 2
+    assert pool.get("c") is None
+    pool.preload([_entry("a", "updated")])
+    assert pool.get("a").content == "updated"
+    assert pool.size() == 2
@@ -0,0 +1,114 @@
+"""高级搜索服务（正则 / 布尔）测试"""
+
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+import services.advanced_search as advanced_search
+from services.advanced_search import AdvancedSearchService, compile_search_pattern
+
+TEXT = "CNN 在图像任务上表现好。RNN 与 CNN 的对比见第二章。cnn 对比 transformer。"
+
+
+def test_boolean_search_same_results_with_and_without_automaton(monkeypatch):
+    """单遍自动机扫描与逐词项查找应给出相同结果。"""
+    if not advanced_search._HAS_AHOCORASICK:
+        pytest.skip("pyahocorasick 未安装")
+    text = TEXT + "x" * 600 + "CNN 与 cnn 的对比"
+    svc = AdvancedSearchService()
+    with_automaton = svc.boolean_search("CNN AND 对比 NOT 图像", text, context_chars=5)
+    monkeypatch.setattr(advanced_search, "_HAS_AHOCORASICK", False)
+    without_automaton = svc.boolean_search("CNN AND 对比 NOT 图像", text, context_chars=5)
+    assert with_automaton == without_automaton
+    assert with_automaton and all(r["score"] == 2.0 for r in with_automaton)
+
+
+def test_find_nearby_position_prefers_left_on_tie():
+    positions = [(10, 12), (30, 32)]
+    svc = AdvancedSearchService()
+    assert svc._find_nearby_position(positions, 20, 10) == (10, 12)
+    assert svc._find_nearby_position(positions, 25, 10) == (30, 32)
+    assert svc._find_nearby_position(positions, 30, 10) == (30, 32)
+    assert svc._find_nearby_position(positions, 50, 10) is None
+    assert svc._find_nearby_position([], 5, 10) is None
+
+
+def test_regex_search_accepts_compiled_pattern_and_rejects_invalid():
+    svc = AdvancedSearchService()
+    results = svc.regex_search(compile_search_pattern("cnn"), TEXT, limit=2, context_chars=0)
+    assert [r["match_text"] for r in results] == ["CNN", "CNN"]
+    with pytest.raises(ValueError):
+        compile_search_pattern("(")
+
+
+def test_literal_scanner_matches_re_semantics(monkeypatch):
+    """hyperscan 字面量扫描与 re.finditer 结果一致（含跨块、重叠与中文偏移）。"""
+    if not advanced_search._HAS_HYPERSCAN:
+        pytest.skip("hyperscan 未安装")
+    import re
+
+    monkeypatch.setattr(advanced_search, "_HS_BLOCK_CHARS", 5)
+    text = "aaaa 中文AaA，cnn\nCNN 对比 aAa"
+    for literal in ("aa", "cnn", "文aa", "对比 a"):
+        expected = [(m.start(), m.end()) for m in re.finditer(re.escape(literal), text, re.IGNORECASE)]
+        scanner = advanced_search._LiteralScanner(literal)
+        assert [(m.start(), m.end()) for m in scanner.finditer(text)] == expected
+    assert not advanced_search._is_hyperscan_literal("c.n")
+    assert not advanced_search._is_hyperscan_literal("Ärger")
+
+
+def test_lowered_copy_reused_for_same_text_object(monkeypatch):
+    monkeypatch.setattr(advanced_search, "_LOWER_CACHE_MIN_CHARS", 10)
+    advanced_search._LOWER_CACHE.clear()
+    text = "CNN 与 RNN 的对比 " * 3
+    first = advanced_search._lowered(text)
+    assert first == text.lower()
+    assert advanced_search._lowered(text) is first
+    other = "".join(["CNN 与 RNN 的对比 "] * 3)
+    assert advanced_search._lowered(other) == first
+    advanced_search._LOWER_CACHE.clear()
+
+
+def test_boolean_search_anchors_on_rarest_must_term():
+    svc = AdvancedSearchService()
+    text = "的" * 50 + " CNN " + "的" * 50
+    results = svc.boolean_search("的 AND CNN", text, limit=5, context_chars=0)
+    assert len(results) == 1
+    assert results[0]["score"] == 2.0
+    assert svc.boolean_search("的 AND 不存在", text) == []
+
+
+@pytest.mark.parametrize("pattern", [r"ab+", r"^a", r"(?<=x)y", r"b|bc", "中文"])
+def test_range_scan_merge_matches_serial_scan(monkeypatch, pattern):
+    """分块扫描再合并的结果与整篇顺序扫描一致（含跨块、行首与后行断言）。"""
+    monkeypatch.setattr(advanced_search, "_SCAN_OVERLAP_CHARS", 8)
+    monkeypatch.setattr(advanced_search, "_SCAN_LOOKBEHIND_CHARS", 4)
+    text = "abbb xy\nab 中文abbbbbc xyy\na中文 bcbc xy abab\n" * 3
+    expected = AdvancedSearchService().regex_search(pattern, text, 1000, 5)
+    for parts in (2, 3, 7):
+        spans = [
+            advanced_search.regex_scan_range_worker(pattern, *plan, 1000)
+            for plan in advanced_search.plan_regex_scan(text, parts)
+        ]
+        merged = advanced_search.merge_scan_spans(spans, 1000)
+        assert advanced_search.build_match_results(text, merged, 5) == expected
+
+
+def test_regex_search_offsets_only_matches_snippets():
+    svc = AdvancedSearchService()
+    expected = svc.regex_search(r"CNN|cnn", TEXT, context_chars=4)
+    offsets = svc.regex_search(r"CNN|cnn", TEXT, context_chars=4, return_offsets_only=True)
+    assert all("context_snippet" not in r for r in offsets)
+    assert advanced_search.attach_context_snippets(TEXT, offsets) == expected
+
+
+def test_find_term_positions_scans_original_text(monkeypatch):
+    """逐词项路径直接扫描原文：不生成小写副本，且保留重叠出现。"""
+    monkeypatch.setattr(advanced_search, "_lowered", lambda text: pytest.fail("不应复制全文"))
+    svc = AdvancedSearchService()
+    assert svc._find_term_positions("aa", "AaA") == [(0, 2), (1, 3)]
+    assert svc._find_all_term_positions({"CNN"}, TEXT)["CNN"] == [(0, 3), (20, 23), (32, 35)]
@@ -0,0 +1,101 @@
+"""BM25 索引测试"""
+
+import os
+import pickle
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.bm25_service import BM25Index
+
+CHUNKS = ["alpha beta beta", "beta gamma", "gamma delta", "alpha alpha alpha delta"]
+
+
+def test_search_ranks_by_score_and_skips_zero():
+    index = BM25Index()
+    index.build(CHUNKS)
+    results = index.search("alpha", top_k=10)
+    assert [r["index"] for r in results] == [3, 0]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert index.score("alpha")[1] == 0.0
+
+
+def test_legacy_pickled_index_rebuilds_on_first_search():
+    """旧版逐文档 dict 存储的 BM25Index 没有 CSC 数组，首次查询时应按 chunks 重建。"""
+    index = BM25Index()
+    index.build(CHUNKS)
+    expected = index.search("beta gamma", top_k=3)
+
+    legacy = BM25Index.__new__(BM25Index)
+    legacy.__dict__.update(k1=1.5, b=0.75, doc_count=len(CHUNKS), chunks=CHUNKS, term_freqs=[{}] * len(CHUNKS))
+    restored = pickle.loads(pickle.dumps(legacy))
+    assert restored.search("beta gamma", top_k=3) == expected
+    assert not hasattr(restored, "term_freqs")
+
+
+def test_numba_kernel_matches_numpy_fallback():
+    import numpy as np
+    import pytest
+
+    import services.bm25_service as bm25_service
+
+    if not bm25_service._HAS_NUMBA:
+        pytest.skip("numba 未安装")
+    index = BM25Index()
+    index.build(CHUNKS * 5)
+    term_ids = np.asarray([index.vocab[t] for t in ("alpha", "delta", "alpha")], dtype=np.int64)
+    args = (term_ids, index.term_offsets, index.posting_docs, index.posting_weights)
+    native = np.zeros(index.doc_count)
+    fallback = np.zeros(index.doc_count)
+    bm25_service._accumulate_postings(*args, native)
+    bm25_service._accumulate_postings_py(*args, fallback)
+    assert (native == fallback).all()
+
+
+def test_trigrams_are_opt_in(monkeypatch):
+    """回退分词（不走 jieba）时 trigram 默认关闭，可通过 use_trigrams 开启。"""
+    import services.bm25_service as bm25_service
+    from services.bm25_service import _tokenize
+
+    monkeypatch.setattr(bm25_service, "_should_use_jieba", lambda: False)
+
+    assert "深度学" in _tokenize("深度学习")
+    assert "深度学" not in _tokenize("深度学习", trigrams=False)
+
+    index = BM25Index()
+    index.build(["深度学习模型"])
+    assert "深度学" not in index.vocab and "深度" in index.vocab
+
+    index = BM25Index(use_trigrams=True)
+    index.build(["深度学习模型"])
+    assert "深度学" in index.vocab
+
+
+def test_persisted_index_reused_after_restart(tmp_path, monkeypatch):
+    """内存缓存清空（模拟重启）后从磁盘加载索引；内容变化时重建并清理旧文件。"""
+    import services.bm25_service as bm25_service
+
+    monkeypatch.setattr(bm25_service, "_bm25_cache", {})
+    monkeypatch.setattr(bm25_service, "_bm25_cache_dir", None)
+    bm25_service.init_bm25_cache_dir(tmp_path)
+
+    built = bm25_service.get_or_build_bm25("doc", CHUNKS)
+    assert bm25_service.get_or_build_bm25("doc", CHUNKS) is built
+    assert len(list(tmp_path.glob("doc_*.npz"))) == 1
+
+    builds = []
+    original_build = BM25Index.build
+    monkeypatch.setattr(BM25Index, "build", lambda self, chunks: builds.append(1) or original_build(self, chunks))
+
+    bm25_service._bm25_cache.clear()
+    loaded = bm25_service.get_or_build_bm25("doc", list(CHUNKS))
+    assert not builds
+    assert loaded.search("alpha", top_k=5) == built.search("alpha", top_k=5)
+
+    bm25_service.get_or_build_bm25("doc", CHUNKS[:-1])
+    assert builds
+    files = list(tmp_path.glob("doc_*.npz"))
+    assert len(files) == 1 and files[0].name != f"doc_{loaded.fingerprint}.npz"
+    bm25_service.clear_bm25_cache("doc")
+    assert not list(tmp_path.glob("doc_*.npz"))
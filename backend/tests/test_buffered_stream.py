@@ -270,3 +270,52 @@ class TestBufferedStreamEdgeCases:
         # 内容应完整保留
         output_content = "".join(c["content"] for c in output)
         assert output_content == "完整回答"
+
+
+class TestBufferedStreamFlushInterval:
+    """时间窗口测试：距上次发送超过 flush_interval 时未达阈值也发送"""
+
+    @pytest.mark.asyncio
+    async def test_flush_on_interval_before_size_threshold(self):
+        """字符数远未达阈值，但相邻 chunk 间隔超过时间窗口时逐个发送"""
+
+        async def _slow_stream():
+            for text in ("慢", "速", "流"):
+                await asyncio.sleep(0.02)
+                yield {"content": text, "reasoning_content": "", "done": False}
+            yield {"content": "", "reasoning_content": "", "done": True}
+
+        with patch("routes.chat_routes.settings") as mock_settings:
+            mock_settings.stream_buffer_size = 256
+            from routes.chat_routes import _buffered_stream
+
+            output = []
+            async for chunk in _buffered_stream(_slow_stream(), flush_interval=0.01):
+                output.append(chunk)
+
+        assert [c["content"] for c in output] == ["慢", "速", "流", ""]
+        assert output[-1]["done"] is True
+
+    @pytest.mark.asyncio
+    async def test_flush_on_timer_while_upstream_is_idle(self):
+        """上游长时间无新 chunk 时，已缓冲内容按计时器发送，不等下一个 chunk 到来"""
+        import time
+
+        async def _stalled_stream():
+            yield {"content": "先到", "reasoning_content": "", "done": False}
+            await asyncio.sleep(0.3)
+            yield {"content": "后到", "reasoning_content": "", "done": False}
+            yield {"content": "", "reasoning_content": "", "done": True}
+
+        with patch("routes.chat_routes.settings") as mock_settings:
+            mock_settings.stream_buffer_size = 256
+            from routes.chat_routes import _buffered_stream
+
+            start = time.monotonic()
+            output = []
+            async for chunk in _buffered_stream(_stalled_stream(), flush_interval=0.02):
+                output.append((time.monotonic() - start, chunk))
+
+        assert [c["content"] for _, c in output] == ["先到", "后到", ""]
+        # 第一段在时间窗口到期时即发送，而不是等到 0.3 秒后下一个 chunk 到来
+        assert output[0][0] < 0.2
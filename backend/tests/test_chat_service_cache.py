@@ -0,0 +1,71 @@
+"""chat_service 非流式响应缓存测试"""
+
+import asyncio
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import services.chat_service as chat_service
+
+
+class _CountingProvider:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat(self, messages, api_key, model, **kwargs):
+        self.calls += 1
+        return {"choices": [{"message": {"content": f"answer-{self.calls}"}}]}
+
+
+def _ask(question, temperature=0.0, api_key="sk"):
+    return asyncio.run(chat_service.call_ai_api(
+        [{"role": "user", "content": question}], api_key, "m", "openai", temperature=temperature
+    ))
+
+
+def test_identical_requests_hit_response_cache(monkeypatch):
+    provider = _CountingProvider()
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider_id, endpoint: provider)
+    monkeypatch.setattr(chat_service, "_response_cache_ttl", lambda: 60.0)
+    monkeypatch.setattr(chat_service, "_RESPONSE_CACHE", chat_service.QueryCache())
+
+    first = _ask("q1")
+    first["choices"][0]["message"]["content"] = "mutated by caller"
+    second = _ask("q1")
+    assert provider.calls == 1
+    assert second["choices"][0]["message"]["content"] == "answer-1"
+    assert second["_cache"] == "exact" and second["_used_provider"] == "openai"
+
+    _ask("q1", temperature=0.7)
+    _ask("q2")
+    assert provider.calls == 3
+
+
+def test_response_cache_is_keyed_by_api_key(monkeypatch):
+    """不同 api_key 的相同请求互不命中对方的缓存。"""
+    provider = _CountingProvider()
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider_id, endpoint: provider)
+    monkeypatch.setattr(chat_service, "_response_cache_ttl", lambda: 60.0)
+    monkeypatch.setattr(chat_service, "_RESPONSE_CACHE", chat_service.QueryCache())
+
+    _ask("q1", api_key="sk-a")
+    other = _ask("q1", api_key="sk-b")
+    assert provider.calls == 2
+    assert "_cache" not in other
+
+    _ask("q1", api_key="sk-a")
+    _ask("q1", api_key="sk-b")
+    assert provider.calls == 2
+
+
+def test_response_cache_disabled_by_default(monkeypatch):
+    provider = _CountingProvider()
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider_id, endpoint: provider)
+    monkeypatch.setattr(chat_service, "_RESPONSE_CACHE", chat_service.QueryCache())
+
+    _ask("q1")
+    response = _ask("q1")
+    assert provider.calls == 2
+    assert "_cache" not in response
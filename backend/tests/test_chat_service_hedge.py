@@ -0,0 +1,127 @@
+"""chat_service 备用 provider 切换与对冲请求测试"""
+
+import asyncio
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import services.chat_service as chat_service
+from utils.middleware import FallbackMiddleware, RetryMiddleware, TimeoutMiddleware
+
+
+class _FakeProvider:
+    def __init__(self, name, latency=0.0, fail=False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+
+    async def chat(self, messages, api_key, model, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return {"choices": [{"message": {"content": self.name}}]}
+
+
+def _call(monkeypatch, primary, backup, hedge_delay):
+    providers = {"openai": primary, "deepseek": backup}
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider, endpoint: providers[provider])
+    middlewares = [
+        RetryMiddleware(retries=0, delay=0.0, hedge_delay=hedge_delay),
+        FallbackMiddleware("deepseek", "backup-model"),
+    ]
+    return asyncio.run(chat_service.call_ai_api(
+        [{"role": "user", "content": "hi"}], "sk", "m", "openai", middlewares=middlewares
+    ))
+
+
+def test_serial_fallback_without_hedge_delay(monkeypatch):
+    primary, backup = _FakeProvider("primary", fail=True), _FakeProvider("backup")
+    response = _call(monkeypatch, primary, backup, hedge_delay=None)
+    assert response["choices"][0]["message"]["content"] == "backup"
+    assert response["_fallback_used"] is True
+    assert response["_used_provider"] == "deepseek" and response["_used_model"] == "backup-model"
+
+
+def test_hedge_skips_fallback_when_primary_is_fast(monkeypatch):
+    primary, backup = _FakeProvider("primary"), _FakeProvider("backup")
+    response = _call(monkeypatch, primary, backup, hedge_delay=0.2)
+    assert response["_fallback_used"] is False
+    assert backup.calls == 0
+
+
+def test_hedge_races_fallback_and_cancels_slow_primary(monkeypatch):
+    primary, backup = _FakeProvider("primary", latency=5.0), _FakeProvider("backup", latency=0.01)
+    response = _call(monkeypatch, primary, backup, hedge_delay=0.02)
+    assert response["choices"][0]["message"]["content"] == "backup"
+    assert response["_fallback_used"] is True and response["_used_provider"] == "deepseek"
+    assert primary.cancelled
+
+
+def test_hedge_reports_error_when_both_fail(monkeypatch):
+    primary, backup = _FakeProvider("primary", fail=True), _FakeProvider("backup", fail=True)
+    response = _call(monkeypatch, primary, backup, hedge_delay=1.0)
+    assert response["error"] == "backup down"
+    assert response["_fallback_used"] is True
+
+
+def test_hung_provider_times_out_and_falls_back(monkeypatch):
+    """上游接受请求后一直不返回时，按 _timeout 截断并切换到备用 provider。"""
+    primary, backup = _FakeProvider("primary", latency=60.0), _FakeProvider("backup")
+    providers = {"openai": primary, "deepseek": backup}
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider, endpoint: providers[provider])
+    middlewares = [
+        RetryMiddleware(retries=0, delay=0.0),
+        TimeoutMiddleware(timeout=0.05),
+        FallbackMiddleware("deepseek", "backup-model"),
+    ]
+    response = asyncio.run(chat_service.call_ai_api(
+        [{"role": "user", "content": "hi"}], "sk", "m", "openai", middlewares=middlewares
+    ))
+    assert response["choices"][0]["message"]["content"] == "backup"
+    assert primary.cancelled and response["_fallback_used"] is True
+
+
+def test_retry_wait_keeps_fixed_delay_without_cap():
+    assert chat_service._retry_wait(RuntimeError("x"), 3, 0.5, None) == 0.5
+
+
+def test_retry_wait_exponential_full_jitter_and_retry_after(monkeypatch):
+    from fastapi import HTTPException
+
+    monkeypatch.setattr(chat_service.random, "random", lambda: 0.5)
+    assert chat_service._retry_wait(RuntimeError("x"), 1, 0.5, 30.0) == 0.25
+    assert chat_service._retry_wait(RuntimeError("x"), 4, 0.5, 30.0) == 2.0
+    assert chat_service._retry_wait(RuntimeError("x"), 10, 0.5, 30.0) == 15.0
+    limited = HTTPException(status_code=429, detail="slow down", headers={"Retry-After": "7"})
+    assert chat_service._retry_wait(limited, 1, 0.5, 30.0) == 7.0
+    assert chat_service._retry_wait(limited, 1, 0.5, 3.0) == 3.0
+
+
+def test_client_errors_skip_retries_but_still_fall_back(monkeypatch):
+    from fastapi import HTTPException
+
+    class _Rejecting(_FakeProvider):
+        async def chat(self, messages, api_key, model, **kwargs):
+            self.calls += 1
+            raise HTTPException(status_code=401, detail="bad key")
+
+    primary, backup = _Rejecting("primary"), _FakeProvider("backup")
+    providers = {"openai": primary, "deepseek": backup}
+    monkeypatch.setattr(chat_service, "_get_provider_client", lambda provider, endpoint: providers[provider])
+    middlewares = [RetryMiddleware(retries=3, delay=0.0), FallbackMiddleware("deepseek", "backup-model")]
+    response = asyncio.run(chat_service.call_ai_api(
+        [{"role": "user", "content": "hi"}], "sk", "m", "openai", middlewares=middlewares
+    ))
+    assert primary.calls == 1
+    assert response["choices"][0]["message"]["content"] == "backup"
+    assert chat_service._is_retryable(HTTPException(status_code=429))
+    assert chat_service._is_retryable(RuntimeError("upstream 502"))
@@ -0,0 +1,231 @@
+"""chat_service 流式调用测试"""
+
+import asyncio
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+
+import services.chat_service as chat_service
+
+
+def _collect(monkeypatch, handler, provider, endpoint=""):
+    """用 MockTransport 替换共享流式客户端并收集全部输出块。"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(chat_service, "_get_stream_client", lambda: client)
+
+    async def run():
+        return [
+            chunk
+            async for chunk in chat_service.call_ai_api_stream(
+                [{"role": "user", "content": "hi"}], "sk-test", "m", provider, endpoint=endpoint
+            )
+        ]
+
+    return asyncio.run(run())
+
+
+def test_openai_stream_reuses_shared_client_with_per_request_timeout(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions["timeout"]["read"])
+        body = b'data: {"choices":[{"delta":{"content":"ok"}}]}\n\ndata: [DONE]\n\n'
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "openai", endpoint="http://upstream/v1/chat/completions")
+    chunks += _collect(monkeypatch, handler, "openai", endpoint="http://upstream/v1/chat/completions")
+    assert [c["content"] for c in chunks] == ["ok", "", "ok", ""]
+    assert seen == [120.0, 120.0]
+
+
+def test_close_stream_client_resets_shared_client():
+    client = chat_service._get_stream_client()
+    assert chat_service._get_stream_client() is client
+    asyncio.run(chat_service.close_stream_client())
+    assert client.is_closed
+    assert chat_service._get_stream_client() is not client
+    asyncio.run(chat_service.close_stream_client())
+
+
+def test_gemini_stream_skips_unparsable_lines(monkeypatch):
+    def handler(request):
+        body = (
+            b'data: {"candidates":[{"content":{"parts":[{"text":"\xe4\xbd\xa0\xe5\xa5\xbd"}]}}]}\n\n'
+            b"data: {not json}\n\n"
+            b'data: {"candidates":[{"content":{"parts":[{"text":"!"}]}}]}\n\n'
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "gemini")
+    assert [c["content"] for c in chunks] == ["你好", "!", ""]
+    assert chunks[-1]["done"] is True
+
+
+def test_iter_sse_data_frames_split_chunks():
+    class _Resp:
+        async def aiter_bytes(self):
+            for part in (b"data: {\"a\"", b":1}\r\n\r\nda", b"ta:[DONE]\n", b"event: ping\n: keep", b"alive\nid: 7\n{\"raw\":1}\n", b"data: tail"):
+                yield part
+
+    async def run():
+        return [data async for data in chat_service._iter_sse_data(_Resp())]
+
+    assert asyncio.run(run()) == [b'{"a":1}', b"[DONE]", b'{"raw":1}', b"tail"]
+
+
+def test_provider_client_reused_per_provider_and_endpoint():
+    first = chat_service._get_provider_client("openai", "http://a/v1/chat/completions")
+    assert chat_service._get_provider_client("openai", "http://a/v1/chat/completions") is first
+    other = chat_service._get_provider_client("openai", "http://b/v1/chat/completions")
+    assert other is not first and other.endpoint == "http://b/v1/chat/completions"
+    assert chat_service._get_provider_client("OpenAI", "http://a/v1/chat/completions") is first
+
+
+def test_gemini_large_payload_parsed_off_loop(monkeypatch):
+    monkeypatch.setattr(chat_service, "_SSE_OFFLOAD_BYTES", 16)
+
+    def handler(request):
+        body = b'data: {"candidates":[{"content":{"parts":[{"text":"' + b"x" * 64 + b'"}]}}]}\n\n'
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "gemini")
+    assert [c["content"] for c in chunks] == ["x" * 64, ""]
+
+
+def test_anthropic_body_splits_system_message_in_order(monkeypatch):
+    import orjson
+
+    bodies = []
+
+    def handler(request):
+        bodies.append(orjson.loads(request.content))
+        return httpx.Response(200, content=b"data: [DONE]\n\n", headers={"content-type": "text/event-stream"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(chat_service, "_get_stream_client", lambda: client)
+    messages = [
+        {"role": "system", "content": "s1"},
+        {"role": "user", "content": "u1"},
+        {"role": "system", "content": "s2"},
+        {"role": "assistant", "content": "a1"},
+    ]
+
+    async def run():
+        return [c async for c in chat_service.call_ai_api_stream(messages, "sk", "m", "anthropic")]
+
+    asyncio.run(run())
+    assert bodies[0]["system"] == "s1"
+    assert [m["content"] for m in bodies[0]["messages"]] == ["u1", "a1"]
+
+
+def test_non_streaming_provider_emits_whole_answer(monkeypatch):
+    async def fake_call_ai_api(*args, **kwargs):
+        return {"choices": [{"message": {"content": "a b c"}}], "_used_provider": "ollama", "_used_model": "m"}
+
+    monkeypatch.setattr(chat_service, "call_ai_api", fake_call_ai_api)
+
+    async def run():
+        return [c async for c in chat_service.call_ai_api_stream([{"role": "user", "content": "hi"}], "", "m", "ollama")]
+
+    chunks = asyncio.run(run())
+    assert [c["content"] for c in chunks] == ["a b c", ""]
+    assert chunks[0]["used_provider"] == "ollama" and chunks[-1]["done"] is True
+
+
+def test_gemini_stream_sends_orjson_body_with_json_content_type(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.headers["content-type"], request.content))
+        return httpx.Response(200, content=b"", headers={"content-type": "text/event-stream"})
+
+    _collect(monkeypatch, handler, "gemini")
+    content_type, raw = seen[0]
+    assert content_type == "application/json"
+    assert b'"contents":[{"role":"user","parts":[{"text":"hi"}]}]' in raw
+
+
+def test_prewarm_heads_each_https_origin_once(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url)))
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(chat_service, "_get_stream_client", lambda: client)
+    warmed = asyncio.run(chat_service.prewarm_stream_connections(["openai", " Gemini", "qwen", "aliyun", "ollama", "unknown"]))
+    assert warmed == len(seen) == 3
+    assert sorted(seen) == [
+        ("HEAD", "https://api.openai.com"),
+        ("HEAD", "https://dashscope.aliyuncs.com"),
+        ("HEAD", "https://generativelanguage.googleapis.com"),
+    ]
+
+
+
+class _ChunkedBody(httpx.AsyncByteStream):
+    """逐块返回的响应体，模拟事件分散在多个网络块中到达"""
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    async def __aiter__(self):
+        for part in self.parts:
+            yield part
+
+
+def test_openai_stream_reasoning_content_shapes(monkeypatch):
+    def handler(request):
+        parts = [
+            b'data: {"choices":[{"delta":{"reasoning_content":"think"}}]}\n\n',
+            b'data: {"choices":[{"delta":{"reasoning_content":[{"text":"a"},"b",{"content":5}]}}]}\n\n',
+            b'data: {"choices":[{"delta":{"reasoning_content":{"content":"c"}}}]}\n\n',
+            b'data: {"choices":[{"delta":{"reasoning_details":[{"text":"d"}]}}]}\n\n',
+            b"data: [DONE]\n\n",
+        ]
+        return httpx.Response(200, stream=_ChunkedBody(parts), headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "openai", endpoint="http://upstream/v1/chat/completions")
+    assert [c.get("reasoning_content") for c in chunks[:-1]] == ["think", "ab", "c", "d"]
+
+
+def test_anthropic_stream_reads_dict_deltas(monkeypatch):
+    def handler(request):
+        body = (
+            b"event: message_start\n"
+            b'data: {"type":"message_start","message":{"id":"m"}}\n\n'
+            b"event: content_block_delta\n"
+            b'data: {"type":"content_block_delta","delta":{"type":"thinking_delta","thinking":"hmm"}}\n\n'
+            b"event: content_block_delta\n"
+            b'data: {"type":"content_block_delta","delta":{"type":"text_delta","text":"hey"}}\n\n'
+            b"event: message_delta\n"
+            b'data: {"type":"message_delta","delta":{"stop_reason":"end_turn"}}\n\n'
+            b"event: message_stop\n"
+            b'data: {"type":"message_stop"}\n\n'
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "anthropic")
+    assert [(c["content"], c.get("reasoning_content")) for c in chunks[:-1]] == [("", "hmm"), ("hey", None)]
+    assert chunks[-1]["done"] is True
+
+
+def test_openai_stream_coalesces_events_from_one_network_chunk(monkeypatch):
+    def handler(request):
+        parts = [
+            b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n',
+            b'data: {"choices":[{"delta":{"content":"Hel"}}]}\n\ndata: {"choices":[{"delta":{"content":"lo"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":","}}]}\n\ndata: {"choices":[{"delta":{"content":" wor"',
+            b'}}]}\n\ndata: {"choices":[{"delta":{"content":"ld"}}]}\n\ndata: [DONE]\n\n',
+        ]
+        return httpx.Response(200, stream=_ChunkedBody(parts), headers={"content-type": "text/event-stream"})
+
+    chunks = _collect(monkeypatch, handler, "openai", endpoint="http://upstream/v1/chat/completions")
+    # 首块只有 role：心跳；第二块三个事件合并；第三块补全的事件与后续事件合并后接 done
+    assert [c["content"] for c in chunks] == ["", "Hello,", " world", ""]
+    assert chunks[-1]["done"] is True
@@ -0,0 +1,82 @@
+"""响应压缩中间件测试"""
+
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware
+
+
+def _make_client(static_dir=None):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    if static_dir is not None:
+        from fastapi.staticfiles import StaticFiles
+
+        app.mount("/uploads", StaticFiles(directory=static_dir), name="uploads")
+
+    @app.get("/big")
+    async def big():
+        return PlainTextResponse("x" * 4096)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/sse")
+    async def sse():
+        async def gen():
+            for i in range(3):
+                yield f"data: {'y' * 600}{i}\n\n"
+        return StreamingResponse(gen(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_large_response_is_gzipped():
+    client = _make_client()
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers.get("content-encoding") == "gzip"
+    assert resp.text == "x" * 4096
+
+
+def test_small_response_not_compressed():
+    client = _make_client()
+    resp = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+
+
+def test_event_stream_passes_through_uncompressed():
+    client = _make_client()
+    resp = client.get("/sse", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text.count("data: ") == 3
+
+
+def test_json_response_is_gzipped():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/json")
+    async def payload():
+        return {"results": ["z" * 100] * 50}
+
+    resp = TestClient(app).get("/json", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers.get("content-encoding") == "gzip"
+    assert len(resp.json()["results"]) == 50
+
+
+def test_static_pdf_served_uncompressed_with_ranges(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4\n" + b"0" * 8192)
+    client = _make_client(static_dir=str(tmp_path))
+    resp = client.get("/uploads/a.pdf", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
+    assert resp.headers.get("accept-ranges") == "bytes"
+    assert resp.content.startswith(b"%PDF-1.4")
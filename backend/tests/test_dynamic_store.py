@@ -0,0 +1,77 @@
+"""动态 provider/模型存储的快照缓存测试"""
+
+import json
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import models.dynamic_store as dynamic_store
+
+
+def _use_tmp_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(dynamic_store, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(dynamic_store, "PROVIDER_FILE", str(tmp_path / "providers.json"))
+    monkeypatch.setattr(dynamic_store, "MODEL_FILE", str(tmp_path / "models.json"))
+    monkeypatch.setattr(dynamic_store, "_SNAPSHOTS", {})
+    monkeypatch.setattr(dynamic_store, "_PENDING", {})
+
+
+def test_load_returns_empty_when_file_missing(monkeypatch, tmp_path):
+    """文件不存在时返回空字典。"""
+    _use_tmp_files(monkeypatch, tmp_path)
+    assert dynamic_store.load_dynamic_models() == {}
+
+
+def test_save_then_load_reads_own_write_without_touching_disk(monkeypatch, tmp_path):
+    """写入后再次读取应命中内存快照，不重新读盘。"""
+    _use_tmp_files(monkeypatch, tmp_path)
+    dynamic_store.save_dynamic_providers({"acme": {"name": "Acme", "type": "openai"}})
+
+    def _fail_open(*args, **kwargs):
+        raise AssertionError("快照命中时不应重新读盘")
+
+    monkeypatch.setattr("builtins.open", _fail_open)
+    assert dynamic_store.load_dynamic_providers() == {"acme": {"name": "Acme", "type": "openai"}}
+
+
+def test_load_returns_copy_of_snapshot(monkeypatch, tmp_path):
+    """调用方修改返回值不应影响快照。"""
+    _use_tmp_files(monkeypatch, tmp_path)
+    dynamic_store.save_dynamic_models({"m1": {"name": "M1"}})
+
+    loaded = dynamic_store.load_dynamic_models()
+    loaded.pop("m1")
+
+    assert dynamic_store.load_dynamic_models() == {"m1": {"name": "M1"}}
+
+
+def test_external_modification_is_picked_up_via_mtime(monkeypatch, tmp_path):
+    """文件被外部修改（mtime 变化）时应重新加载并递增版本号。"""
+    _use_tmp_files(monkeypatch, tmp_path)
+    dynamic_store.save_dynamic_models({"m1": {"name": "M1"}})
+    version = dynamic_store.get_store_version()
+
+    path = tmp_path / "models.json"
+    path.write_text(json.dumps({"m2": {"name": "M2"}}), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert dynamic_store.load_dynamic_models() == {"m2": {"name": "M2"}}
+    assert dynamic_store.get_store_version() > version
+
+
+def test_staged_data_is_visible_before_save(monkeypatch, tmp_path):
+    """暂存的数据在落盘前即可读到，落盘后清除暂存。"""
+    _use_tmp_files(monkeypatch, tmp_path)
+    staged = {"m1": {"name": "M1"}}
+    dynamic_store.stage_dynamic_models(staged)
+
+    assert not (tmp_path / "models.json").exists()
+    assert dynamic_store.load_dynamic_models() == staged
+
+    dynamic_store.save_dynamic_models(staged)
+
+    assert dynamic_store._PENDING == {}
+    assert json.loads((tmp_path / "models.json").read_text(encoding="utf-8")) == staged
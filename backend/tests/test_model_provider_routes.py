@@ -1,9 +1,12 @@
 """模型管理路由回归测试"""
 
 import asyncio
+import json
 import os
 import sys
 
+import pytest
+
 # 将 backend 目录加入导入路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -11,6 +14,28 @@ import routes.model_provider_routes as model_provider_routes
 from routes.model_provider_routes import ModelUpsertRequest
 
 
+@pytest.fixture(autouse=True)
+def _reset_models_cache():
+    """每个用例前后清空 /models 缓存，避免 monkeypatch 的数据互相污染。"""
+    model_provider_routes._invalidate_models_cache()
+    model_provider_routes._PENDING_SAVES.clear()
+    model_provider_routes._SAVE_TASKS.clear()
+    yield
+    model_provider_routes._invalidate_models_cache()
+    model_provider_routes._PENDING_SAVES.clear()
+    model_provider_routes._SAVE_TASKS.clear()
+
+
+def _models_client():
+    """挂载模型管理路由的 TestClient，/models 经完整请求路径（含 If-None-Match）调用。"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.include_router(model_provider_routes.router)
+    return TestClient(app)
+
+
 def test_get_models_includes_openai_compatible_dynamic_model(monkeypatch):
     """OpenAI 兼容 provider 的动态模型应正确归属到原 provider。"""
     monkeypatch.setattr(
@@ -27,7 +52,7 @@ def test_get_models_includes_openai_compatible_dynamic_model(monkeypatch):
     )
     monkeypatch.setattr(model_provider_routes, "load_dynamic_providers", lambda: {})
 
-    result = asyncio.run(model_provider_routes.get_models())
+    result = _models_client().get("/models").json()
 
     assert "acme-embed-1" in result["silicon"]["models"]
 
@@ -43,6 +68,7 @@ def test_upsert_custom_model_normalizes_provider_and_metadata(monkeypatch):
         captured["models"] = models
 
     monkeypatch.setattr(model_provider_routes, "save_dynamic_models", _capture)
+    monkeypatch.setattr(model_provider_routes, "stage_dynamic_models", lambda models: None)
 
     req = ModelUpsertRequest(
         modelId="embedding-3-custom",
@@ -56,7 +82,11 @@ def test_upsert_custom_model_normalizes_provider_and_metadata(monkeypatch):
         },
     )
 
-    asyncio.run(model_provider_routes.upsert_custom_model(req))
+    async def _upsert_and_flush():
+        await model_provider_routes.upsert_custom_model(req)
+        await model_provider_routes._flush_pending_saves()
+
+    asyncio.run(_upsert_and_flush())
 
     saved = captured["models"]["embedding-3-custom"]
     assert saved["provider"] == "openai"
@@ -65,3 +95,231 @@ def test_upsert_custom_model_normalizes_provider_and_metadata(monkeypatch):
     assert saved["base_url"] == "https://open.bigmodel.cn/api/paas/v4"
     assert saved["max_tokens"] == 8192
     assert saved["model_name"] == "embedding-3"
+
+
+def test_get_models_serves_cached_payload_with_etag(monkeypatch):
+    """/models 应缓存结果并支持 If-None-Match，变更动态模型后缓存失效。"""
+    dynamic_models = {}
+    monkeypatch.setattr(model_provider_routes, "load_dynamic_models", lambda: dict(dynamic_models))
+    monkeypatch.setattr(model_provider_routes, "load_dynamic_providers", lambda: {})
+    monkeypatch.setattr(model_provider_routes, "stage_dynamic_models", dynamic_models.update)
+    monkeypatch.setattr(model_provider_routes, "save_dynamic_models", lambda models: None)
+
+    client = _models_client()
+
+    first = client.get("/models")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    not_modified = client.get("/models", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    req = ModelUpsertRequest(modelId="acme-embed-2", name="Acme Embed 2", providerId="silicon")
+    asyncio.run(model_provider_routes.upsert_custom_model(req))
+
+    refreshed = client.get("/models", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert "acme-embed-2" in refreshed.json()["silicon"]["models"]
+
+
+def test_get_models_rebuilds_cache_when_config_file_changes(monkeypatch, tmp_path):
+    """配置文件被外部修改（未经 _schedule_save）后，/models 缓存也应失效。"""
+    import models.dynamic_store as dynamic_store
+
+    model_file = tmp_path / "models.json"
+    provider_file = tmp_path / "providers.json"
+    monkeypatch.setattr(dynamic_store, "MODEL_FILE", str(model_file))
+    monkeypatch.setattr(dynamic_store, "PROVIDER_FILE", str(provider_file))
+    monkeypatch.setattr(dynamic_store, "_SNAPSHOTS", {})
+    monkeypatch.setattr(dynamic_store, "_PENDING", {})
+
+    model_file.write_text("{}", encoding="utf-8")
+    client = _models_client()
+    first = client.get("/models")
+    assert "acme-embed-3" not in first.json()["silicon"]["models"]
+
+    model_file.write_text(json.dumps({
+        "acme-embed-3": {"name": "Acme Embed 3", "provider": "silicon", "provider_id": "silicon"},
+    }), encoding="utf-8")
+    stat = os.stat(model_file)
+    os.utime(model_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    refreshed = client.get("/models")
+    assert refreshed.headers["etag"] != first.headers["etag"]
+    assert "acme-embed-3" in refreshed.json()["silicon"]["models"]
+
+
+def _mock_http_client(monkeypatch, handler):
+    """用 MockTransport 替换共享 HTTP 客户端。"""
+    import httpx
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(model_provider_routes, "_get_http_client", lambda: client)
+
+
+def test_fetch_models_with_fallback_returns_first_successful_endpoint(monkeypatch):
+    """候选端点并发请求，非首选端点成功时也应返回其数据与 URL。"""
+    import httpx
+
+    def handler(request):
+        if request.url.path == "/v1/models":
+            return httpx.Response(200, json={"data": [{"id": "m1"}]})
+        return httpx.Response(404)
+
+    _mock_http_client(monkeypatch, handler)
+
+    data, url, kind = asyncio.run(
+        model_provider_routes._fetch_models_with_fallback(
+            "https://api.example.com", "sk-test", ["/models", "/v1/models", "/models"]
+        )
+    )
+
+    assert data == {"data": [{"id": "m1"}]}
+    assert url == "https://api.example.com/v1/models"
+    assert kind == "ok"
+
+
+def test_fetch_models_with_fallback_surfaces_auth_error(monkeypatch):
+    """任一端点返回 401 时应直接返回认证错误。"""
+    import httpx
+
+    def handler(request):
+        if request.url.path == "/models":
+            return httpx.Response(401, json={"error": {"message": "invalid key"}})
+        return httpx.Response(404)
+
+    _mock_http_client(monkeypatch, handler)
+
+    data, error, kind = asyncio.run(
+        model_provider_routes._fetch_models_with_fallback(
+            "https://api.example.com", "sk-test", ["/models", "/v1/models"]
+        )
+    )
+
+    assert data is None
+    assert kind == "auth_error"
+    assert "HTTP 401" in error and "invalid key" in error
+
+
+def test_normalize_api_host_strips_longest_known_suffix():
+    """api_host 带 chat/embedding 尾部路径时应整体去掉，保留有意义的路径前缀。"""
+    normalize = model_provider_routes._normalize_api_host
+
+    assert normalize("openai", "https://api.example.com/v1/chat/completions") == "https://api.example.com"
+    assert normalize("doubao", "https://ark.example.com/api/v3/chat/completions/") == "https://ark.example.com/api/v3"
+    assert normalize("openai", "https://api.example.com/v1/embeddings") == "https://api.example.com/v1"
+    assert normalize("openai", "https://api.example.com/v1/") == "https://api.example.com/v1"
+
+
+def test_local_model_test_reuses_loaded_sentence_transformer(monkeypatch):
+    """本地模型重复测试时应复用已加载的模型实例。"""
+    import numpy as np
+
+    loads = []
+
+    class _FakeSentenceTransformer:
+        def __init__(self, model_id):
+            loads.append(model_id)
+
+        def encode(self, texts, **kwargs):
+            return np.zeros((len(texts), 384))
+
+    monkeypatch.setattr(model_provider_routes, "_HAS_SENTENCE_TRANSFORMERS", True)
+    monkeypatch.setattr(model_provider_routes, "SentenceTransformer", _FakeSentenceTransformer, raising=False)
+    model_provider_routes._get_local_st_model.cache_clear()
+
+    req = model_provider_routes.ModelTestRequest(
+        providerId="local", modelId="fake-minilm", apiKey="", apiHost="", modelType="embedding"
+    )
+    first = asyncio.run(model_provider_routes.test_model(req))
+    second = asyncio.run(model_provider_routes.test_model(req))
+    model_provider_routes._get_local_st_model.cache_clear()
+
+    assert first["dimension"] == second["dimension"] == 384
+    assert loads == ["fake-minilm"]
+
+
+def test_provider_test_does_not_treat_401_in_transport_error_as_auth_failure(monkeypatch):
+    """非认证错误的信息里恰好包含 "401" 时，不应被误判为 API Key 无效。"""
+    import httpx
+
+    def handler(request):
+        return httpx.Response(404)
+
+    _mock_http_client(monkeypatch, handler)
+
+    req = model_provider_routes.ProviderTestRequest(
+        providerId="acme", apiKey="sk-test", apiHost="https://api401.example.com"
+    )
+    result = asyncio.run(model_provider_routes.test_provider_connection(req))
+
+    assert result["success"] is True
+    assert result["availableModels"] == 0
+
+
+def test_custom_model_writes_are_coalesced_into_one_save(monkeypatch):
+    """防抖窗口内的连续修改应合并为一次落盘，且写入的是最新快照。"""
+    staged = {}
+    saves = []
+    monkeypatch.setattr(model_provider_routes, "load_dynamic_models", lambda: dict(staged))
+    monkeypatch.setattr(model_provider_routes, "load_dynamic_providers", lambda: {})
+    monkeypatch.setattr(model_provider_routes, "stage_dynamic_models", lambda models: staged.update(models))
+    monkeypatch.setattr(model_provider_routes, "save_dynamic_models", lambda models: saves.append(dict(models)))
+    monkeypatch.setattr(model_provider_routes, "_SAVE_DEBOUNCE_SECONDS", 0.01)
+
+    async def _burst():
+        for i in range(3):
+            req = ModelUpsertRequest(modelId=f"m{i}", name=f"M{i}", providerId="silicon")
+            await model_provider_routes.upsert_custom_model(req)
+        assert saves == []
+        await asyncio.sleep(0.05)
+
+    asyncio.run(_burst())
+
+    assert len(saves) == 1
+    assert set(saves[0]) == {"m0", "m1", "m2"}
+
+
+def test_provider_probe_only_sends_single_head_request(monkeypatch):
+    """probeOnly=True 时只发送一次 HEAD 请求并返回延迟。"""
+    import httpx
+
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url)))
+        return httpx.Response(404)
+
+    _mock_http_client(monkeypatch, handler)
+
+    req = model_provider_routes.ProviderTestRequest(
+        providerId="acme", apiKey="sk-test", apiHost="https://api.example.com/v1", probeOnly=True
+    )
+    result = asyncio.run(model_provider_routes.test_provider_connection(req))
+
+    assert result["success"] is True
+    assert "latency" in result
+    assert seen == [("HEAD", "https://api.example.com/v1")]
+
+
+def test_failed_save_keeps_snapshot_and_other_kinds_still_flush(monkeypatch):
+    """providers 写盘失败不应阻断 models 落盘，失败的快照保留待重试。"""
+    saved = {}
+
+    def _fail(providers):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(model_provider_routes, "save_dynamic_providers", _fail)
+    monkeypatch.setattr(model_provider_routes, "save_dynamic_models", lambda models: saved.update(models=models))
+    model_provider_routes._PENDING_SAVES.update(providers={"p": {}}, models={"m": {}})
+
+    asyncio.run(model_provider_routes._flush_pending_saves())
+
+    assert saved["models"] == {"m": {}}
+    assert model_provider_routes._PENDING_SAVES == {"providers": {"p": {}}}
+
+    monkeypatch.setattr(model_provider_routes, "save_dynamic_providers", lambda providers: saved.update(providers=providers))
+    asyncio.run(model_provider_routes._flush_pending_saves())
+    assert saved["providers"] == {"p": {}}
+    assert model_provider_routes._PENDING_SAVES == {}
@@ -0,0 +1,55 @@
+"""检索结果缓存（QueryCache）测试"""
+
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.query_cache import QueryCache, make_query_key
+
+
+def test_key_normalizes_query_whitespace_and_case():
+    """查询文本首尾空白和大小写不影响缓存键，其余参数参与区分。"""
+    assert make_query_key("d1", "  Hello ", 10) == make_query_key("d1", "hello", 10)
+    assert make_query_key("d1", "hello", 10) != make_query_key("d1", "hello", 5)
+    assert make_query_key("d1", "A AND b", fold_case=False) != make_query_key("d1", "a and b", fold_case=False)
+
+
+def test_get_put_and_stats():
+    cache = QueryCache()
+    assert cache.get("k") is None
+    cache.put("k", [1, 2], doc_id="d1")
+    assert cache.get("k") == [1, 2]
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_expired_entry_is_evicted():
+    cache = QueryCache()
+    cache.put("k", "v", ttl=-1, doc_id="d1")
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = QueryCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_invalidate_removes_only_that_document():
+    cache = QueryCache()
+    cache.put("k1", 1, doc_id="d1")
+    cache.put("k2", 2, doc_id="d1")
+    cache.put("k3", 3, doc_id="d2")
+    assert cache.invalidate("d1") == 2
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert cache.get("k3") == 3
+    assert cache.invalidate("d1") == 0
@@ -0,0 +1,58 @@
+"""批量检索查询向量预编码测试"""
+import os
+import pickle
+import sys
+
+import faiss
+import numpy as np
+
+# 将 backend 目录添加到 sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import services.embedding_service as embedding_service
+from services.embedding_service import QueryVectorCache, prefetch_query_vectors
+
+EMBED_DIM = 16
+
+
+def _write_index(tmpdir, doc_id="doc"):
+    index = faiss.IndexFlatIP(EMBED_DIM)
+    vectors = np.random.randn(3, EMBED_DIM).astype("float32")
+    faiss.normalize_L2(vectors)
+    index.add(vectors)
+    faiss.write_index(index, os.path.join(tmpdir, f"{doc_id}.index"))
+    with open(os.path.join(tmpdir, f"{doc_id}.pkl"), "wb") as f:
+        pickle.dump({"chunks": ["a", "b", "c"], "embedding_model": "local-minilm"}, f)
+
+
+class _Rewriter:
+    def rewrite(self, query, selected_text=None):
+        return f"{query}（改写）"
+
+
+def test_prefetch_encodes_rewritten_queries_in_one_call(monkeypatch, tmp_path):
+    """未命中缓存的改写查询只调用一次 embed_fn，向量按改写后的文本写入缓存并已归一化。"""
+    _write_index(str(tmp_path))
+    cache = QueryVectorCache(max_size=16)
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(list(texts))
+        return np.random.randn(len(texts), EMBED_DIM).astype("float32") * 3
+
+    monkeypatch.setattr(embedding_service, "_query_vector_cache", cache)
+    monkeypatch.setattr(embedding_service, "_query_rewriter_singleton", _Rewriter())
+    monkeypatch.setattr(embedding_service, "get_embedding_function", lambda model_id, api_key=None: fake_embed)
+    monkeypatch.setattr(embedding_service, "_index_cache", embedding_service._IndexCache(max_size=2))
+
+    encoded = prefetch_query_vectors("doc", ["q1", "q2", "q1"], str(tmp_path))
+
+    assert encoded == 2
+    assert calls == [["q1（改写）", "q2（改写）"]]
+    vector = cache.get("local-minilm", "q2（改写）")
+    assert vector.shape == (1, EMBED_DIM)
+    assert np.isclose(np.linalg.norm(vector), 1.0, atol=1e-5)
+
+    # 已缓存的查询不再编码
+    assert prefetch_query_vectors("doc", ["q1", "q2"], str(tmp_path)) == 0
+    assert len(calls) == 1
@@ -0,0 +1,176 @@
+"""检索路由测试"""
+
+import asyncio
+import json
+import os
+import sys
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import routes.search_routes as search_routes
+from utils.query_cache import search_result_cache
+
+
+def test_batch_search_preserves_order_and_dedupes_queries(monkeypatch):
+    """批量检索按输入顺序返回结果，重复查询只调用一次 vector_search，查询向量只批量预编码一次。"""
+    search_result_cache.clear()
+    calls = []
+    prefetched = []
+
+    async def fake_vector_search(doc_id, query, **kwargs):
+        calls.append(query)
+        await asyncio.sleep(0)
+        return [{"chunk": f"{doc_id}:{query}"}]
+
+    monkeypatch.setattr(search_routes, "vector_search", fake_vector_search)
+    monkeypatch.setattr(
+        search_routes, "prefetch_query_vectors",
+        lambda doc_id, queries, vector_store_dir, api_key: prefetched.append(list(queries)),
+    )
+    request = search_routes.BatchSearchRequest(doc_id="doc-1", queries=["A 是什么", "总结全文", "A 是什么"])
+    store = {"doc-1": {"data": {"pages": []}}}
+
+    response = asyncio.run(search_routes.batch_search_in_pdf(request, store=store, vector_store_dir=""))
+    payload = json.loads(response.body)
+
+    assert payload["results"] == [
+        [{"chunk": "doc-1:A 是什么"}],
+        [{"chunk": "doc-1:总结全文"}],
+        [{"chunk": "doc-1:A 是什么"}],
+    ]
+    assert len(payload["meta"]) == 3
+    assert sorted(calls) == ["A 是什么", "总结全文"]
+    assert prefetched == [["A 是什么", "总结全文"]]
+
+    # 结果缓存全部命中时不再预编码
+    asyncio.run(search_routes.batch_search_in_pdf(request, store=store, vector_store_dir=""))
+    assert len(prefetched) == 1
+    search_result_cache.clear()
+
+
+def test_search_cache_key_distinguishes_endpoint_and_api_keys():
+    """rerank_endpoint、api_key、rerank_api_key 不同的请求不能共享结果缓存。"""
+    base = dict(doc_id="d", query="q", use_rerank=True, rerank_provider="cohere", rerank_api_key="k1")
+    key = search_routes._search_cache_key(search_routes.SearchRequest(**base), "q", 10)
+
+    variants = [
+        {"rerank_endpoint": "https://rerank.example.com/v1"},
+        {"api_key": "sk-other"},
+        {"rerank_api_key": "k2"},
+    ]
+    for override in variants:
+        request = search_routes.SearchRequest(**{**base, **override})
+        assert search_routes._search_cache_key(request, "q", 10) != key
+    assert search_routes._search_cache_key(search_routes.SearchRequest(**base), "q", 10) == key
+
+
+def test_cloud_rerank_without_api_key_rejected_at_parse_time():
+    """云端 rerank 缺少 rerank_api_key 时在模型解析阶段报错；本地 rerank 不受影响。"""
+    import pytest
+    from pydantic import ValidationError
+
+    with pytest.raises(ValidationError):
+        search_routes.SearchRequest(doc_id="d", query="q", use_rerank=True, rerank_provider="Cohere")
+
+    search_routes.SearchRequest(doc_id="d", query="q", use_rerank=True, rerank_provider="local")
+    search_routes.SearchRequest(
+        doc_id="d", query="q", use_rerank=True, rerank_provider="cohere", rerank_api_key="k"
+    )
+
+
+def test_regex_timeout_terminates_process_pool_workers(monkeypatch):
+    """进程池中的病态正则（前瞻使其回退到 re 的回溯引擎）超时后返回 408，工作进程被终止，下次请求使用新建的进程池。"""
+    import pytest
+    from fastapi import HTTPException
+
+    search_result_cache.clear()
+    monkeypatch.setattr(search_routes.settings, "search_process_min_chars", 1)
+    monkeypatch.setattr(search_routes.settings, "search_process_workers", 1)
+    monkeypatch.setattr(search_routes.settings, "search_timeout", 5.0)
+    store = {"doc-1": {"data": {"full_text": "a" * 40 + "b"}}}
+
+    async def run():
+        # 预热：先让 spawn 出的工作进程就绪，避免启动耗时计入超时
+        ok = await search_routes.regex_search(search_routes.RegexSearchRequest(doc_id="doc-1", pattern="b"), store=store)
+        assert json.loads(ok.body)["total"] == 1
+        pool = search_routes._PROC_POOL
+        workers = list(pool._processes.values())
+
+        monkeypatch.setattr(search_routes.settings, "search_timeout", 0.5)
+        with pytest.raises(HTTPException) as exc:
+            await search_routes.regex_search(
+                search_routes.RegexSearchRequest(doc_id="doc-1", pattern="(?=a)(a+)+$"), store=store
+            )
+        assert exc.value.status_code == 408
+        assert search_routes._PROC_POOL is None
+        for proc in workers:
+            proc.join(timeout=5)
+            assert not proc.is_alive()
+
+        monkeypatch.setattr(search_routes.settings, "search_timeout", 30.0)
+        again = await search_routes.regex_search(search_routes.RegexSearchRequest(doc_id="doc-1", pattern="ab"), store=store)
+        assert json.loads(again.body)["total"] == 1
+        assert search_routes._PROC_POOL is not pool
+
+    try:
+        asyncio.run(run())
+    finally:
+        search_routes._reset_process_pool()
+        search_result_cache.clear()
+
+
+def test_parallel_regex_uses_half_the_pool_and_resets_on_timeout(monkeypatch):
+    """分块正则扫描最多占用一半工作进程；任一分块超时后整个进程池被终止重建。"""
+    import pytest
+    from fastapi import HTTPException
+
+    search_result_cache.clear()
+    monkeypatch.setattr(search_routes.settings, "search_process_min_chars", 1)
+    monkeypatch.setattr(search_routes.settings, "search_process_workers", 4)
+    monkeypatch.setattr(search_routes.settings, "search_timeout", 0.5)
+    planned = []
+    real_plan = search_routes.plan_regex_scan
+    monkeypatch.setattr(search_routes, "plan_regex_scan", lambda text, parts: planned.append(parts) or real_plan(text, parts))
+    store = {"doc-1": {"data": {"full_text": "a" * 40 + "b"}}}
+
+    async def run():
+        with pytest.raises(HTTPException) as exc:
+            await search_routes.regex_search(
+                search_routes.RegexSearchRequest(doc_id="doc-1", pattern="(?=a)(a+)+$"), store=store
+            )
+        assert exc.value.status_code == 408
+        assert search_routes._PROC_POOL is None
+
+    try:
+        asyncio.run(run())
+    finally:
+        search_routes._reset_process_pool()
+        search_result_cache.clear()
+    assert planned == [2]
+
+
+def test_boolean_search_streams_matches_in_text_order(monkeypatch):
+    """?stream=true 时布尔搜索边扫描边输出 NDJSON：按文中顺序返回前 limit 条，末行为 _meta。"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    text = "CNN 对比 一。" + "无关内容" * 200 + "CNN 对比 RNN 二。" + "无关内容" * 200 + "CNN 对比 三。"
+    store = {"doc-1": {"data": {"full_text": text}}}
+    app = FastAPI()
+    app.include_router(search_routes.router)
+    app.dependency_overrides[search_routes.get_document_store] = lambda: store
+    client = TestClient(app)
+    body = {"doc_id": "doc-1", "query": "CNN AND 对比 OR RNN", "limit": 2, "context_chars": 0}
+
+    response = client.post("/api/search/boolean?stream=true", json=body)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["match_offset"] for item in lines[:-1]] == sorted(item["match_offset"] for item in lines[:-1])
+    assert len(lines) == 3
+    assert lines[-1] == {"_meta": {"total": 2, "timed_out": False}}
+
+    # 默认 JSON 模式仍按分数降序
+    payload = client.post("/api/search/boolean", json=body).json()
+    assert payload["results"][0]["match_text"].endswith("RNN")
+    search_result_cache.clear()
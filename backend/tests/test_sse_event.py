@@ -0,0 +1,23 @@
+"""chat_routes._sse_event SSE 消息编码测试"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# 将 backend 目录加入导入路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from routes.chat_routes import _sse_event
+
+
+def test_sse_event_frames_utf8_json():
+    raw = _sse_event({"content": "你好", "done": False, "used_provider": None})
+    assert raw.startswith(b"data: ") and raw.endswith(b"\n\n")
+    assert json.loads(raw[6:-2].decode("utf-8")) == {"content": "你好", "done": False, "used_provider": None}
+
+
+def test_sse_event_serializes_numpy_scores():
+    raw = _sse_event({"retrieval_meta": {"scores": np.array([0.5, 0.25]), "top": np.float32(0.5)}})
+    assert json.loads(raw[6:-2]) == {"retrieval_meta": {"scores": [0.5, 0.25], "top": 0.5}}
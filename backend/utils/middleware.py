@@ -116,12 +116,27 @@ class TimeoutMiddleware(BaseMiddleware):
 class RetryMiddleware(BaseMiddleware):
     """重试中间件，供调用方读取重试配置"""
 
-    def __init__(self, retries: int = 2, delay: float = 0.5):
+    def __init__(
+        self,
+        retries: int = 2,
+        delay: float = 0.5,
+        hedge_delay: float | None = None,
+        backoff_cap: float | None = None,
+    ):
         self.retries = retries
         self.delay = delay
+        # 设置后改为指数退避 + 全抖动（delay * 2^n，上限 backoff_cap 秒）；None 保持固定间隔
+        self.backoff_cap = backoff_cap
+        # 配合 FallbackMiddleware：主请求超过 hedge_delay 秒未成功时并发请求备用 provider
+        self.hedge_delay = hedge_delay
 
     async def before_request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        payload["_retry_cfg"] = {"retries": self.retries, "delay": self.delay}
+        payload["_retry_cfg"] = {
+            "retries": self.retries,
+            "delay": self.delay,
+            "hedge_delay": self.hedge_delay,
+            "cap": self.backoff_cap,
+        }
         return payload
 
     async def after_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,126 @@
+"""
+检索结果缓存
+
+提供：
+- QueryCache: 线程安全的 TTL + LRU 缓存，按 doc_id 建立反向索引以便整体失效
+- make_query_key: 根据检索参数生成缓存键
+- search_result_cache: /api/search 系列端点共享的进程级缓存实例
+
+相同 (doc_id, query, top_k, ...) 的重复检索直接命中内存，省去查询向量化、
+ANN 检索与重排序开销；文档重新上传/索引时调用 invalidate(doc_id) 清除旧结果。
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_SIZE = 1024
+
+
+def make_query_key(doc_id: str, query: str, *parts: Any, fold_case: bool = True) -> str:
+    """生成缓存键：查询文本去首尾空白（fold_case 时转小写），其余参数按顺序拼接后取 sha1
+
+    正则、布尔表达式等大小写敏感的查询应传 fold_case=False。
+    """
+    query = query.strip()
+    if fold_case:
+        query = query.lower()
+    raw = "|".join([doc_id, query, *(str(p) for p in parts)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """线程安全的 TTL + LRU 缓存
+
+    Args:
+        max_size: 最大条目数，超出时淘汰最久未使用的条目
+        default_ttl: put 未指定 ttl 时使用的过期秒数
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, default_ttl: float = DEFAULT_TTL):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        # key -> (expires_at, doc_id, value)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._doc_keys: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """命中且未过期时返回缓存值并刷新 LRU 位置，否则返回 None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def __contains__(self, key: str) -> bool:
+        """仅判断是否命中且未过期，不刷新 LRU 位置也不计入命中统计"""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None, doc_id: str = "") -> None:
+        """写入缓存；doc_id 用于 invalidate 时定位该文档的全部条目"""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, doc_id, value)
+            self._doc_keys.setdefault(doc_id, set()).add(key)
+            while len(self._data) > self.max_size:
+                self._remove(next(iter(self._data)))
+
+    def invalidate(self, doc_id: str) -> int:
+        """清除指定文档的全部缓存条目，返回清除数量"""
+        with self._lock:
+            keys = self._doc_keys.pop(doc_id, None)
+            if not keys:
+                return 0
+            for key in keys:
+                self._data.pop(key, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._doc_keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "default_ttl": self.default_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        keys = self._doc_keys.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._doc_keys[entry[1]]
+
+
+# /api/search 系列端点共享的检索结果缓存
+search_result_cache = QueryCache()